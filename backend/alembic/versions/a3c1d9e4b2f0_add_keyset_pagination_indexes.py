@@ -0,0 +1,37 @@
+"""Add (sort column, dataset_id) indexes for keyset pagination
+
+Revision ID: a3c1d9e4b2f0
+Revises: 7f07c02e05a9
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c1d9e4b2f0'
+down_revision: Union[str, None] = '7f07c02e05a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SORT_COLUMNS = (
+    'group_name',
+    'data_type',
+    'organ',
+    'status',
+    'publication_date',
+    'created_at',
+    'updated_at',
+)
+
+
+def upgrade() -> None:
+    for column in SORT_COLUMNS:
+        op.create_index(f'ix_datasets_{column}_dataset_id', 'datasets', [column, 'dataset_id'], unique=False)
+
+
+def downgrade() -> None:
+    for column in reversed(SORT_COLUMNS):
+        op.drop_index(f'ix_datasets_{column}_dataset_id', table_name='datasets')
@@ -0,0 +1,37 @@
+"""Add generated tsvector column and GIN index for dataset full-text search
+
+Revision ID: b7e2f4a8c913
+Revises: a3c1d9e4b2f0
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2f4a8c913'
+down_revision: Union[str, None] = 'a3c1d9e4b2f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(public_dataset_id, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(group_name, '')), 'B') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'C') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(citation, '')), 'D')"
+)
+
+
+def upgrade() -> None:
+    op.execute(
+        "ALTER TABLE datasets ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_VECTOR_EXPRESSION}) STORED"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_datasets_search_vector ON datasets USING gin (search_vector)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_datasets_search_vector")
+    op.execute("ALTER TABLE datasets DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,33 @@
+"""Add pg_trgm GIN indexes for group_name, data_type and organ filters
+
+Revision ID: c4d8a1f5e027
+Revises: b7e2f4a8c913
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8a1f5e027'
+down_revision: Union[str, None] = 'b7e2f4a8c913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGRAM_COLUMNS = ('group_name', 'data_type', 'organ')
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for column in TRIGRAM_COLUMNS:
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS ix_datasets_{column}_trgm "
+            f"ON datasets USING gin ({column} gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    for column in reversed(TRIGRAM_COLUMNS):
+        op.execute(f"DROP INDEX IF EXISTS ix_datasets_{column}_trgm")
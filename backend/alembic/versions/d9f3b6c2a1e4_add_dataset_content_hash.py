@@ -0,0 +1,26 @@
+"""Add content_hash to datasets for incremental catalog loading
+
+Revision ID: d9f3b6c2a1e4
+Revises: c4d8a1f5e027
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9f3b6c2a1e4'
+down_revision: Union[str, None] = 'c4d8a1f5e027'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('datasets', sa.Column('content_hash', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('datasets', 'content_hash')
@@ -0,0 +1,34 @@
+"""Add public_dataset_id sequence and id_counters table
+
+Revision ID: e2a7c5d8f391
+Revises: d9f3b6c2a1e4
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7c5d8f391'
+down_revision: Union[str, None] = 'd9f3b6c2a1e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Auto IDs now end in a 3-digit day of year, so they cannot collide with the
+    # old COUNT-based HBMnnn.AUTO.mmdd values and the sequence can start at 1.
+    op.execute("CREATE SEQUENCE IF NOT EXISTS public_dataset_id_seq")
+    op.create_table('id_counters',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('id_counters')
+    op.execute("DROP SEQUENCE IF EXISTS public_dataset_id_seq")
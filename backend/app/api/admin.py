@@ -1,12 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.dataset import DatasetCreate, DatasetUpdate, DatasetSchema
-from app.core.dependencies import get_db, get_admin_user
-from app.core.security import verify_password, create_access_token
+from app.schemas.dataset import DatasetBulkResultSchema, DatasetCreate, DatasetUpdate, DatasetSchema
+from app.schemas.upload import UploadComplete, UploadCreate, UploadResultSchema, UploadStatusSchema
+from app.core.cache import catalog_cache
+from app.core.database import async_engine, engine
+from app.core.dependencies import get_async_db, get_admin_user
+from app.core.pool import pool_status
+from app.core.security import averify_password, create_access_token
+from app.services.bulk_import import BulkImportError, import_datasets, iter_csv_records, iter_ndjson_records
 from app.services.dataset_service import DatasetService
+from app.services import upload_service
+from app.services.upload_service import UploadConflictError, UploadNotFoundError, UploadRejectedError
 from app.models.user import User
 
 router = APIRouter()
@@ -18,12 +27,12 @@ class LoginRequest(BaseModel):
     password: str
 
 @router.post("/login")
-async def admin_login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def admin_login(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """관리자 로그인"""
     # 데이터베이스에서 사용자 검증
-    user = db.query(User).filter(User.username == login_data.username).first()
+    user = await db.scalar(select(User).where(User.username == login_data.username))
     
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    if not user or not await averify_password(login_data.password, user.hashed_password):
         raise HTTPException(
             status_code=401, 
             detail="Incorrect username or password"
@@ -53,41 +62,204 @@ async def admin_login(login_data: LoginRequest, db: Session = Depends(get_db)):
 @router.post("/datasets", response_model=DatasetSchema, status_code=201)
 async def create_dataset(
     dataset: DatasetCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_admin_user)
 ):
     """데이터셋 생성 (업로드)"""
-    return DatasetService.create_dataset(db=db, dataset=dataset, uploader_id=current_user.user_id)
+    created_dataset = await db.run_sync(
+        DatasetService.create_dataset, dataset=dataset, uploader_id=current_user.user_id
+    )
+    catalog_cache.invalidate()
+    return created_dataset
+
+@router.post("/datasets/bulk", response_model=DatasetBulkResultSchema)
+async def bulk_upsert_datasets(
+    request: Request,
+    format: Optional[str] = Query(None, regex="^(ndjson|csv)$", description="Body format (default: from Content-Type, else ndjson)"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    데이터셋 일괄 등록/수정 (NDJSON 또는 CSV 스트리밍 업로드)
+    
+    public_dataset_id 기준으로 upsert하며, 기존 데이터셋은 전달된 컬럼만 갱신합니다.
+    요청 본문을 스트리밍으로 읽어 청크 단위로 검증/저장하고,
+    잘못된 행은 건너뛰고 줄 번호와 함께 errors로 반환합니다.
+    """
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    parse = iter_csv_records if format == "csv" else iter_ndjson_records
+    
+    try:
+        return await import_datasets(db, parse(request.stream()), uploader_id=current_user.user_id)
+    except BulkImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        # 일부 청크만 저장된 경우에도 캐시를 비움
+        catalog_cache.invalidate()
 
 @router.put("/datasets/{public_dataset_id}", response_model=DatasetSchema)
 async def update_dataset(
     public_dataset_id: str,
     dataset_update: DatasetUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_admin_user)
 ):
     """데이터셋 수정"""
-    updated_dataset = DatasetService.update_dataset(db=db, public_dataset_id=public_dataset_id, dataset_update=dataset_update)
+    updated_dataset = await db.run_sync(
+        DatasetService.update_dataset, public_dataset_id=public_dataset_id, dataset_update=dataset_update
+    )
     if not updated_dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
+    catalog_cache.invalidate()
     return updated_dataset
 
 @router.delete("/datasets/{public_dataset_id}", status_code=204)
 async def delete_dataset(
     public_dataset_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_admin_user)
 ):
     """데이터셋 삭제"""
-    success = DatasetService.delete_dataset(db=db, public_dataset_id=public_dataset_id)
+    success = await db.run_sync(DatasetService.delete_dataset, public_dataset_id=public_dataset_id)
     if not success:
         raise HTTPException(status_code=404, detail="Dataset not found")
+    catalog_cache.invalidate()
+    return
+
+# --- 대용량 파일 청크 업로드 ---
+
+async def _dataset_storage_dir(db: AsyncSession, public_dataset_id: str) -> str:
+    dataset = await db.run_sync(DatasetService.get_dataset_by_public_id, public_dataset_id=public_dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return upload_service.storage_dir_for(dataset.public_dataset_id, dataset.file_storage_path)
+
+def _upload_http_error(error: Exception) -> HTTPException:
+    if isinstance(error, UploadNotFoundError):
+        return HTTPException(status_code=404, detail="Upload not found")
+    if isinstance(error, UploadConflictError):
+        return HTTPException(status_code=409, detail=str(error))
+    return HTTPException(status_code=422, detail=str(error))
+
+@router.post("/datasets/{public_dataset_id}/uploads", response_model=UploadStatusSchema, status_code=201)
+async def create_upload(
+    public_dataset_id: str,
+    upload: UploadCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    업로드 세션 생성
+    
+    이후 청크를 (순서 무관, 병렬 가능) PUT하고, 상태 조회로 재개 지점을 확인한 뒤 complete로 마무리합니다.
+    """
+    storage_dir = await _dataset_storage_dir(db, public_dataset_id)
+    try:
+        return await run_in_threadpool(
+            upload_service.create_upload, storage_dir, public_dataset_id,
+            upload.file_name, upload.size, upload.chunk_size, upload.sha256
+        )
+    except UploadRejectedError as e:
+        raise _upload_http_error(e)
+
+@router.get("/datasets/{public_dataset_id}/uploads/{upload_id}", response_model=UploadStatusSchema)
+async def get_upload_status(
+    public_dataset_id: str,
+    upload_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """업로드 진행 상태 조회 (누락 청크 및 재개 offset)"""
+    storage_dir = await _dataset_storage_dir(db, public_dataset_id)
+    try:
+        return await run_in_threadpool(upload_service.upload_status, storage_dir, upload_id)
+    except UploadNotFoundError as e:
+        raise _upload_http_error(e)
+
+@router.put("/datasets/{public_dataset_id}/uploads/{upload_id}/chunks/{index}")
+async def upload_chunk(
+    public_dataset_id: str,
+    upload_id: str,
+    index: int,
+    request: Request,
+    x_chunk_sha256: Optional[str] = Header(None, description="청크 SHA-256 (선택, 지정 시 검증)"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """청크 업로드 (요청 본문을 그대로 디스크에 스트리밍)"""
+    storage_dir = await _dataset_storage_dir(db, public_dataset_id)
+    # 본문 수신 중 커넥션을 점유하지 않도록 세션을 먼저 반환
+    await db.close()
+    try:
+        return await upload_service.write_chunk(storage_dir, upload_id, index, request.stream(), x_chunk_sha256)
+    except (UploadNotFoundError, UploadConflictError, UploadRejectedError) as e:
+        raise _upload_http_error(e)
+
+@router.post("/datasets/{public_dataset_id}/uploads/{upload_id}/complete", response_model=UploadResultSchema)
+async def complete_upload(
+    public_dataset_id: str,
+    upload_id: str,
+    completion: Optional[UploadComplete] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """업로드 완료: 전체 SHA-256 검증 후 데이터셋 디렉터리로 이동"""
+    storage_dir = await _dataset_storage_dir(db, public_dataset_id)
+    # 수 GB 파일을 해시하는 동안 커넥션을 점유하지 않도록 세션을 먼저 반환 (이후 쿼리는 새 커넥션 사용)
+    await db.close()
+    try:
+        result = await run_in_threadpool(
+            upload_service.complete_upload, storage_dir, upload_id, completion.sha256 if completion else None
+        )
+    except (UploadNotFoundError, UploadConflictError, UploadRejectedError) as e:
+        raise _upload_http_error(e)
+    
+    # 저장 경로가 없던 데이터셋은 기본 경로를 기록
+    def record_storage_path(session) -> bool:
+        dataset = DatasetService.get_dataset_by_public_id(session, public_dataset_id)
+        if dataset is None or dataset.file_storage_path:
+            return False
+        dataset.file_storage_path = storage_dir
+        session.commit()
+        return True
+    
+    if await db.run_sync(record_storage_path):
+        catalog_cache.invalidate()
+    return result
+
+@router.delete("/datasets/{public_dataset_id}/uploads/{upload_id}", status_code=204)
+async def abort_upload(
+    public_dataset_id: str,
+    upload_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """업로드 취소 (임시 파일 삭제)"""
+    storage_dir = await _dataset_storage_dir(db, public_dataset_id)
+    try:
+        await run_in_threadpool(upload_service.abort_upload, storage_dir, upload_id)
+    except UploadNotFoundError as e:
+        raise _upload_http_error(e)
     return
 
 @router.get("/datasets/statistics")
 async def get_dataset_statistics(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_admin_user)
 ):
     """데이터셋 통계 조회 (관리자 전용)"""
-    return DatasetService.get_dataset_statistics(db=db)
+    return await db.run_sync(DatasetService.get_dataset_statistics)
+
+@router.get("/cache/stats")
+async def get_cache_statistics(current_user: User = Depends(get_admin_user)):
+    """카탈로그 응답 캐시 통계 조회 (관리자 전용)"""
+    return catalog_cache.stats()
+
+@router.get("/db/pool")
+async def get_pool_statistics(current_user: User = Depends(get_admin_user)):
+    """DB 커넥션 풀 상태 조회 (관리자 전용)"""
+    return {
+        "async": pool_status(async_engine.sync_engine),
+        "sync": pool_status(engine)
+    }
@@ -1,135 +1,345 @@
 
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.schemas.dataset import DatasetListSchema, DatasetSchema
-from app.core.dependencies import get_db, get_current_user_optional
-from app.services.dataset_service import DatasetService
+from app.schemas.dataset import (
+    DATASET_FIELDS, LIST_DEFAULT_FIELDS, DatasetListSchema, DatasetSchema
+)
+from app.core.cache import catalog_cache
+from app.core.dependencies import get_async_db, get_current_user_optional
+from app.core.file_serving import file_download_response, safe_join
+from app.core.http_cache import is_conditional, is_not_modified, make_etag, not_modified_response, validator_headers
+from app.core.serialization import JSONBytesResponse, render_dataset_list
+from app.services.catalog_export import EXPORT_BATCH_SIZE, EXPORT_ENCODERS, ExportUnavailableError, iter_export
+from app.services.dataset_service import DatasetService, InvalidCursorError, FACET_FIELDS
 from app.models.user import User
-from fastapi.responses import FileResponse
-import os
 
 router = APIRouter(tags=["Datasets"])
 
 # Mock data removed - now using real database
+# DatasetService는 Session API로 작성되어 있으며, AsyncSession.run_sync로 실행합니다.
+# (asyncpg 위에서 greenlet으로 동작하므로 스레드풀을 점유하지 않음)
 
-@router.get("", response_model=DatasetListSchema)
-def get_datasets(
+def _parse_fields(fields: Optional[str], default: Tuple[str, ...]) -> Tuple[str, ...]:
+    """쉼표로 구분된 fields 파라미터를 검증하고 스키마 정의 순서로 정렬합니다."""
+    if not fields:
+        return default
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = sorted(requested - set(DATASET_FIELDS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field: {', '.join(unknown)}")
+    # 같은 집합이 같은 캐시 키/스키마를 갖도록 정렬
+    return tuple(f for f in DATASET_FIELDS if f in requested)
+
+# 응답 스키마가 fields에 따라 달라지므로 문서용 모델만 지정
+# (행 튜플을 orjson으로 바로 직렬화하며, 출력은 DatasetListSchema와 바이트 단위로 동일)
+@router.get("", response_model=None, responses={200: {"model": DatasetListSchema}})
+async def get_datasets(
+    request: Request,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
     group_name: Optional[str] = Query(None, description="Filter by research group name"),
     data_type: Optional[str] = Query(None, description="Filter by data type"),
     organ: Optional[str] = Query(None, description="Filter by organ"),
     status: Optional[str] = Query(None, description="Filter by status"),
+    group_name_match: str = Query("fuzzy", regex="^(exact|prefix|fuzzy|similar)$", description="Match mode for group_name"),
+    data_type_match: str = Query("fuzzy", regex="^(exact|prefix|fuzzy|similar)$", description="Match mode for data_type"),
+    organ_match: str = Query("fuzzy", regex="^(exact|prefix|fuzzy|similar)$", description="Match mode for organ"),
     search: Optional[str] = Query(None, description="Search in description, citation, and group name"),
-    sort_by: str = Query("publication_date", description="Field to sort by"),
+    sort_by: str = Query("publication_date", description="Field to sort by, or 'relevance' to rank search matches"),
     sort_order: str = Query("desc", regex="^(asc|desc)$", description="Sort order: asc or desc"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor (overrides skip)"),
+    count: str = Query("exact", regex="^(exact|estimated|none)$", description="Total count mode: exact, estimated or none"),
+    facets: Optional[str] = Query(None, description="Comma-separated facets to count: organ,data_type,status,group_name"),
+    fields: Optional[str] = Query(None, description="Comma-separated dataset fields to return (default: all but description)"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     데이터셋 목록을 반환합니다. (필터링, 검색, 정렬, 페이지네이션 지원)
+    
+    `cursor`를 사용하면 offset 대신 keyset 방식으로 다음 페이지를 조회합니다.
+    `count=none`은 전체 개수 계산을 생략합니다. (무한 스크롤용)
+    `*_match=exact`는 facet 클릭처럼 정확히 일치하는 값만, `prefix`는 접두어 일치,
+    `fuzzy`(기본값)는 부분 문자열 일치, `similar`는 부분 문자열 또는 오타를 허용하는
+    유사 문자열(pg_trgm) 일치로 필터링합니다.
+    
+    `fields`로 필요한 컬럼만 조회/반환합니다. 기본값은 description을 제외한 전체 필드입니다.
+    `facets`를 지정하면 현재 필터/검색 조건에서 facet 값별 개수를 함께 반환합니다.
+    (각 facet은 자기 자신의 필터는 제외하고 계산)
+    
+    ETag/Last-Modified를 반환하며, 변경이 없으면 304로 응답합니다.
     """
-    datasets = DatasetService.get_datasets(
-        db=db,
-        skip=skip,
-        limit=limit,
-        group_name=group_name,
-        data_type=data_type,
-        organ=organ,
-        status=status,
-        search=search,
-        sort_by=sort_by,
-        sort_order=sort_order
+    selected_fields = _parse_fields(fields, LIST_DEFAULT_FIELDS)
+    
+    facet_fields = []
+    if facets:
+        facet_fields = list(dict.fromkeys(f.strip() for f in facets.split(",") if f.strip()))
+        unknown = [f for f in facet_fields if f not in FACET_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown facet: {', '.join(unknown)}")
+    
+    match_modes = {
+        "group_name": group_name_match,
+        "data_type": data_type_match,
+        "organ": organ_match
+    }
+    
+    def build_page(session: Session) -> bytes:
+        try:
+            datasets, total_count = DatasetService.get_datasets_page(
+                db=session,
+                skip=skip,
+                limit=limit,
+                group_name=group_name,
+                data_type=data_type,
+                organ=organ,
+                status=status,
+                search=search,
+                sort_by=sort_by,
+                sort_order=sort_order,
+                cursor=cursor,
+                count=count,
+                match_modes=match_modes,
+                fields=list(selected_fields),
+                as_rows=True
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # 페이지가 가득 찼을 때만 다음 커서를 발급 (relevance 정렬은 offset 전용)
+        next_cursor = None
+        if len(datasets) == limit and not DatasetService.is_relevance_sort(session, sort_by, search):
+            next_cursor = DatasetService.encode_cursor(datasets[-1], sort_by, sort_order)
+        
+        facet_counts = None
+        if facet_fields:
+            facet_counts = {
+                facet: [{"value": value, "count": value_count} for value, value_count in values]
+                for facet, values in DatasetService.get_facet_counts(
+                    db=session,
+                    facets=facet_fields,
+                    group_name=group_name,
+                    data_type=data_type,
+                    organ=organ,
+                    status=status,
+                    search=search,
+                    match_modes=match_modes
+                ).items()
+            }
+        
+        return render_dataset_list(
+            datasets,
+            selected_fields,
+            total_count=total_count,
+            count_mode=count,
+            skip=None if cursor else skip,
+            limit=limit,
+            cursor=cursor,
+            next_cursor=next_cursor,
+            facets=facet_counts
+        )
+    
+    # 같은 의미의 요청이 같은 캐시 키를 갖도록 파라미터를 정규화
+    active_filters = {"group_name": group_name, "data_type": data_type, "organ": organ}
+    cache_params = (
+        None if cursor else skip,
+        limit,
+        tuple((field, value, match_modes[field]) for field, value in active_filters.items() if value),
+        status,
+        search,
+        sort_by if DatasetService.is_relevance_sort(db, sort_by, search) else DatasetService.normalize_sort_field(sort_by),
+        sort_order.lower(),
+        cursor,
+        count,
+        tuple(facet_fields),
+        selected_fields
     )
     
-    total_count = DatasetService.get_datasets_count(
-        db=db,
+    # facet 개수는 각자의 필터를 제외한 행까지 세므로, facet 요청은 전체 카탈로그 기준으로 변경 여부를 판단
+    freshness_filters = {} if facet_fields else {
+        "group_name": group_name,
+        "data_type": data_type,
+        "organ": organ,
+        "status": status,
+        "search": search,
+        "match_modes": match_modes,
+    }
+    
+    # 조건부 GET일 때만 행을 읽기 전에 max(updated_at)과 개수로 변경 여부를 판단
+    freshness = None
+    if is_conditional(request):
+        freshness = await db.run_sync(DatasetService.get_datasets_freshness, **freshness_filters)
+        etag = make_etag("datasets:list", cache_params, *freshness)
+        if is_not_modified(request, etag, freshness[0]):
+            return not_modified_response(etag, freshness[0])
+    
+    def build_entry(session: Session) -> tuple:
+        last_modified, row_count = freshness or DatasetService.get_datasets_freshness(session, **freshness_filters)
+        return build_page(session), last_modified, row_count
+    
+    # 캐시에는 직렬화된 바이트와 검증자(updated_at, 개수)를 함께 저장하므로 적중 시 집계 쿼리와 재직렬화 비용이 없음
+    body, last_modified, row_count = await catalog_cache.aget_or_set(
+        "datasets:list", cache_params, lambda: db.run_sync(build_entry)
+    )
+    etag = make_etag("datasets:list", cache_params, last_modified, row_count)
+    return JSONBytesResponse(body, headers=validator_headers(etag, last_modified))
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_datasets(
+    format: str = Query("ndjson", regex="^(ndjson|csv|parquet)$", description="Export format: ndjson, csv or parquet"),
+    group_name: Optional[str] = Query(None, description="Filter by research group name"),
+    data_type: Optional[str] = Query(None, description="Filter by data type"),
+    organ: Optional[str] = Query(None, description="Filter by organ"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    group_name_match: str = Query("fuzzy", regex="^(exact|prefix|fuzzy|similar)$", description="Match mode for group_name"),
+    data_type_match: str = Query("fuzzy", regex="^(exact|prefix|fuzzy|similar)$", description="Match mode for data_type"),
+    organ_match: str = Query("fuzzy", regex="^(exact|prefix|fuzzy|similar)$", description="Match mode for organ"),
+    search: Optional[str] = Query(None, description="Search in description, citation, and group name"),
+    fields: Optional[str] = Query(None, description="Comma-separated dataset fields to export (default: all)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    필터 조건에 맞는 전체 카탈로그를 NDJSON, CSV 또는 Parquet으로 내보냅니다.
+    
+    목록 API와 같은 필터를 사용하며, dataset_id 순으로 정렬됩니다.
+    서버 측 커서로 배치 단위로 읽어 바로 스트리밍하므로 행 수와 관계없이
+    메모리 사용량이 일정합니다. (Parquet은 row group 단위로 기록)
+    """
+    selected_fields = _parse_fields(fields, DATASET_FIELDS)
+    try:
+        encoder = EXPORT_ENCODERS[format](selected_fields)
+    except ExportUnavailableError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    
+    query = await db.run_sync(
+        DatasetService.get_export_query,
+        fields=list(selected_fields),
         group_name=group_name,
         data_type=data_type,
         organ=organ,
         status=status,
-        search=search
+        search=search,
+        match_modes={"group_name": group_name_match, "data_type": data_type_match, "organ": organ_match}
     )
-    
-    return DatasetListSchema(
-        datasets=datasets,
-        total_count=total_count,
-        skip=skip,
-        limit=limit
+    # yield_per로 서버 측 커서에서 EXPORT_BATCH_SIZE 행씩 가져옴
+    result = await db.stream(query.statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    return StreamingResponse(
+        iter_export(result.partitions(), encoder),
+        media_type=encoder.media_type,
+        headers={"Content-Disposition": f'attachment; filename="datasets.{encoder.extension}"'}
     )
 
 @router.get("/{public_dataset_id}", response_model=DatasetSchema)
-def get_dataset_by_public_id(
+async def get_dataset_by_public_id(
     public_dataset_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Public ID로 특정 데이터셋의 정보를 조회합니다.
     """
-    dataset = DatasetService.get_dataset_by_public_id(db=db, public_dataset_id=public_dataset_id)
-    if not dataset:
-        raise HTTPException(status_code=404, detail="Dataset not found")
-    return dataset
+    # 조건부 GET일 때만 본문을 읽기 전에 (dataset_id, updated_at)으로 변경 여부를 판단
+    if is_conditional(request):
+        freshness = await db.run_sync(DatasetService.get_dataset_freshness, public_dataset_id=public_dataset_id)
+        if freshness is None:
+            raise HTTPException(status_code=404, detail="Dataset not found")
+        etag = make_etag("datasets:detail", *freshness)
+        if is_not_modified(request, etag, freshness[1]):
+            return not_modified_response(etag, freshness[1])
+    
+    def load_entry(session: Session) -> tuple:
+        dataset = DatasetService.get_dataset_by_public_id(db=session, public_dataset_id=public_dataset_id)
+        if not dataset:
+            raise HTTPException(status_code=404, detail="Dataset not found")
+        return DatasetSchema.model_validate(dataset), dataset.dataset_id, dataset.updated_at
+    
+    # 본문과 검증자를 같은 행에서 읽어 함께 캐시하므로 ETag가 항상 캐시된 본문과 일치
+    body, dataset_id, last_modified = await catalog_cache.aget_or_set(
+        "datasets:detail", public_dataset_id, lambda: db.run_sync(load_entry)
+    )
+    etag = make_etag("datasets:detail", dataset_id, last_modified)
+    response.headers.update(validator_headers(etag, last_modified))
+    return body
 
 @router.get("/internal/{dataset_id}", response_model=DatasetSchema)
-def get_dataset_by_internal_id(
+async def get_dataset_by_internal_id(
     dataset_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     내부 ID로 특정 데이터셋의 정보를 조회합니다.
     """
-    dataset = DatasetService.get_dataset_by_id(db=db, dataset_id=dataset_id)
+    dataset = await db.run_sync(DatasetService.get_dataset_by_id, dataset_id=dataset_id)
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     return dataset
 
-@router.get("/{public_dataset_id}/download/{file_name}")
-def download_dataset_file(
+@router.api_route("/{public_dataset_id}/download/{file_name}", methods=["GET", "HEAD"])
+async def download_dataset_file(
     public_dataset_id: str,
     file_name: str,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """
     특정 데이터셋의 파일을 다운로드합니다.
+    
+    Range/If-Range 요청으로 이어받기와 병렬 분할 다운로드를 지원하며,
+    ETag/Last-Modified 기반 조건부 요청에는 304로 응답합니다.
     """
     # 데이터셋 존재 확인
-    dataset = DatasetService.get_dataset_by_public_id(db=db, public_dataset_id=public_dataset_id)
+    dataset = await db.run_sync(DatasetService.get_dataset_by_public_id, public_dataset_id=public_dataset_id)
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     
-    # 파일 경로 구성
-    file_path = os.path.join(dataset.file_storage_path, file_name)
+    if not dataset.file_storage_path:
+        raise HTTPException(status_code=404, detail="File not found")
     
-    # 파일 존재 확인 (현재는 mock)
-    if not os.path.exists(file_path):
-        # Mock response for development
-        return {
-            "message": f"Request to download {file_name} for dataset {public_dataset_id} received.", 
-            "status": "mocked",
-            "file_path": file_path,
-            "user_authenticated": current_user is not None
-        }
-    
-    # 실제 파일 서빙 (프로덕션에서 활성화)
-    # return FileResponse(
-    #     path=file_path, 
-    #     filename=file_name, 
-    #     media_type='application/octet-stream'
-    # )
+    # 경로 탈출(../, 절대 경로, 심볼릭 링크) 차단
+    file_path = safe_join(dataset.file_storage_path, file_name)
+    if file_path is None:
+        raise HTTPException(status_code=400, detail="Invalid file name")
+    
+    try:
+        return await file_download_response(request, file_path, download_name=file_name)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
 
 @router.get("/statistics/summary")
-def get_public_statistics(db: Session = Depends(get_db)):
+async def get_public_statistics(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     공개 데이터셋 통계를 반환합니다.
     """
-    stats = DatasetService.get_dataset_statistics(db=db)
-    # 민감하지 않은 정보만 공개
-    return {
-        "total_datasets": stats["total_datasets"],
-        "by_data_type": stats["by_data_type"],
-        "by_organ": stats["by_organ"],
-        "by_status": stats["by_status"]
-    }
+    freshness = None
+    if is_conditional(request):
+        freshness = await db.run_sync(DatasetService.get_datasets_freshness)
+        etag = make_etag("datasets:statistics", *freshness)
+        if is_not_modified(request, etag, freshness[0]):
+            return not_modified_response(etag, freshness[0])
+    
+    def load_statistics(session: Session) -> tuple:
+        last_modified, row_count = freshness or DatasetService.get_datasets_freshness(session)
+        stats = DatasetService.get_dataset_statistics(db=session)
+        # 민감하지 않은 정보만 공개
+        return {
+            "total_datasets": stats["total_datasets"],
+            "by_data_type": stats["by_data_type"],
+            "by_organ": stats["by_organ"],
+            "by_status": stats["by_status"]
+        }, last_modified, row_count
+    
+    # 검증자는 통계와 함께 캐시하므로 적중 시 추가 쿼리가 없음
+    statistics, last_modified, row_count = await catalog_cache.aget_or_set(
+        "datasets:statistics", None, lambda: db.run_sync(load_statistics)
+    )
+    response.headers.update(validator_headers(make_etag("datasets:statistics", last_modified, row_count), last_modified))
+    return statistics
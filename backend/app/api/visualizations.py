@@ -1,8 +1,194 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Path, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from typing import Dict, Any, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.dependencies import get_admin_user, get_async_db
+from app.core.disk_cache import visualization_disk_cache
+from app.core.http_cache import is_not_modified, make_etag, not_modified_response, validator_headers
+from app.core.serialization import JSONBytesResponse
+from app.models.user import User
+from app.services.dataset_service import DatasetService
+from app.services.h5ad import H5adKeyError, H5adUnavailableError, find_h5ad
+from app.services.umap_tiles import MAX_ZOOM
+from app.services.upload_service import storage_dir_for
+from app.services import visualization_service
 
 router = APIRouter()
 
+# 히트맵 한 번에 요청할 수 있는 최대 유전자 수
+MAX_HEATMAP_GENES = 500
+
+async def _dataset_h5ad(db: AsyncSession, public_dataset_id: str, file_name: Optional[str]) -> str:
+    """데이터셋 디렉터리에서 .h5ad 파일 경로를 찾습니다. (file 미지정 시 이름순 첫 파일)"""
+    dataset = await db.run_sync(DatasetService.get_dataset_by_public_id, public_dataset_id=public_dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    storage_dir = storage_dir_for(dataset.public_dataset_id, dataset.file_storage_path)
+    try:
+        return await run_in_threadpool(find_h5ad, storage_dir, file_name)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid file name")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+
+async def _compute(fn, *args, **kwargs):
+    """h5ad 읽기/집계는 블로킹 작업이므로 스레드풀에서 실행하고 예외를 HTTP 오류로 변환"""
+    try:
+        return await run_in_threadpool(fn, *args, **kwargs)
+    except H5adUnavailableError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except H5adKeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.get("/cache/stats")
+async def get_visualization_cache_statistics(current_user: User = Depends(get_admin_user)):
+    """시각화 결과 디스크 캐시 통계 조회 (적중률, 절약한 바이트/계산 시간, 관리자 전용)"""
+    return visualization_disk_cache.stats()
+
+@router.get("/{public_dataset_id}/umap")
+async def get_dataset_umap(
+    public_dataset_id: str,
+    color_by: Optional[str] = Query(None, description="obs column to color cells by (e.g. cell_type, leiden)"),
+    embedding: str = Query("X_umap", description="obsm key of the 2-D embedding"),
+    file: Optional[str] = Query(None, description=".h5ad file in the dataset directory (default: first by name)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    데이터셋 .h5ad 파일의 UMAP 좌표를 반환합니다.
+    
+    obsm[embedding]과 color_by로 지정한 obs 컬럼만 읽으며 발현 행렬은 로드하지 않습니다.
+    범주형 라벨은 정수 코드(labels)와 범주 목록(categories)으로 반환합니다. (-1은 결측)
+    결과는 (파일 버전, 임베딩, color_by)별로 캐시됩니다.
+    """
+    path = await _dataset_h5ad(db, public_dataset_id, file)
+    data = await _compute(
+        visualization_service.cached_result, "umap", public_dataset_id, path, visualization_service.load_umap,
+        embedding=embedding, color_by=color_by
+    )
+    return JSONBytesResponse({
+        "chart_type": "umap",
+        "public_dataset_id": public_dataset_id,
+        "data": data,
+        "layout": {"title": "UMAP", "xaxis": {"title": f"{embedding}_1"}, "yaxis": {"title": f"{embedding}_2"}}
+    })
+
+@router.get("/{public_dataset_id}/umap/tiles")
+async def get_dataset_umap_tileset(
+    request: Request,
+    public_dataset_id: str,
+    color_by: Optional[str] = Query(None, description="obs column to color cells by"),
+    embedding: str = Query("X_umap", description="obsm key of the 2-D embedding"),
+    file: Optional[str] = Query(None, description=".h5ad file in the dataset directory (default: first by name)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    UMAP 타일 피라미드의 메타데이터(좌표 범위, 최대 줌, 타일당 점 예산, 범주 목록)를 반환합니다.
+    """
+    path = await _dataset_h5ad(db, public_dataset_id, file)
+    source, index = await _compute(visualization_service.get_tile_index, path, embedding=embedding, color_by=color_by)
+    etag = make_etag("umap-tiles", source)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    return JSONBytesResponse({"public_dataset_id": public_dataset_id, "embedding": embedding, **index.summary()},
+                             headers=validator_headers(etag))
+
+@router.get("/{public_dataset_id}/umap/tiles/{z}/{x}/{y}")
+async def get_dataset_umap_tile(
+    request: Request,
+    public_dataset_id: str,
+    z: int = Path(..., ge=0, le=MAX_ZOOM, description="Zoom level (2^z x 2^z tiles)"),
+    x: int = Path(..., ge=0, description="Tile column, from the minimum x"),
+    y: int = Path(..., ge=0, description="Tile row, from the minimum y"),
+    color_by: Optional[str] = Query(None, description="obs column to color cells by"),
+    embedding: str = Query("X_umap", description="obsm key of the 2-D embedding"),
+    file: Optional[str] = Query(None, description=".h5ad file in the dataset directory (default: first by name)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    UMAP 타일 하나를 반환합니다.
+    
+    타일의 세포 수가 예산 이하이면 원본 점(mode=points)을, 그보다 많으면
+    bin별 개수와 대표 범주/평균값(mode=density)을 반환합니다.
+    응답 크기는 전체 세포 수와 관계없이 타일당 예산으로 제한됩니다.
+    공간 인덱스는 (파일 크기/수정 시각, 임베딩, 색상 컬럼)별로 한 번만 생성해 재사용합니다.
+    """
+    if x >= 1 << z or y >= 1 << z:
+        raise HTTPException(status_code=404, detail="Tile not found")
+    path = await _dataset_h5ad(db, public_dataset_id, file)
+    source, index = await _compute(visualization_service.get_tile_index, path, embedding=embedding, color_by=color_by)
+    etag = make_etag("umap-tile", source, z, x, y)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    tile = await run_in_threadpool(index.tile, z, x, y)
+    return JSONBytesResponse(tile, headers=validator_headers(etag))
+
+@router.get("/{public_dataset_id}/heatmap")
+async def get_dataset_heatmap(
+    public_dataset_id: str,
+    genes: str = Query(..., description="Comma-separated gene names (var index)"),
+    groupby: str = Query(..., description="Categorical obs column to group cells by (e.g. leiden)"),
+    layer: Optional[str] = Query(None, description="Matrix under layers/ to use instead of X"),
+    zscore: bool = Query(False, description="Standardize each gene across groups"),
+    cluster_genes: bool = Query(False, description="Order genes by hierarchical clustering"),
+    cluster_groups: bool = Query(False, description="Order groups by hierarchical clustering"),
+    file: Optional[str] = Query(None, description=".h5ad file in the dataset directory (default: first by name)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    유전자 x 그룹 히트맵(평균 발현량, 발현 세포 비율)을 반환합니다.
+    
+    요청한 유전자 컬럼만 읽어 희소 행렬 곱으로 그룹별 집계를 계산합니다.
+    values는 zscore 적용 여부에 따른 표시용 값이며, mean/fraction은 원본 집계값입니다.
+    """
+    gene_list = list(dict.fromkeys(g.strip() for g in genes.split(",") if g.strip()))
+    if not gene_list:
+        raise HTTPException(status_code=400, detail="At least one gene is required")
+    if len(gene_list) > MAX_HEATMAP_GENES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_HEATMAP_GENES} genes can be requested")
+    path = await _dataset_h5ad(db, public_dataset_id, file)
+    data = await _compute(
+        visualization_service.cached_result, "heatmap", public_dataset_id, path, visualization_service.load_heatmap,
+        genes=gene_list, groupby=groupby, layer=layer,
+        zscore=zscore, cluster_genes=cluster_genes, cluster_groups=cluster_groups
+    )
+    return JSONBytesResponse({
+        "chart_type": "heatmap",
+        "public_dataset_id": public_dataset_id,
+        "data": data,
+        "layout": {"title": "Heatmap", "xaxis": {"title": groupby}, "yaxis": {"title": "Gene"}}
+    })
+
+@router.get("/{public_dataset_id}/boxplot")
+async def get_dataset_boxplot(
+    public_dataset_id: str,
+    gene: str = Query(..., description="Gene name (var index)"),
+    groupby: str = Query(..., description="Categorical obs column to group cells by (e.g. cell_type)"),
+    layer: Optional[str] = Query(None, description="Matrix under layers/ to use instead of X"),
+    kde: bool = Query(False, description="Include per-group KDE curves for violin plots"),
+    file: Optional[str] = Query(None, description=".h5ad file in the dataset directory (default: first by name)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    그룹별 발현량 분포 요약(사분위수, 수염, 이상치 샘플, 선택적 KDE)을 반환합니다.
+    
+    세포별 원본 값 대신 서버에서 계산한 요약만 보내므로 세포 수와 관계없이 응답이 수 KB입니다.
+    결과는 (파일 버전, 유전자, groupby)별로 캐시됩니다.
+    """
+    path = await _dataset_h5ad(db, public_dataset_id, file)
+    data = await _compute(
+        visualization_service.cached_result, "boxplot", public_dataset_id, path, visualization_service.load_boxplot,
+        gene=gene, groupby=groupby, layer=layer, kde=kde
+    )
+    return JSONBytesResponse({
+        "chart_type": "boxplot",
+        "public_dataset_id": public_dataset_id,
+        "data": data,
+        "layout": {"title": f"{gene} by {groupby}", "xaxis": {"title": groupby}, "yaxis": {"title": gene}}
+    })
+
 @router.get("/{chart_type}")
 async def get_visualization(chart_type: str) -> Dict[str, Any]:
     """시각화 데이터 조회"""
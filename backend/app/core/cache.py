@@ -0,0 +1,140 @@
+"""
+In-process response cache for catalog reads
+
+Catalog reads vastly outnumber admin writes, so list/detail/statistics
+responses are memoized per worker process. Entries are keyed by the
+normalized request parameters together with a catalog version counter;
+admin writes bump the version, which makes every older entry unreachable.
+The TTL bounds staleness for writes made through another worker.
+
+The same cache class backs the token -> principal cache used by the auth
+dependencies, which is invalidated whenever a user row changes, and the
+UMAP tile indexes and chart summaries, which are keyed by the source
+file's size and mtime.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.core.config import settings
+
+
+class TTLCache:
+    """Thread-safe, size-bounded LRU cache whose entries expire after a TTL"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get_or_set(self, namespace: str, params: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for (namespace, params) or compute and store it.
+        
+        factory runs outside the lock, so concurrent misses may compute the
+        same entry twice; the last one wins, which is harmless for reads.
+        """
+        if not self.enabled:
+            return factory()
+        found, value, version, key = self._lookup(namespace, params)
+        if found:
+            return value
+        value = factory()
+        self._store(version, key, value)
+        return value
+
+    async def aget_or_set(self, namespace: str, params: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """get_or_set for async endpoints; factory returns an awaitable"""
+        if not self.enabled:
+            return await factory()
+        found, value, version, key = self._lookup(namespace, params)
+        if found:
+            return value
+        value = await factory()
+        self._store(version, key, value)
+        return value
+
+    def _lookup(self, namespace: str, params: Hashable) -> tuple:
+        """(found, value, version, key) for the current catalog version"""
+        with self._lock:
+            version = self.version
+            key = (version, namespace, params)
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return True, value, version, key
+                del self._data[key]
+                self.expirations += 1
+            self.misses += 1
+            return False, None, version, key
+
+    def _store(self, version: int, key: Hashable, value: Any) -> None:
+        with self._lock:
+            # Don't store results computed against a catalog that changed meanwhile
+            if version == self.version:
+                self._data[key] = (value, time.monotonic() + self.ttl)
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+
+    def invalidate(self) -> None:
+        """Bump the catalog version and drop every cached entry"""
+        with self._lock:
+            self.version += 1
+            self.invalidations += 1
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "version": self.version,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+catalog_cache = TTLCache(
+    maxsize=settings.CATALOG_CACHE_SIZE,
+    ttl=settings.CATALOG_CACHE_TTL_SECONDS,
+)
+
+principal_cache = TTLCache(
+    maxsize=settings.AUTH_CACHE_SIZE,
+    ttl=settings.AUTH_CACHE_TTL_SECONDS,
+)
+
+tile_index_cache = TTLCache(
+    maxsize=settings.TILE_INDEX_CACHE_SIZE,
+    ttl=settings.TILE_INDEX_CACHE_TTL_SECONDS,
+)
+
+visualization_cache = TTLCache(
+    maxsize=settings.VISUALIZATION_CACHE_SIZE,
+    ttl=settings.VISUALIZATION_CACHE_TTL_SECONDS,
+)
@@ -36,10 +36,54 @@ class Settings(BaseSettings):
     def DATABASE_URL(self) -> str:
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+
+    # 커넥션 풀 설정 (API 비동기 엔진과 동기 엔진에 각각 적용)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 0  # 0이면 제한 없음
+    # PgBouncer transaction pooling 호환 모드: 앱 측 풀/prepared statement 캐시를 끄고
+    # statement_timeout을 트랜잭션마다 SET LOCAL로 적용
+    DB_PGBOUNCER: bool = False
+
     # JWT 설정
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # 토큰 → 사용자 캐시 (역할 변경 시 무효화, 0이면 비활성화)
+    AUTH_CACHE_SIZE: int = 4096
+    AUTH_CACHE_TTL_SECONDS: float = 60.0
+    # bcrypt 해싱/검증 전용 워커 수 (이벤트 루프 블로킹 방지)
+    PASSWORD_HASH_WORKERS: int = 4
+
+    # 카탈로그 응답 캐시 (프로세스 내 LRU, 0이면 비활성화)
+    CATALOG_CACHE_SIZE: int = 1024
+    CATALOG_CACHE_TTL_SECONDS: float = 60.0
+
+    # 응답 압축 최소 크기 (bytes, 이보다 작은 응답은 압축하지 않음)
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+
+    # 데이터셋 파일 저장 루트 (file_storage_path가 없는 데이터셋은 {루트}/{public_dataset_id}에 업로드)
+    DATASET_STORAGE_ROOT: str = "/data"
+
+    # UMAP 타일 인덱스 캐시 (데이터셋 파일/임베딩/색상 컬럼별, 0이면 비활성화)
+    TILE_INDEX_CACHE_SIZE: int = 8
+    TILE_INDEX_CACHE_TTL_SECONDS: float = 3600.0
+
+    # 시각화 요약 결과 캐시 (boxplot 등, 데이터셋 파일/파라미터별, 0이면 비활성화)
+    VISUALIZATION_CACHE_SIZE: int = 256
+    VISUALIZATION_CACHE_TTL_SECONDS: float = 3600.0
+    # 시각화 결과 디스크 캐시 (내용 주소 기반 LRU, 여러 워커/재시작 간 공유, 빈 값이면 비활성화)
+    VISUALIZATION_DISK_CACHE_DIR: str = ""
+    VISUALIZATION_DISK_CACHE_MAX_BYTES: int = 1024 ** 3
+
+    # 파일 다운로드: 설정 시 nginx X-Accel-Redirect로 위임 (예: /protected-data)
+    DOWNLOAD_ACCEL_REDIRECT_PREFIX: str = ""
 
     # 관리자 계정
     ADMIN_USERNAME: str = "admin"
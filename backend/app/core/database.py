@@ -5,16 +5,62 @@
 # 2. 데이터베이스 세션 팩토리
 # 3. Base 모델 클래스
 # 4. 의존성 주입용 get_db 함수
+# 5. API 요청용 비동기 엔진(asyncpg)과 get_async_db 함수
+# 6. 커넥션 풀 설정 (크기, overflow, pre-ping, recycle, statement timeout, PgBouncer 모드)
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.core.config import settings
+from app.core.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
 
-engine = create_engine(settings.DATABASE_URL)
+def _engine_options(async_driver: bool) -> dict:
+    """Settings 기반 엔진/풀 옵션"""
+    if settings.DB_PGBOUNCER:
+        # PgBouncer가 풀링을 담당하고, 트랜잭션마다 서버 커넥션이 바뀔 수 있으므로
+        # 앱 측 풀과 asyncpg prepared statement 캐시를 사용하지 않음
+        options = {"poolclass": NullPool}
+        if async_driver:
+            options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+        return options
+
+    options = {
+        "poolclass": InstrumentedAsyncQueuePool if async_driver else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        # 커넥션 시작 파라미터로 세션 전체에 적용
+        if async_driver:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+def _set_local_statement_timeout(connection) -> None:
+    # PgBouncer는 시작 파라미터를 전달하지 않으므로 트랜잭션 단위로 설정
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.DB_STATEMENT_TIMEOUT_MS)}")
+
+# 동기 엔진: 시작 시 초기화, 시드/벤치마크 스크립트용
+engine = create_engine(settings.DATABASE_URL, **_engine_options(async_driver=False))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# 비동기 엔진: API 엔드포인트용. 쿼리 대기 중에도 이벤트 루프를 막지 않음
+async_engine = create_async_engine(settings.ASYNC_DATABASE_URL, **_engine_options(async_driver=True))
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+if settings.DB_PGBOUNCER and settings.DB_STATEMENT_TIMEOUT_MS:
+    event.listen(engine, "begin", _set_local_statement_timeout)
+    event.listen(async_engine.sync_engine, "begin", _set_local_statement_timeout)
+
+# 세션은 첫 쿼리 시점에 커넥션을 체크아웃하고 close 시 반환하므로,
+# DB를 사용하지 않는 요청은 커넥션을 점유하지 않습니다.
 def get_db():
     """데이터베이스 세션 의존성"""
     db = SessionLocal()
@@ -22,3 +68,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """비동기 데이터베이스 세션 의존성"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -2,29 +2,61 @@
 Common dependencies for FastAPI endpoints
 """
 
-from typing import Generator, Optional
+import time
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 
-from app.core.database import SessionLocal
+# 세션 팩토리/의존성은 core.database 하나만 사용
+from app.core.database import get_async_db
+from app.core.cache import principal_cache
 from app.core.config import settings
 from app.models.user import User
 
 # Security scheme
 security = HTTPBearer()
 
-def get_db() -> Generator[Session, None, None]:
-    """Database dependency"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def _resolve_user(db: AsyncSession, token: str) -> Optional[User]:
+    """
+    Map a bearer token to its user, caching the result per token.
+    
+    Cached principals are detached snapshots, so requests that hit the cache
+    skip both JWT decoding and the users query. The token's own expiry is
+    still enforced on every hit. Raises JWTError for invalid tokens, which
+    are never cached.
+    """
+    async def load() -> tuple:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        username: str = payload.get("sub")
+        user = None
+        if username is not None:
+            user = await db.scalar(select(User).where(User.username == username))
+            if user is not None:
+                db.expunge(user)
+        return user, payload.get("exp")
+
+    user, expires_at = await principal_cache.aget_or_set("token", token, load)
+    if expires_at is not None and expires_at <= time.time():
+        raise JWTError("Signature has expired.")
+    return user
 
-def get_current_user(
-    db: Session = Depends(get_db),
+# 계정이 추가·삭제되거나 역할/사용자명이 바뀌면 캐시된 토큰 매핑을 모두 폐기
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_delete")
+def _invalidate_principals(mapper, connection, target: User) -> None:
+    principal_cache.invalidate()
+
+@event.listens_for(User, "after_update")
+def _invalidate_principals_on_change(mapper, connection, target: User) -> None:
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ("role", "username")):
+        principal_cache.invalidate()
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_async_db),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> User:
     """Get current authenticated user from JWT token"""
@@ -33,23 +65,18 @@ def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
+        user = await _resolve_user(db, credentials.credentials)
     except JWTError:
         raise credentials_exception
-    
-    user = db.query(User).filter(User.username == username).first()
+
     if user is None:
         raise credentials_exception
-    
+
     return user
 
-def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
     """Dependency to ensure current user is admin"""
     if current_user.role != "admin":
         raise HTTPException(
@@ -59,8 +86,8 @@ def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
     return current_user
 
 # Optional authentication - doesn't require token
-def get_current_user_optional(
-    db: Session = Depends(get_db),
+async def get_current_user_optional(
+    db: AsyncSession = Depends(get_async_db),
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(
         HTTPBearer(auto_error=False)
     )
@@ -68,15 +95,8 @@ def get_current_user_optional(
     """Get current user if token is provided, None otherwise"""
     if not credentials:
         return None
-    
+
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        
-        user = db.query(User).filter(User.username == username).first()
-        return user
+        return await _resolve_user(db, credentials.credentials)
     except JWTError:
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,328 @@
+"""
+Content-addressed on-disk cache for computed results
+
+Entries are named by the SHA-256 of their canonical key (namespace plus
+JSON-normalized parameters), so equal requests map to the same file from
+any worker process and across restarts. Callers put whatever identifies
+the inputs in the key - for chart results, the source file's size and
+mtime - so a changed input simply addresses a different entry and stale
+ones age out through LRU eviction.
+
+Values are nested dicts/lists of JSON scalars and NumPy arrays, stored as
+
+    MAGIC | u32 header length | header | array buffers      (zlib-compressed)
+
+where the header is the value's structure as JSON with each array replaced
+by a reference into the buffer table, so arrays are read back with
+np.frombuffer instead of being parsed.
+
+The total size is bounded by max_bytes. Each process keeps an LRU index of
+the directory (seeded from file mtimes, which hits refresh), so eviction
+order survives restarts; with several workers the bound is approximate and
+an entry evicted by another worker is just a miss.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, List, Tuple
+
+import numpy as np
+import orjson
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"KMVR\x01"
+SUFFIX = ".kmv"
+TEMP_SUFFIX = ".tmp"
+# Temp files younger than this may belong to a write in progress in another worker
+TEMP_GRACE_SECONDS = 3600
+COMPRESSION_LEVEL = 1
+_ARRAY_KEY = "__ndarray__"
+_ALIGNMENT = 8
+_SHARD = re.compile(r"[0-9a-f]{2}")
+_ENTRY = re.compile(r"[0-9a-f]{64}" + re.escape(SUFFIX))
+
+
+def cache_key(namespace: str, params: Any) -> str:
+    """Hex SHA-256 of the namespace and parameters (dict keys sorted)"""
+    canonical = orjson.dumps([namespace, params], option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return hashlib.sha256(canonical).hexdigest()
+
+
+def encode(value: Any, compute_seconds: float = 0.0) -> bytes:
+    """Serialize a value (and how long it took to compute) to the binary entry format"""
+    buffers: List[bytes] = []
+    table: List[list] = []
+    offset = 0
+
+    def walk(node: Any) -> Any:
+        nonlocal offset
+        if isinstance(node, np.ndarray):
+            if node.dtype.hasobject:
+                return walk(node.tolist())
+            data = np.ascontiguousarray(node).tobytes()
+            padding = -len(data) % _ALIGNMENT
+            buffers.append(data + b"\0" * padding)
+            table.append([node.dtype.str, list(node.shape), offset])
+            offset += len(data) + padding
+            return {_ARRAY_KEY: len(table) - 1}
+        if isinstance(node, dict):
+            return {key: walk(item) for key, item in node.items()}
+        if isinstance(node, (list, tuple)):
+            return [walk(item) for item in node]
+        if isinstance(node, np.generic):
+            return node.item()
+        return node
+
+    header = orjson.dumps({"tree": walk(value), "arrays": table, "compute_seconds": compute_seconds})
+    payload = b"".join([struct.pack("<I", len(header)), header, *buffers])
+    return MAGIC + zlib.compress(payload, COMPRESSION_LEVEL)
+
+
+def decode(entry: bytes) -> Tuple[Any, int, float]:
+    """
+    Inverse of encode; returns (value, uncompressed size, compute seconds).
+    Raises ValueError on a malformed entry.
+    """
+    if not entry.startswith(MAGIC):
+        raise ValueError("not a cache entry")
+    try:
+        payload = zlib.decompress(entry[len(MAGIC):])
+    except zlib.error as e:
+        raise ValueError(f"corrupt cache entry: {e}")
+    (header_length,) = struct.unpack_from("<I", payload)
+    body_start = 4 + header_length
+    header = orjson.loads(payload[4:body_start])
+    arrays = []
+    for dtype, shape, offset in header["arrays"]:
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape, dtype=np.int64))
+        arrays.append(np.frombuffer(payload, dtype=dtype, count=count, offset=body_start + offset).reshape(shape))
+
+    def walk(node: Any) -> Any:
+        if isinstance(node, dict):
+            if len(node) == 1 and _ARRAY_KEY in node:
+                return arrays[node[_ARRAY_KEY]]
+            return {key: walk(item) for key, item in node.items()}
+        if isinstance(node, list):
+            return [walk(item) for item in node]
+        return node
+
+    return walk(header["tree"]), len(payload), header["compute_seconds"]
+
+
+class DiskCache:
+    """Size-bounded LRU cache of encoded results in a directory"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.errors = 0
+        self.bytes_saved = 0
+        self.compute_seconds_saved = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory) and self.max_bytes > 0
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest + SUFFIX)
+
+    def _load_index(self) -> None:
+        """
+        Seed the LRU order from the entries already on disk (oldest mtime first).
+
+        Only the two-hex-digit shard directories this cache writes are
+        scanned, and the only files ever removed are its own temp files left
+        by interrupted writes, once they are older than TEMP_GRACE_SECONDS
+        (younger ones may still be in flight in another worker).
+        """
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            shards = [name for name in os.listdir(self.directory) if _SHARD.fullmatch(name)]
+        except OSError:
+            shards = []
+        stale_before = time.time() - TEMP_GRACE_SECONDS
+        entries = []
+        for shard in shards:
+            shard_dir = os.path.join(self.directory, shard)
+            try:
+                names = os.listdir(shard_dir)
+            except OSError:
+                continue
+            for name in names:
+                path = os.path.join(shard_dir, name)
+                try:
+                    if _ENTRY.fullmatch(name) and name.startswith(shard):
+                        stat_result = os.stat(path)
+                        entries.append((stat_result.st_mtime_ns, name[:-len(SUFFIX)], stat_result.st_size))
+                    elif name.endswith(TEMP_SUFFIX) and os.stat(path).st_mtime < stale_before:
+                        os.unlink(path)
+                except OSError:
+                    continue
+        for _, digest, size in sorted(entries):
+            self._index[digest] = size
+            self._total += size
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and self._index:
+            digest, size = self._index.popitem(last=False)
+            self._total -= size
+            self.evictions += 1
+            try:
+                os.unlink(self._path(digest))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not evict cache entry {digest}: {e}")
+
+    def _forget(self, digest: str) -> None:
+        size = self._index.pop(digest, None)
+        if size is not None:
+            self._total -= size
+
+    def get_or_set(self, namespace: str, params: Any, factory: Callable[[], Any]) -> Any:
+        """
+        Return the stored value for (namespace, params) or compute, store and return it.
+
+        Exceptions from factory propagate and nothing is stored. Cache I/O
+        errors never fail the request: they are logged, counted and the value
+        is computed as if the cache were disabled.
+        """
+        if not self.enabled:
+            return factory()
+        digest = cache_key(namespace, params)
+        path = self._path(digest)
+        with self._lock:
+            self._load_index()
+
+        try:
+            with open(path, "rb") as file:
+                entry = file.read()
+            value, raw_size, compute_seconds = decode(entry)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            logger.warning(f"Dropping unreadable cache entry {path}: {e}")
+            with self._lock:
+                self.errors += 1
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        else:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            with self._lock:
+                if digest not in self._index:
+                    # Written by another worker since we scanned the directory
+                    self._total += len(entry)
+                self._index[digest] = len(entry)
+                self._index.move_to_end(digest)
+                self.hits += 1
+                self.bytes_saved += raw_size
+                self.compute_seconds_saved += compute_seconds
+            return value
+
+        with self._lock:
+            self._forget(digest)
+            self.misses += 1
+        started = time.perf_counter()
+        value = factory()
+        elapsed = time.perf_counter() - started
+        self._store(digest, path, value, elapsed)
+        return value
+
+    def _store(self, digest: str, path: str, value: Any, compute_seconds: float) -> None:
+        try:
+            entry = encode(value, compute_seconds)
+        except (TypeError, orjson.JSONEncodeError) as e:
+            logger.warning(f"Result for cache entry {digest} is not storable: {e}")
+            with self._lock:
+                self.errors += 1
+            return
+        if len(entry) > self.max_bytes:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=TEMP_SUFFIX)
+            try:
+                with os.fdopen(descriptor, "wb") as file:
+                    file.write(entry)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {path}: {e}")
+            with self._lock:
+                self.errors += 1
+            return
+        with self._lock:
+            self._forget(digest)
+            self._index[digest] = len(entry)
+            self._total += len(entry)
+            self.stores += 1
+            self._evict()
+
+    def clear(self) -> None:
+        """Delete every entry"""
+        with self._lock:
+            self._load_index()
+            while self._index:
+                digest, _ = self._index.popitem()
+                try:
+                    os.unlink(self._path(digest))
+                except OSError:
+                    pass
+            self._total = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            if self.enabled:
+                self._load_index()
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "directory": self.directory,
+                "entries": len(self._index),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "errors": self.errors,
+                "bytes_saved": self.bytes_saved,
+                "compute_seconds_saved": self.compute_seconds_saved,
+            }
+
+
+visualization_disk_cache = DiskCache(
+    directory=settings.VISUALIZATION_DISK_CACHE_DIR,
+    max_bytes=settings.VISUALIZATION_DISK_CACHE_MAX_BYTES,
+)
@@ -0,0 +1,202 @@
+"""
+Dataset file serving with HTTP Range support
+
+Dataset files are multi-GB (.h5ad, .bam, fragments.tsv.gz), so downloads
+must be resumable and splittable across parallel connections. A single
+byte range per request is honoured (If-Range guarded); multi-range
+requests fall back to the full body, which RFC 9110 permits.
+
+Bodies go out through the ASGI zero-copy send extension (kernel sendfile)
+when the server offers it, and otherwise in large chunks read off the event
+loop. With DOWNLOAD_ACCEL_REDIRECT_PREFIX set, the response is handed to
+nginx via X-Accel-Redirect instead, which then serves ranges with sendfile.
+"""
+
+import os
+import stat
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from fastapi import Request, Response
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.http_cache import format_http_date, is_not_modified, make_etag, not_modified_response
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+ZERO_COPY_EXTENSION = "http.response.zerocopysend"
+
+
+def safe_join(directory: str, file_name: str) -> Optional[str]:
+    """
+    Resolve file_name inside directory, or None if it would escape it.
+
+    Only plain file names are accepted; separators, '..', NUL bytes and
+    symlinks pointing outside the directory are all rejected.
+    """
+    if (
+        not file_name
+        or file_name in (".", "..")
+        or "\x00" in file_name
+        or "/" in file_name
+        or "\\" in file_name
+        or os.path.isabs(file_name)
+    ):
+        return None
+    root = os.path.realpath(directory)
+    path = os.path.realpath(os.path.join(root, file_name))
+    if os.path.dirname(path) != root:
+        return None
+    return path
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    return make_etag("file", stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns)
+
+
+class RangeNotSatisfiable(ValueError):
+    """The requested range lies entirely outside the file (416)"""
+
+
+def parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single 'bytes=' range into an inclusive (start, end) pair.
+
+    Returns None when the header should be ignored (malformed or multi-range).
+    Raises RangeNotSatisfiable when no byte of the file is selected.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = (part.strip() for part in spec.partition("-"))
+    if not sep or not (first.isdigit() or first == "") or not (last.isdigit() or last == ""):
+        return None
+
+    if first == "":
+        if last == "":
+            return None
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(size - suffix, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(request: Request, etag: str, last_modified: datetime) -> bool:
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith(("\"", "W/")):
+        # Weak validators never match for If-Range
+        return if_range == etag
+    try:
+        since = parsedate_to_datetime(if_range)
+    except (TypeError, ValueError):
+        return False
+    return since.tzinfo is not None and last_modified.replace(microsecond=0) == since.astimezone(timezone.utc)
+
+
+class RangeFileResponse(Response):
+    """Streams [offset, offset + count) of a file, zero-copy when the server allows"""
+
+    def __init__(self, path: str, offset: int, count: int, status_code: int, headers: dict, head_only: bool = False):
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.offset = offset
+        self.count = count
+        self.head_only = head_only
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.head_only or self.count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            if ZERO_COPY_EXTENSION in scope.get("extensions", {}):
+                await send({
+                    "type": ZERO_COPY_EXTENSION,
+                    "file": file.wrapped.fileno(),
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+                return
+            await file.seek(self.offset)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await file.read(min(DOWNLOAD_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # File shrank underneath us; end the response rather than hang
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+async def file_download_response(
+    request: Request,
+    path: str,
+    download_name: str
+) -> Response:
+    """
+    Build the download response for an existing regular file.
+
+    Handles If-None-Match/If-Modified-Since (304), Range/If-Range (206/416)
+    and HEAD. With X-Accel-Redirect, the prefix is expected to map to the
+    filesystem root (nginx: internal location with `alias /;`).
+    """
+    stat_result = await anyio.to_thread.run_sync(os.stat, path)
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise FileNotFoundError(path)
+
+    size = stat_result.st_size
+    etag = file_etag(stat_result)
+    last_modified = datetime.fromtimestamp(stat_result.st_mtime, tz=timezone.utc)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": format_http_date(last_modified),
+        "Content-Type": "application/octet-stream",
+        "Content-Disposition": f"attachment; filename*=utf-8''{quote(download_name)}",
+    }
+
+    if settings.DOWNLOAD_ACCEL_REDIRECT_PREFIX:
+        # nginx serves the body (and any Range) itself with sendfile
+        headers["X-Accel-Redirect"] = quote(f"{settings.DOWNLOAD_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{path.lstrip('/')}")
+        return Response(status_code=200, headers=headers)
+
+    start, end = 0, size - 1
+    status_code = 200
+    range_header = request.headers.get("range")
+    if range_header and _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_byte_range(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}", "Accept-Ranges": "bytes"})
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    count = end - start + 1 if size else 0
+    headers["Content-Length"] = str(count)
+    return RangeFileResponse(
+        path, offset=start, count=count, status_code=status_code, headers=headers,
+        head_only=request.method == "HEAD"
+    )
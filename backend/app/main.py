@@ -1,16 +1,14 @@
 import logging
-import csv
 import os
-from datetime import datetime
 from sqlalchemy.orm import Session
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
+from app.core.compression import CompressionMiddleware
 from app.api import datasets, admin, visualizations
 from app.core.database import SessionLocal, engine, Base
-from app.models.user import User
-from app.models.dataset import Dataset
+from app.services.catalog_loader import admin_password_configured, ensure_admin_user, load_catalog_csv
 
 # --- Database Initialization Logic ---
 
@@ -18,7 +16,7 @@ DATA_FILE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'datasets.csv')
 
 def init_db(db: Session) -> None:
     """
-    Initializes the database and creates initial data if it doesn't exist.
+    Initializes the database and loads new or changed datasets from the CSV.
     """
     logger = logging.getLogger(__name__)
     
@@ -28,43 +26,20 @@ def init_db(db: Session) -> None:
         logger.info("Tables checked/created.")
 
         # Create admin user if it doesn't exist
-        admin_user = db.query(User).filter(User.username == "admin").first()
-        if not admin_user:
-            logger.info("Admin user not found, creating one...")
-            admin_user = User(username="admin", hashed_password="fake_hashed_password", role="admin")
-            db.add(admin_user)
-            db.commit()
-            db.refresh(admin_user)
-            logger.info("Admin user created.")
-
-        # Create datasets if they don't exist
-        if db.query(Dataset).count() == 0:
-            logger.info(f"No datasets found. Reading from {DATA_FILE_PATH}...")
-            if not os.path.exists(DATA_FILE_PATH):
-                logger.error(f"Data file not found: {DATA_FILE_PATH}")
-                return
-
-            with open(DATA_FILE_PATH, mode='r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                datasets_to_create = [
-                    Dataset(
-                        public_dataset_id=row['public_dataset_id'],
-                        uploader_id=admin_user.user_id,
-                        group_name=row['group_name'],
-                        data_type=row['data_type'],
-                        organ=row['organ'],
-                        status=row['status'],
-                        publication_date=datetime.strptime(row['publication_date'], '%Y-%m-%d').date(),
-                        description=row['description'],
-                        citation=row['citation'],
-                        file_storage_path=row['file_storage_path']
-                    ) for row in reader
-                ]
-            db.add_all(datasets_to_create)
-            db.commit()
-            logger.info(f"{len(datasets_to_create)} sample datasets created from CSV.")
-        else:
-            logger.info("Datasets already exist. Skipping data creation.")
+        # 기본 ADMIN_PASSWORD 그대로면 로그인할 수 없는 계정으로 생성 (scripts/seed_db.py 또는 ADMIN_PASSWORD 설정 필요)
+        admin_user = ensure_admin_user(db, usable_password=admin_password_configured())
+
+        if not os.path.exists(DATA_FILE_PATH):
+            logger.error(f"Data file not found: {DATA_FILE_PATH}")
+            return
+
+        # 변경된 행만 upsert하므로 매 시작 시 실행해도 비용이 작음
+        stats = load_catalog_csv(db, DATA_FILE_PATH, uploader_id=admin_user.user_id)
+        logger.info(
+            f"Catalog loaded from {DATA_FILE_PATH}: {stats['inserted']} inserted, "
+            f"{stats['updated']} updated, {stats['unchanged']} unchanged, {stats['failed']} rejected "
+            f"({stats['rows_per_second']:.0f} rows/s)."
+        )
 
     except Exception as e:
         logger.error(f"An error occurred during DB initialization: {e}")
@@ -100,6 +75,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 응답 압축 (Accept-Encoding 협상: zstd/br/gzip, 다운로드 등 이미 압축된 미디어는 제외)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+
 # API Routers
 app.include_router(datasets.router, prefix=f"{settings.API_V1_STR}/datasets", tags=["Datasets"])
 app.include_router(admin.router, prefix=f"{settings.API_V1_STR}/admin", tags=["Admin"])
@@ -1,2 +1,3 @@
 from .dataset import Dataset
+from .id_counter import IdCounter
 from .user import User
\ No newline at end of file
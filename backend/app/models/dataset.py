@@ -1,8 +1,27 @@
-from sqlalchemy import Column, Integer, String, Date, Text, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, Text, TIMESTAMP, ForeignKey, Index, DDL, Sequence, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 
+# Weighted full-text document: IDs and group names are matched verbatim ('simple'),
+# free text is stemmed ('english'). Kept in sync with the Alembic migration.
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(public_dataset_id, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(group_name, '')), 'B') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'C') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(citation, '')), 'D')"
+)
+# Search input is parsed with both configs and OR-ed, so it matches the verbatim
+# ('simple') and stemmed ('english') parts of the document alike
+SEARCH_QUERY_CONFIGS = ("simple", "english")
+
+# Columns with pg_trgm GIN indexes backing prefix/fuzzy filter matching
+TRIGRAM_INDEXED_COLUMNS = ("group_name", "data_type", "organ")
+
+# Numbers auto-generated public_dataset_id values (HBMnnn.AUTO.ddd). Created by
+# create_all/migrations on Postgres only; other databases use app.models.id_counter.
+PUBLIC_ID_SEQUENCE = Sequence("public_dataset_id_seq", metadata=Base.metadata)
+
 class Dataset(Base):
     __tablename__ = "datasets"
 
@@ -17,10 +36,37 @@ class Dataset(Base):
     description = Column(Text)
     citation = Column(String(255))
     file_storage_path = Column(String(255))
+    # Fingerprint of the CSV row last written by the catalog loader
+    content_hash = Column(String(32))
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
     uploader = relationship("User", back_populates="datasets")
 
+    # (sort column, dataset_id) indexes back keyset pagination on the list endpoint
+    __table_args__ = (
+        Index("ix_datasets_group_name_dataset_id", "group_name", "dataset_id"),
+        Index("ix_datasets_data_type_dataset_id", "data_type", "dataset_id"),
+        Index("ix_datasets_organ_dataset_id", "organ", "dataset_id"),
+        Index("ix_datasets_status_dataset_id", "status", "dataset_id"),
+        Index("ix_datasets_publication_date_dataset_id", "publication_date", "dataset_id"),
+        Index("ix_datasets_created_at_dataset_id", "created_at", "dataset_id"),
+        Index("ix_datasets_updated_at_dataset_id", "updated_at", "dataset_id"),
+    )
+
     def __repr__(self):
-        return f"Dataset(dataset_id={self.dataset_id}, public_dataset_id={self.public_dataset_id})"
\ No newline at end of file
+        return f"Dataset(dataset_id={self.dataset_id}, public_dataset_id={self.public_dataset_id})"
+
+# search_vector and the trigram indexes are Postgres-only, so they are not declared on the
+# model (SQLite test databases keep the ilike fallback) and are added after CREATE TABLE instead.
+for statement in (
+    "ALTER TABLE datasets ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS ({SEARCH_VECTOR_EXPRESSION}) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_datasets_search_vector ON datasets USING gin (search_vector)",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    *(
+        f"CREATE INDEX IF NOT EXISTS ix_datasets_{column}_trgm ON datasets USING gin ({column} gin_trgm_ops)"
+        for column in TRIGRAM_INDEXED_COLUMNS
+    ),
+):
+    event.listen(Dataset.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
@@ -0,0 +1,12 @@
+from sqlalchemy import BigInteger, Column, String
+from app.core.database import Base
+
+class IdCounter(Base):
+    """Named counters emulating sequences on databases without them (SQLite)"""
+    __tablename__ = "id_counters"
+
+    name = Column(String(64), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"IdCounter(name={self.name}, value={self.value})"
@@ -1 +1,2 @@
-from .dataset import DatasetCreate, DatasetUpdate, DatasetSchema
\ No newline at end of file
+from .dataset import DatasetCreate, DatasetUpdate, DatasetSchema
+from .upload import UploadCreate, UploadComplete, UploadStatusSchema, UploadResultSchema
@@ -1,8 +1,9 @@
 
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, create_model
 from datetime import date, datetime
-from typing import List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Type
 
 class DatasetSchema(BaseModel):
     dataset_id: int
@@ -22,17 +23,50 @@ class DatasetSchema(BaseModel):
     class Config:
         from_attributes = True
 
+class FacetValueSchema(BaseModel):
+    value: Optional[str] = None
+    count: int
+
 class DatasetListSchema(BaseModel):
     datasets: List[DatasetSchema]
     total_count: Optional[int] = None
+    count_mode: Optional[str] = None
     skip: Optional[int] = None
     limit: Optional[int] = None
+    cursor: Optional[str] = None
+    next_cursor: Optional[str] = None
+    facets: Optional[Dict[str, List[FacetValueSchema]]] = None
+
+DATASET_FIELDS = tuple(DatasetSchema.model_fields)
+# List responses leave out the unbounded description text unless it is requested
+LIST_DEFAULT_FIELDS = tuple(field for field in DATASET_FIELDS if field != "description")
+
+@lru_cache(maxsize=64)
+def dataset_list_schema(fields: Tuple[str, ...]) -> Type[DatasetListSchema]:
+    """
+    List response schema whose items carry only the given DatasetSchema fields.
+    
+    Schemas are built once per field set; the full field set maps to DatasetListSchema.
+    """
+    if fields == DATASET_FIELDS:
+        return DatasetListSchema
+    item_schema = create_model(
+        "DatasetFieldsSchema",
+        __config__=ConfigDict(from_attributes=True),
+        **{field: (DatasetSchema.model_fields[field].annotation, DatasetSchema.model_fields[field]) for field in fields}
+    )
+    return create_model(
+        "DatasetFieldsListSchema",
+        __base__=DatasetListSchema,
+        datasets=(List[item_schema], ...)
+    )
 
 class DatasetCreate(BaseModel):
-    public_dataset_id: str = Field(..., description="공개 데이터셋 ID (예: HBM123.ABCD.456)")
+    public_dataset_id: Optional[str] = Field(None, description="공개 데이터셋 ID (예: HBM123.ABCD.456, 생략 시 자동 발급)")
     group_name: Optional[str] = None
     data_type: Optional[str] = None
     organ: Optional[str] = None
+    status: Optional[str] = None
     description: Optional[str] = None
     citation: Optional[str] = None
     file_storage_path: Optional[str] = None
@@ -46,3 +80,29 @@ class DatasetUpdate(BaseModel):
     publication_date: Optional[date] = None
     description: Optional[str] = None
     citation: Optional[str] = None
+
+class DatasetUpsert(BaseModel):
+    """One row of a bulk import; lengths mirror the datasets columns"""
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+
+    public_dataset_id: str = Field(..., min_length=1, max_length=255)
+    group_name: Optional[str] = Field(None, max_length=255)
+    data_type: Optional[str] = Field(None, max_length=100)
+    organ: Optional[str] = Field(None, max_length=100)
+    status: Optional[str] = Field(None, max_length=50)
+    publication_date: Optional[date] = None
+    description: Optional[str] = None
+    citation: Optional[str] = Field(None, max_length=255)
+    file_storage_path: Optional[str] = Field(None, max_length=255)
+
+class BulkRowErrorSchema(BaseModel):
+    line: int
+    public_dataset_id: Optional[str] = None
+    error: str
+
+class DatasetBulkResultSchema(BaseModel):
+    received: int
+    upserted: int
+    failed: int
+    errors: List[BulkRowErrorSchema]
+    errors_truncated: bool = False
@@ -0,0 +1,31 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Optional
+
+class UploadCreate(BaseModel):
+    file_name: str = Field(..., description="저장할 파일 이름 (경로 구분자 불가)")
+    size: int = Field(..., ge=0, description="전체 파일 크기 (bytes)")
+    chunk_size: int = Field(8 * 1024 * 1024, ge=256 * 1024, le=256 * 1024 * 1024, description="청크 크기 (bytes, 마지막 청크 제외)")
+    sha256: Optional[str] = Field(None, pattern="^[0-9a-fA-F]{64}$", description="전체 파일 SHA-256 (완료 시 검증)")
+
+class UploadComplete(BaseModel):
+    sha256: Optional[str] = Field(None, pattern="^[0-9a-fA-F]{64}$", description="생성 시 지정하지 않았다면 여기서 지정")
+
+class UploadStatusSchema(BaseModel):
+    upload_id: str
+    public_dataset_id: str
+    file_name: str
+    size: int
+    chunk_size: int
+    total_chunks: int
+    received_chunks: int
+    missing_chunks: List[int]
+    offset: int = Field(..., description="처음부터 연속으로 수신된 바이트 수 (순차 업로드 재개 지점)")
+    created_at: datetime
+
+class UploadResultSchema(BaseModel):
+    public_dataset_id: str
+    file_name: str
+    file_path: str
+    size: int
+    sha256: str
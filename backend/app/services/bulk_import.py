@@ -0,0 +1,252 @@
+"""
+Streaming bulk import of dataset records
+
+Request bodies are parsed incrementally (NDJSON or CSV), validated row by
+row and upserted in fixed-size chunks, so memory stays bounded by the chunk
+size rather than by the size of the upload. Bad rows are reported with
+their line number and never abort the rest of the import.
+"""
+
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.schemas.dataset import DatasetUpsert
+from app.services.dataset_service import DatasetService
+
+BULK_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+# Longest physical line buffered before the upload is rejected
+MAX_LINE_CHARS = 1024 * 1024
+# Longest CSV record (quoted fields may span lines) buffered before the upload is rejected
+MAX_CSV_RECORD_CHARS = 1024 * 1024
+UPSERT_FIELDS = tuple(DatasetUpsert.model_fields)
+
+# (line number, parsed record or None, error message or None)
+Record = Tuple[int, Optional[dict], Optional[str]]
+
+
+class BulkImportError(ValueError):
+    """The payload as a whole cannot be imported (bad encoding or CSV header)"""
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """
+    Split a byte stream into (line number, line) pairs without buffering it.
+
+    Only the newly decoded text is split; the unterminated tail is kept as a
+    list of pieces and joined once, when its newline arrives, so each byte
+    is scanned once however the line is chunked. A line longer than
+    MAX_LINE_CHARS (e.g. a body with no newlines) rejects the payload.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail: List[str] = []
+    tail_chars = 0
+    line_no = 0
+
+    def too_long() -> BulkImportError:
+        return BulkImportError(f"Line {line_no + 1} exceeds {MAX_LINE_CHARS} characters")
+
+    try:
+        async for chunk in chunks:
+            *lines, rest = decoder.decode(chunk).split("\n")
+            if lines:
+                lines[0] = "".join(tail) + lines[0]
+                tail = []
+                tail_chars = 0
+            for line in lines:
+                if len(line) > MAX_LINE_CHARS:
+                    raise too_long()
+                line_no += 1
+                yield line_no, line.rstrip("\r")
+            if rest:
+                tail.append(rest)
+                tail_chars += len(rest)
+                if tail_chars > MAX_LINE_CHARS:
+                    raise too_long()
+        tail.append(decoder.decode(b"", final=True))
+    except UnicodeDecodeError as e:
+        raise BulkImportError(f"Body is not valid UTF-8 after line {line_no}: {e.reason}")
+    line = "".join(tail)
+    if len(line) > MAX_LINE_CHARS:
+        raise too_long()
+    if line:
+        yield line_no + 1, line.rstrip("\r")
+
+
+async def iter_ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """One JSON object per line; blank lines are skipped"""
+    async for line_no, line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(data, dict):
+            yield line_no, None, "Expected a JSON object"
+            continue
+        yield line_no, data, None
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """
+    CSV with a header row naming DatasetUpsert fields.
+
+    Quoted fields may span lines: physical lines are collected until the
+    quote count is balanced, tracking the parity line by line so each line is
+    scanned once. A record longer than MAX_CSV_RECORD_CHARS (typically a
+    stray quote swallowing the rest of the upload) rejects the payload.
+    Empty cells become null.
+    """
+    header: Optional[List[str]] = None
+    pending: List[str] = []
+    pending_chars = 0
+    open_quote = False
+    start_line = 0
+    async for line_no, line in iter_lines(chunks):
+        if not pending:
+            start_line = line_no
+            if not line.strip():
+                continue
+        pending.append(line)
+        pending_chars += len(line) + 1
+        if line.count('"') % 2:
+            open_quote = not open_quote
+        if open_quote:
+            if pending_chars > MAX_CSV_RECORD_CHARS:
+                raise BulkImportError(
+                    f"CSV record starting at line {start_line} exceeds {MAX_CSV_RECORD_CHARS} characters "
+                    "(unbalanced quote?)"
+                )
+            continue
+        text = "\n".join(pending)
+        pending = []
+        pending_chars = 0
+        cells = next(csv.reader([text]))
+
+        if header is None:
+            header = [cell.strip() for cell in cells]
+            unknown = [column for column in header if column not in UPSERT_FIELDS]
+            if unknown:
+                raise BulkImportError(f"Unknown CSV column: {', '.join(unknown)}")
+            if "public_dataset_id" not in header:
+                raise BulkImportError("CSV header must include public_dataset_id")
+            continue
+        if len(cells) != len(header):
+            yield start_line, None, f"Expected {len(header)} columns, got {len(cells)}"
+            continue
+        yield start_line, {column: cell or None for column, cell in zip(header, cells)}, None
+
+    if pending:
+        yield start_line, None, "Unterminated quoted field"
+    elif header is None:
+        raise BulkImportError("CSV body is empty")
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}" for item in error.errors()
+    )
+
+
+def _write_chunk(db: Session, chunk: List[Tuple[int, dict]], uploader_id: int) -> Tuple[int, List[dict]]:
+    """
+    Upsert one chunk, committing it on its own.
+
+    If the batched statement fails, the chunk is replayed row by row inside
+    savepoints so only the offending rows are rejected.
+    """
+    groups: Dict[tuple, List[dict]] = {}
+    for _, row in chunk:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    try:
+        for rows in groups.values():
+            DatasetService.upsert_datasets(db, rows, uploader_id)
+        db.commit()
+        return len(chunk), []
+    except DBAPIError:
+        db.rollback()
+
+    written, errors = 0, []
+    for line_no, row in chunk:
+        try:
+            with db.begin_nested():
+                DatasetService.upsert_datasets(db, [row], uploader_id)
+            written += 1
+        except DBAPIError as e:
+            errors.append({
+                "line": line_no,
+                "public_dataset_id": row["public_dataset_id"],
+                "error": str(e.orig).strip()
+            })
+    db.commit()
+    return written, errors
+
+
+async def import_datasets(
+    db: AsyncSession,
+    records: AsyncIterator[Record],
+    uploader_id: int,
+    chunk_size: int = BULK_CHUNK_SIZE
+) -> dict:
+    """
+    Validate and upsert streamed records chunk by chunk.
+
+    A public_dataset_id repeated within the current chunk flushes the chunk
+    first, so later rows win exactly as if rows were applied one at a time.
+    Raises BulkImportError if the payload is unreadable; chunks written
+    before that point stay committed.
+    """
+    result = {"received": 0, "upserted": 0, "failed": 0, "errors": [], "errors_truncated": False}
+    chunk: List[Tuple[int, dict]] = []
+    chunk_ids = set()
+
+    def record_error(error: dict) -> None:
+        result["failed"] += 1
+        if len(result["errors"]) < MAX_REPORTED_ERRORS:
+            result["errors"].append(error)
+        else:
+            result["errors_truncated"] = True
+
+    async def flush() -> None:
+        if chunk:
+            written, errors = await db.run_sync(_write_chunk, list(chunk), uploader_id)
+            result["upserted"] += written
+            for error in errors:
+                record_error(error)
+            chunk.clear()
+            chunk_ids.clear()
+
+    async for line_no, data, error in records:
+        result["received"] += 1
+        if error is None:
+            try:
+                row = DatasetUpsert.model_validate(data).model_dump(exclude_unset=True)
+            except ValidationError as e:
+                error = _validation_message(e)
+        if error is not None:
+            public_id = data.get("public_dataset_id") if isinstance(data, dict) else None
+            record_error({
+                "line": line_no,
+                "public_dataset_id": public_id if isinstance(public_id, str) else None,
+                "error": error
+            })
+            continue
+
+        if row["public_dataset_id"] in chunk_ids:
+            await flush()
+        chunk.append((line_no, row))
+        chunk_ids.add(row["public_dataset_id"])
+        if len(chunk) >= chunk_size:
+            await flush()
+
+    await flush()
+    return result
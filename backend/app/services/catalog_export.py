@@ -0,0 +1,186 @@
+"""
+Streaming catalog export (NDJSON, CSV, Parquet)
+
+Rows arrive from a server-side cursor in batches and each batch is encoded
+and handed to the response as soon as it is read, so memory stays bounded
+by the batch size (or, for Parquet, one row group) no matter how large the
+catalog is. Parquet needs pyarrow; the other formats have no extra
+dependencies.
+"""
+
+import csv
+import io
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+from app.core.serialization import dumps
+from app.models.dataset import Dataset
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+EXPORT_BATCH_SIZE = 1000
+PARQUET_ROW_GROUP_SIZE = 64 * 1024
+
+
+class ExportUnavailableError(RuntimeError):
+    """The requested format needs a package that is not installed"""
+
+
+class NdjsonEncoder:
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = fields
+
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        return b"".join(dumps(dict(zip(self.fields, row))) + b"\n" for row in rows)
+
+    def finish(self) -> bytes:
+        return b""
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+class CsvEncoder:
+    media_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = fields
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def header(self) -> bytes:
+        self._writer.writerow(self.fields)
+        return self._drain()
+
+    def encode(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        self._writer.writerows([_csv_value(value) for value in row] for row in rows)
+        return self._drain()
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _ByteSink:
+    """Write-only file object whose contents are taken out as they are written"""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_type(column):
+    python_type = column.type.python_type
+    if python_type is int:
+        return pyarrow.int64()
+    if python_type is datetime:
+        return pyarrow.timestamp("us")
+    if python_type is date:
+        return pyarrow.date32()
+    return pyarrow.string()
+
+
+class ParquetEncoder:
+    """Buffers rows column-wise and writes a row group each time one fills up"""
+
+    media_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def __init__(self, fields: Sequence[str], row_group_size: Optional[int] = None):
+        if pyarrow is None:
+            raise ExportUnavailableError("Parquet export requires pyarrow")
+        self.fields = fields
+        self.row_group_size = row_group_size or PARQUET_ROW_GROUP_SIZE
+        self.schema = pyarrow.schema([(field, _arrow_type(Dataset.__table__.columns[field])) for field in fields])
+        self._sink = _ByteSink()
+        self._writer = pyarrow.parquet.ParquetWriter(self._sink, self.schema, compression="zstd")
+        self._columns: List[list] = [[] for _ in fields]
+
+    def _write_row_group(self) -> None:
+        table = pyarrow.Table.from_arrays(
+            [pyarrow.array(values, type=field.type) for values, field in zip(self._columns, self.schema)],
+            schema=self.schema
+        )
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+        self._columns = [[] for _ in self.fields]
+
+    def header(self) -> bytes:
+        return self._sink.drain()
+
+    def encode(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        for row in rows:
+            for values, value in zip(self._columns, row):
+                values.append(value)
+            if len(self._columns[0]) == self.row_group_size:
+                self._write_row_group()
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        if self._columns[0]:
+            self._write_row_group()
+        self._writer.close()
+        return self._sink.drain()
+
+
+EXPORT_ENCODERS: Dict[str, type] = {
+    "ndjson": NdjsonEncoder,
+    "csv": CsvEncoder,
+    "parquet": ParquetEncoder,
+}
+
+
+async def iter_export(batches: AsyncIterator[Sequence[Sequence[Any]]], encoder) -> AsyncIterator[bytes]:
+    """Encode row batches as they arrive, yielding only non-empty chunks"""
+    data = encoder.header()
+    if data:
+        yield data
+    async for rows in batches:
+        data = encoder.encode(rows)
+        if data:
+            yield data
+    data = encoder.finish()
+    if data:
+        yield data
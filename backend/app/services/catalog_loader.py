@@ -0,0 +1,181 @@
+"""
+Incremental catalog loader for the datasets CSV
+
+Used by both the startup initializer (app.main.init_db) and
+scripts/seed_db.py. The CSV is streamed in fixed-size chunks, each row is
+fingerprinted, and only rows that are new or whose fingerprint differs
+from the stored content_hash are upserted. Reloading an unchanged catalog
+therefore costs one indexed lookup per chunk and no writes, and memory
+stays bounded by the chunk size. Edits made through the API leave the
+stored hash alone, so reloading an unchanged CSV does not revert them.
+Rows with unparseable values are rejected and reported with their line
+number, as in the bulk importer, rather than loaded with the value dropped.
+"""
+
+import csv
+import hashlib
+import logging
+import time
+from datetime import date
+from itertools import islice
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import Settings, settings
+from app.core.security import UNUSABLE_PASSWORD, get_password_hash
+from app.models.dataset import Dataset
+from app.models.user import User
+from app.services.bulk_import import MAX_REPORTED_ERRORS
+from app.services.dataset_service import DatasetService
+
+logger = logging.getLogger(__name__)
+
+CATALOG_COLUMNS = (
+    "public_dataset_id",
+    "group_name",
+    "data_type",
+    "organ",
+    "status",
+    "publication_date",
+    "description",
+    "citation",
+    "file_storage_path",
+)
+LOAD_CHUNK_SIZE = 5000
+
+# (line number, row, error message or None); a row with an error is not loaded
+CatalogRecord = Tuple[int, dict, Optional[str]]
+
+
+def content_hash(values: List[str]) -> str:
+    """Stable fingerprint of a row's raw CSV values, in CATALOG_COLUMNS order"""
+    return hashlib.blake2b("\x1f".join(values).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    """ISO date or None for an empty cell; raises ValueError otherwise"""
+    return date.fromisoformat(value) if value else None
+
+
+def iter_catalog_rows(path: str) -> Iterator[CatalogRecord]:
+    """
+    Read catalog rows from CSV one at a time; rows without an ID are skipped.
+
+    Line numbers are those of the first physical line of each record.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        reader = csv.reader(file)
+        header = [column.strip() for column in next(reader, [])]
+        if "public_dataset_id" not in header:
+            raise ValueError(f"{path} has no public_dataset_id column")
+        positions = [header.index(column) if column in header else None for column in CATALOG_COLUMNS]
+
+        line_no = reader.line_num
+        for record in reader:
+            start_line, line_no = line_no + 1, reader.line_num
+            # Hash the raw strings so unchanged rows are recognised before any parsing
+            values = [
+                record[position].strip() if position is not None and position < len(record) else ""
+                for position in positions
+            ]
+            if not values[0]:
+                continue
+            row = dict(zip(CATALOG_COLUMNS, [value or None for value in values]))
+            try:
+                row["publication_date"] = _parse_date(row["publication_date"])
+            except ValueError:
+                yield start_line, row, f"Invalid publication_date {row['publication_date']!r} (expected YYYY-MM-DD)"
+                continue
+            row["content_hash"] = content_hash(values)
+            yield start_line, row, None
+
+
+def admin_password_configured() -> bool:
+    """True if ADMIN_PASSWORD was set to something other than the shipped default"""
+    return settings.ADMIN_PASSWORD != Settings.model_fields["ADMIN_PASSWORD"].default
+
+
+def ensure_admin_user(db: Session, usable_password: bool = True) -> User:
+    """
+    Return the configured admin account, creating it on first run.
+
+    With usable_password=False the account is created without a password
+    that can log in (UNUSABLE_PASSWORD), which is what application startup
+    does unless ADMIN_PASSWORD has been changed from its default. An
+    existing account with no usable password gets ADMIN_PASSWORD once it
+    is usable.
+    """
+    admin_user = db.scalar(select(User).where(User.username == settings.ADMIN_USERNAME))
+    if admin_user is None:
+        admin_user = User(
+            username=settings.ADMIN_USERNAME,
+            hashed_password=get_password_hash(settings.ADMIN_PASSWORD) if usable_password else UNUSABLE_PASSWORD,
+            role="admin"
+        )
+        db.add(admin_user)
+    elif usable_password and admin_user.hashed_password == UNUSABLE_PASSWORD:
+        admin_user.hashed_password = get_password_hash(settings.ADMIN_PASSWORD)
+    else:
+        return admin_user
+    db.commit()
+    db.refresh(admin_user)
+    return admin_user
+
+
+def load_catalog_csv(db: Session, path: str, uploader_id: int, chunk_size: int = LOAD_CHUNK_SIZE) -> dict:
+    """
+    Upsert new and changed CSV rows into datasets, committing per chunk.
+
+    Rows that fail to parse are skipped (a stored row with the same ID keeps
+    its current values), logged, and listed in the result with their line
+    number, up to MAX_REPORTED_ERRORS.
+
+    Returns:
+        Counts of processed/inserted/updated/unchanged/failed rows, the row
+        errors, elapsed seconds and rows/s
+    """
+    started = time.perf_counter()
+    stats = {
+        "processed": 0, "inserted": 0, "updated": 0, "unchanged": 0, "failed": 0,
+        "errors": [], "errors_truncated": False,
+    }
+    records = iter_catalog_rows(path)
+
+    while True:
+        chunk: List[CatalogRecord] = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        stats["processed"] += len(chunk)
+        rows = []
+        for line_no, row, error in chunk:
+            if error is None:
+                rows.append(row)
+                continue
+            stats["failed"] += 1
+            if len(stats["errors"]) < MAX_REPORTED_ERRORS:
+                logger.warning(f"{path}:{line_no}: {row['public_dataset_id']}: {error}")
+                stats["errors"].append({"line": line_no, "public_dataset_id": row["public_dataset_id"], "error": error})
+            else:
+                stats["errors_truncated"] = True
+        # Last occurrence wins if the CSV repeats an ID within a chunk
+        by_id = {row["public_dataset_id"]: row for row in rows}
+        stored = dict(db.execute(
+            select(Dataset.public_dataset_id, Dataset.content_hash)
+            .where(Dataset.public_dataset_id.in_(list(by_id)))
+        ).all())
+
+        changed = [row for public_id, row in by_id.items() if stored.get(public_id, "") != row["content_hash"]]
+        inserted = sum(1 for row in changed if row["public_dataset_id"] not in stored)
+        DatasetService.upsert_datasets(db, changed, uploader_id)
+        db.commit()
+
+        stats["inserted"] += inserted
+        stats["updated"] += len(changed) - inserted
+        stats["unchanged"] += len(rows) - len(changed)
+
+    elapsed = time.perf_counter() - started
+    stats["elapsed_seconds"] = elapsed
+    stats["rows_per_second"] = stats["processed"] / elapsed if elapsed > 0 else 0.0
+    return stats
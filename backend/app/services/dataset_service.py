@@ -3,14 +3,83 @@ Dataset service layer
 Business logic for dataset CRUD operations
 """
 
-from typing import List, Optional
-from datetime import datetime
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, asc
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import date, datetime
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Query, Session, load_only
+from sqlalchemy import (
+    and_, or_, desc, asc, bindparam, func, insert, literal, literal_column, nulls_first, nulls_last, select,
+    true, tuple_, union_all, update
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
 
-from app.models.dataset import Dataset
+from app.models.dataset import Dataset, PUBLIC_ID_SEQUENCE, SEARCH_QUERY_CONFIGS
+from app.models.id_counter import IdCounter
 from app.schemas.dataset import DatasetCreate, DatasetUpdate
 
+# Dialects with INSERT ... ON CONFLICT DO UPDATE; others get a select-then-write upsert
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# Columns the list endpoint may sort by; unknown values fall back to publication_date
+SORTABLE_FIELDS = (
+    "dataset_id",
+    "public_dataset_id",
+    "group_name",
+    "data_type",
+    "organ",
+    "status",
+    "publication_date",
+    "created_at",
+    "updated_at",
+)
+DEFAULT_SORT_FIELD = "publication_date"
+# Ranks full-text matches; only meaningful with a search term on Postgres
+RELEVANCE_SORT = "relevance"
+
+# Postgres-only generated tsvector column (see app.models.dataset)
+search_vector = literal_column("datasets.search_vector")
+
+
+class ExplainJSON(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) of a statement, keeping its bind parameters (Postgres only)"""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(ExplainJSON, "postgresql")
+def _compile_explain_json(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+# Text filters that accept a match mode. 'exact' hits the btree indexes (facet clicks),
+# 'prefix', 'fuzzy' and 'similar' are served by the pg_trgm GIN indexes on Postgres.
+MATCHABLE_FILTERS = ("group_name", "data_type", "organ")
+
+# Dimensions the list endpoint can return facet counts for
+FACET_FIELDS = ("organ", "data_type", "status", "group_name")
+
+# Statistics dimensions and the response key each one is reported under
+STATISTICS_DIMENSIONS = {
+    "data_type": "by_data_type",
+    "organ": "by_organ",
+    "status": "by_status",
+    "group_name": "by_research_group",
+}
+MATCH_MODES = ("exact", "prefix", "fuzzy", "similar")
+DEFAULT_MATCH_MODE = "fuzzy"
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded or does not match the query"""
+
 
 class DatasetService:
     """Service class for dataset operations"""
@@ -25,6 +94,144 @@ class DatasetService:
         """Get dataset by public ID (HBM123.ABCD.456)"""
         return db.query(Dataset).filter(Dataset.public_dataset_id == public_dataset_id).first()
     
+    @staticmethod
+    def build_filters(
+        group_name: Optional[str] = None,
+        data_type: Optional[str] = None,
+        organ: Optional[str] = None,
+        status: Optional[str] = None,
+        search: Optional[str] = None,
+        match_modes: Optional[Dict[str, str]] = None,
+        fulltext: bool = False
+    ) -> list:
+        """
+        Build the WHERE clauses shared by every catalog read
+        (list, count, ...) so the filter semantics live in one place.
+        
+        match_modes maps group_name/data_type/organ to 'exact', 'prefix',
+        'fuzzy' (default, substring match) or 'similar' (substring or pg_trgm
+        similarity, so typos still match). With fulltext=True (Postgres) search
+        uses the GIN-indexed search_vector; otherwise plain ilike matching is
+        used and 'similar' behaves like 'fuzzy'.
+        """
+        match_modes = match_modes or {}
+        filters = []
+        for field, value in (("group_name", group_name), ("data_type", data_type), ("organ", organ)):
+            if value:
+                filters.append(DatasetService._match_filter(
+                    getattr(Dataset, field), value, match_modes.get(field, DEFAULT_MATCH_MODE), fulltext
+                ))
+        if status:
+            filters.append(Dataset.status == status)
+        
+        # Apply search
+        if search and fulltext:
+            filters.append(or_(
+                search_vector.op("@@")(DatasetService._tsquery(search)),
+                # Partial IDs ("HBM123") are not whole lexemes, so match them as a prefix
+                Dataset.public_dataset_id.ilike(f"{search}%")
+            ))
+        elif search:
+            filters.append(or_(
+                Dataset.description.ilike(f"%{search}%"),
+                Dataset.citation.ilike(f"%{search}%"),
+                Dataset.group_name.ilike(f"%{search}%"),
+                Dataset.public_dataset_id.ilike(f"%{search}%")
+            ))
+        
+        return filters
+    
+    @staticmethod
+    def _match_filter(column, value: str, mode: str, trigram: bool = False):
+        """Predicate for one text filter in the given match mode"""
+        if mode == "exact":
+            return column == value
+        if mode == "prefix":
+            return column.ilike(f"{value}%")
+        if mode == "similar" and trigram:
+            # Substring or typo-tolerant match, both answered from the trigram index
+            return or_(column.ilike(f"%{value}%"), column.op("%")(value))
+        # fuzzy: substring match (served by the trigram index on Postgres)
+        return column.ilike(f"%{value}%")
+    
+    @staticmethod
+    def build_query(
+        db: Session,
+        *entities,
+        group_name: Optional[str] = None,
+        data_type: Optional[str] = None,
+        organ: Optional[str] = None,
+        status: Optional[str] = None,
+        search: Optional[str] = None,
+        match_modes: Optional[Dict[str, str]] = None
+    ) -> Query:
+        """Filtered query over the given entities (defaults to Dataset)"""
+        query = db.query(*(entities or (Dataset,)))
+        filters = DatasetService.build_filters(
+            group_name=group_name,
+            data_type=data_type,
+            organ=organ,
+            status=status,
+            search=search,
+            match_modes=match_modes,
+            fulltext=DatasetService.supports_fulltext(db)
+        )
+        if filters:
+            query = query.filter(and_(*filters))
+        return query
+    
+    @staticmethod
+    def supports_fulltext(db: Session) -> bool:
+        """Full-text search needs the Postgres search_vector column"""
+        return db.get_bind().dialect.name == "postgresql"
+    
+    @staticmethod
+    def _tsquery(search: str):
+        """
+        Parse user input with web-search syntax (quotes, OR, -negation) once per
+        config in SEARCH_QUERY_CONFIGS and OR the results, so terms match both
+        the 'simple' (IDs, group names) and 'english' (stemmed text) lexemes.
+        """
+        queries = [
+            func.websearch_to_tsquery(literal_column(f"'{config}'::regconfig"), search)
+            for config in SEARCH_QUERY_CONFIGS
+        ]
+        tsquery = queries[0]
+        for query in queries[1:]:
+            tsquery = tsquery.op("||")(query)
+        return tsquery
+    
+    @staticmethod
+    def is_relevance_sort(db: Session, sort_by: str, search: Optional[str]) -> bool:
+        """Whether sort_by=relevance can be honoured for this request"""
+        return sort_by == RELEVANCE_SORT and bool(search) and DatasetService.supports_fulltext(db)
+    
+    @staticmethod
+    def apply_sort(
+        query: Query,
+        sort_by: str,
+        sort_order: str,
+        search: Optional[str] = None,
+        fulltext: bool = False
+    ) -> Query:
+        """
+        Order by the requested column, with dataset_id breaking ties so keyset
+        pages are stable. NULLs sort as the largest value, matching Postgres
+        btree order in both directions.
+        
+        sort_by=relevance orders by ts_rank_cd when a full-text search is active
+        and otherwise falls back to the default column.
+        """
+        if sort_by == RELEVANCE_SORT and search and fulltext:
+            rank = func.ts_rank_cd(search_vector, DatasetService._tsquery(search))
+            direction = asc if sort_order.lower() == "asc" else desc
+            return query.order_by(direction(rank), direction(Dataset.dataset_id))
+        
+        sort_column = getattr(Dataset, DatasetService.normalize_sort_field(sort_by))
+        if sort_order.lower() == "asc":
+            return query.order_by(nulls_last(asc(sort_column)), asc(Dataset.dataset_id))
+        return query.order_by(nulls_first(desc(sort_column)), desc(Dataset.dataset_id))
+    
     @staticmethod
     def get_datasets(
         db: Session,
@@ -36,7 +243,9 @@ class DatasetService:
         status: Optional[str] = None,
         search: Optional[str] = None,
         sort_by: str = "publication_date",
-        sort_order: str = "desc"
+        sort_order: str = "desc",
+        cursor: Optional[str] = None,
+        match_modes: Optional[Dict[str, str]] = None
     ) -> List[Dataset]:
         """
         Get datasets with filtering, searching, and sorting
@@ -52,41 +261,311 @@ class DatasetService:
             search: Search in description, citation, and group_name
             sort_by: Field to sort by
             sort_order: 'asc' or 'desc'
+            cursor: Opaque keyset cursor from a previous page; when given, skip is ignored
+            match_modes: Per-filter match mode for group_name/data_type/organ
+        """
+        datasets, _ = DatasetService.get_datasets_page(
+            db=db,
+            skip=skip,
+            limit=limit,
+            group_name=group_name,
+            data_type=data_type,
+            organ=organ,
+            status=status,
+            search=search,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            cursor=cursor,
+            count="none",
+            match_modes=match_modes
+        )
+        return datasets
+    
+    @staticmethod
+    def get_datasets_page(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        group_name: Optional[str] = None,
+        data_type: Optional[str] = None,
+        organ: Optional[str] = None,
+        status: Optional[str] = None,
+        search: Optional[str] = None,
+        sort_by: str = "publication_date",
+        sort_order: str = "desc",
+        cursor: Optional[str] = None,
+        count: str = "exact",
+        match_modes: Optional[Dict[str, str]] = None,
+        fields: Optional[List[str]] = None,
+        as_rows: bool = False
+    ) -> Tuple[List[Dataset], Optional[int]]:
         """
-        query = db.query(Dataset)
+        Get one page of datasets together with the total matching count
         
-        # Apply filters
-        filters = []
-        if group_name:
-            filters.append(Dataset.group_name.ilike(f"%{group_name}%"))
-        if data_type:
-            filters.append(Dataset.data_type.ilike(f"%{data_type}%"))
-        if organ:
-            filters.append(Dataset.organ.ilike(f"%{organ}%"))
-        if status:
-            filters.append(Dataset.status == status)
+        Same arguments as get_datasets, plus:
+            count: 'exact' (count(*) OVER () in the page query),
+                   'estimated' (planner statistics) or 'none' (skip counting)
+            fields: Dataset columns to load (others are deferred); the primary
+                    key and sort column are always loaded. None loads everything.
+            as_rows: return plain row tuples instead of ORM instances. Each row
+                     starts with `fields` in order (all columns if None),
+                     followed by the sort column and dataset_id when not
+                     already selected; columns are also readable by name.
         
-        if filters:
-            query = query.filter(and_(*filters))
+        Returns:
+            (datasets, total_count) - total_count is None when count='none'
+        """
+        filters = dict(
+            group_name=group_name,
+            data_type=data_type,
+            organ=organ,
+            status=status,
+            search=search,
+            match_modes=match_modes
+        )
+        # The window total would only see rows past the cursor, so keyset pages count separately
+        windowed = count == "exact" and not cursor
+        sort_field = DatasetService.normalize_sort_field(sort_by)
         
-        # Apply search
-        if search:
-            search_filter = or_(
-                Dataset.description.ilike(f"%{search}%"),
-                Dataset.citation.ilike(f"%{search}%"),
-                Dataset.group_name.ilike(f"%{search}%"),
-                Dataset.public_dataset_id.ilike(f"%{search}%")
-            )
-            query = query.filter(search_filter)
+        if as_rows:
+            # Skips ORM identity-map bookkeeping entirely; rows go straight to the serializer
+            columns = list(dict.fromkeys([*(fields or Dataset.__table__.columns.keys()), sort_field, "dataset_id"]))
+            entities = [getattr(Dataset, column) for column in columns]
+        else:
+            entities = [Dataset]
+        if windowed:
+            entities.append(func.count().over().label("total_count"))
+        query = DatasetService.build_query(db, *entities, **filters)
+        query = DatasetService.apply_sort(
+            query, sort_by, sort_order, search=search, fulltext=DatasetService.supports_fulltext(db)
+        )
+        if fields is not None and not as_rows:
+            query = query.options(load_only(*(getattr(Dataset, column) for column in {*fields, sort_field})))
         
-        # Apply sorting
-        sort_column = getattr(Dataset, sort_by, Dataset.publication_date)
-        if sort_order.lower() == "asc":
-            query = query.order_by(asc(sort_column))
+        if cursor:
+            if DatasetService.is_relevance_sort(db, sort_by, search):
+                raise InvalidCursorError("Cursor pagination is not available for relevance sort")
+            rows = []
+            for segment in DatasetService._keyset_segments(cursor, sort_by, sort_order):
+                rows += query.filter(segment).limit(limit - len(rows)).all()
+                if len(rows) >= limit:
+                    break
         else:
-            query = query.order_by(desc(sort_column))
+            rows = query.offset(skip).limit(limit).all()
+        
+        if not windowed:
+            datasets = rows
+            if count == "exact":
+                total_count = DatasetService.get_datasets_count(db, **filters)
+            elif count == "estimated":
+                total_count = DatasetService.estimate_datasets_count(db, **filters)
+            else:
+                total_count = None
+            return datasets, total_count
         
-        return query.offset(skip).limit(limit).all()
+        datasets = rows if as_rows else [dataset for dataset, _ in rows]
+        if rows:
+            total_count = rows[0].total_count
+        elif skip == 0:
+            total_count = 0
+        else:
+            # Paged past the end: no row carries the window total
+            total_count = DatasetService.get_datasets_count(db, **filters)
+        return datasets, total_count
+    
+    @staticmethod
+    def normalize_sort_field(sort_by: str) -> str:
+        """Map a requested sort field onto a sortable column name"""
+        return sort_by if sort_by in SORTABLE_FIELDS else DEFAULT_SORT_FIELD
+    
+    @staticmethod
+    def encode_cursor(dataset: Dataset, sort_by: str, sort_order: str) -> str:
+        """Build the opaque cursor pointing just past the given row"""
+        sort_by = DatasetService.normalize_sort_field(sort_by)
+        value = getattr(dataset, sort_by)
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        payload = [sort_by, sort_order.lower(), value, dataset.dataset_id]
+        raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+    
+    @staticmethod
+    def decode_cursor(cursor: str, sort_by: str, sort_order: str) -> tuple:
+        """Decode a cursor into its (sort value, dataset_id) tuple"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            cursor_sort_by, cursor_order, value, last_id = json.loads(raw)
+        except (binascii.Error, ValueError, TypeError):
+            raise InvalidCursorError("Malformed cursor")
+        
+        if cursor_sort_by != sort_by or cursor_order != sort_order.lower():
+            raise InvalidCursorError("Cursor does not match sort_by/sort_order")
+        if not isinstance(last_id, int):
+            raise InvalidCursorError("Malformed cursor")
+        
+        return DatasetService._parse_sort_value(sort_by, value), last_id
+    
+    @staticmethod
+    def _parse_sort_value(sort_by: str, value: Any) -> Any:
+        """Restore the python type of a sort value stored in a cursor"""
+        if value is None:
+            return None
+        try:
+            python_type = getattr(Dataset, sort_by).type.python_type
+            if python_type is datetime:
+                return datetime.fromisoformat(value)
+            if python_type is date:
+                return date.fromisoformat(value)
+            return python_type(value)
+        except (TypeError, ValueError):
+            raise InvalidCursorError("Malformed cursor")
+    
+    @staticmethod
+    def _keyset_segments(cursor: str, sort_by: str, sort_order: str) -> list:
+        """
+        Seek predicates for rows after the cursor, in result order.
+        
+        Mirrors the ORDER BY in get_datasets (NULL is the largest value, dataset_id
+        breaks ties). Each predicate is a single range of the (sort column,
+        dataset_id) index - a row-value comparison past the cursor, or the NULL
+        block - so every segment starts with an index seek instead of filtering
+        rows. The caller reads the segments in turn until the page is full.
+        """
+        sort_by = DatasetService.normalize_sort_field(sort_by)
+        value, last_id = DatasetService.decode_cursor(cursor, sort_by, sort_order)
+        sort_column = getattr(Dataset, sort_by)
+        
+        if sort_order.lower() == "asc":
+            if value is None:
+                # Inside the trailing NULL block; only the tie-breaker advances
+                return [and_(sort_column.is_(None), Dataset.dataset_id > last_id)]
+            return [
+                tuple_(sort_column, Dataset.dataset_id) > tuple_(value, last_id),
+                sort_column.is_(None)
+            ]
+        
+        if value is None:
+            # Inside the leading NULL block; every non-NULL row is still ahead
+            return [
+                and_(sort_column.is_(None), Dataset.dataset_id < last_id),
+                sort_column.isnot(None)
+            ]
+        return [tuple_(sort_column, Dataset.dataset_id) < tuple_(value, last_id)]
+    
+    @staticmethod
+    def get_facet_counts(
+        db: Session,
+        facets: List[str],
+        group_name: Optional[str] = None,
+        data_type: Optional[str] = None,
+        organ: Optional[str] = None,
+        status: Optional[str] = None,
+        search: Optional[str] = None,
+        match_modes: Optional[Dict[str, str]] = None
+    ) -> Dict[str, List[Tuple[Optional[str], int]]]:
+        """
+        Per-value counts for each requested facet under the current filters.
+        
+        Each facet ignores its own filter (so the sidebar still offers the other
+        values of an active facet) but honours all the others and the search.
+        All facets are aggregated in one UNION ALL statement.
+        
+        Returns:
+            {facet: [(value, count), ...]} ordered by count desc, then value
+        """
+        filters = dict(
+            group_name=group_name,
+            data_type=data_type,
+            organ=organ,
+            status=status,
+            search=search
+        )
+        fulltext = DatasetService.supports_fulltext(db)
+        
+        parts = []
+        for facet in facets:
+            column = getattr(Dataset, facet)
+            clauses = DatasetService.build_filters(
+                **{**filters, facet: None},
+                match_modes=match_modes,
+                fulltext=fulltext
+            )
+            parts.append(
+                select(literal(facet).label("facet"), column.label("value"), func.count().label("count"))
+                .where(and_(true(), *clauses))
+                .group_by(column)
+            )
+        
+        result = {facet: [] for facet in facets}
+        if not parts:
+            return result
+        for facet, value, count in db.execute(union_all(*parts)):
+            result[facet].append((value, count))
+        for values in result.values():
+            values.sort(key=lambda item: (-item[1], item[0] is None, item[0] or ""))
+        return result
+    
+    @staticmethod
+    def get_export_query(
+        db: Session,
+        fields: List[str],
+        group_name: Optional[str] = None,
+        data_type: Optional[str] = None,
+        organ: Optional[str] = None,
+        status: Optional[str] = None,
+        search: Optional[str] = None,
+        match_modes: Optional[Dict[str, str]] = None
+    ) -> Query:
+        """
+        Filtered column query for a full catalog export, in dataset_id order
+        
+        Not executed here: callers stream it through a server-side cursor.
+        """
+        return DatasetService.build_query(
+            db,
+            *(getattr(Dataset, field) for field in fields),
+            group_name=group_name,
+            data_type=data_type,
+            organ=organ,
+            status=status,
+            search=search,
+            match_modes=match_modes
+        ).order_by(Dataset.dataset_id)
+    
+    @staticmethod
+    def get_datasets_freshness(
+        db: Session,
+        group_name: Optional[str] = None,
+        data_type: Optional[str] = None,
+        organ: Optional[str] = None,
+        status: Optional[str] = None,
+        search: Optional[str] = None,
+        match_modes: Optional[Dict[str, str]] = None
+    ) -> Tuple[Optional[datetime], int]:
+        """
+        (max(updated_at), row count) of the filtered set, used as a cheap
+        change validator for list responses without loading any rows
+        """
+        latest, count = DatasetService.build_query(
+            db,
+            func.max(Dataset.updated_at),
+            func.count(Dataset.dataset_id),
+            group_name=group_name,
+            data_type=data_type,
+            organ=organ,
+            status=status,
+            search=search,
+            match_modes=match_modes
+        ).one()
+        return latest, count
+    
+    @staticmethod
+    def get_dataset_freshness(db: Session, public_dataset_id: str) -> Optional[Tuple[int, Optional[datetime]]]:
+        """(dataset_id, updated_at) for one dataset via the public ID index, or None"""
+        row = db.query(Dataset.dataset_id, Dataset.updated_at).filter(
+            Dataset.public_dataset_id == public_dataset_id
+        ).first()
+        return tuple(row) if row else None
     
     @staticmethod
     def get_datasets_count(
@@ -95,46 +574,103 @@ class DatasetService:
         data_type: Optional[str] = None,
         organ: Optional[str] = None,
         status: Optional[str] = None,
-        search: Optional[str] = None
+        search: Optional[str] = None,
+        match_modes: Optional[Dict[str, str]] = None
     ) -> int:
         """Get total count of datasets with same filters as get_datasets"""
-        query = db.query(Dataset)
-        
-        # Apply same filters as get_datasets
-        filters = []
-        if group_name:
-            filters.append(Dataset.group_name.ilike(f"%{group_name}%"))
-        if data_type:
-            filters.append(Dataset.data_type.ilike(f"%{data_type}%"))
-        if organ:
-            filters.append(Dataset.organ.ilike(f"%{organ}%"))
-        if status:
-            filters.append(Dataset.status == status)
+        return DatasetService.build_query(
+            db,
+            group_name=group_name,
+            data_type=data_type,
+            organ=organ,
+            status=status,
+            search=search,
+            match_modes=match_modes
+        ).count()
+    
+    @staticmethod
+    def estimate_datasets_count(
+        db: Session,
+        group_name: Optional[str] = None,
+        data_type: Optional[str] = None,
+        organ: Optional[str] = None,
+        status: Optional[str] = None,
+        search: Optional[str] = None,
+        match_modes: Optional[Dict[str, str]] = None
+    ) -> int:
+        """
+        Approximate count from Postgres planner statistics (no table scan).
         
-        if filters:
-            query = query.filter(and_(*filters))
+        Other databases have no cheap estimate, so they fall back to an exact count.
+        """
+        query = DatasetService.build_query(
+            db,
+            Dataset.dataset_id,
+            group_name=group_name,
+            data_type=data_type,
+            organ=organ,
+            status=status,
+            search=search,
+            match_modes=match_modes
+        )
+        if db.get_bind().dialect.name != "postgresql":
+            return query.count()
         
-        if search:
-            search_filter = or_(
-                Dataset.description.ilike(f"%{search}%"),
-                Dataset.citation.ilike(f"%{search}%"),
-                Dataset.group_name.ilike(f"%{search}%"),
-                Dataset.public_dataset_id.ilike(f"%{search}%")
-            )
-            query = query.filter(search_filter)
+        # Compiled and bound by the dialect like any statement, so filter values
+        # reach the driver in its own paramstyle (positional $n for asyncpg)
+        plan = db.execute(ExplainJSON(query.statement)).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    
+    @staticmethod
+    def allocate_public_dataset_ids(db: Session, count: int = 1) -> List[str]:
+        """
+        Reserve `count` unique auto-generated public IDs (HBMnnn.AUTO.ddd).
         
-        return query.count()
+        Numbers come from the public_dataset_id_seq sequence on Postgres, fetched
+        in one round trip so bulk loaders can pre-allocate a whole block. Sequence
+        values are never handed out twice, so parallel writers cannot collide.
+        Other databases bump a row in id_counters, which serializes allocations
+        until the caller's transaction ends. The suffix is the day of the year.
+        """
+        if count < 1:
+            return []
+        if db.get_bind().dialect.name == "postgresql":
+            numbers = list(db.scalars(
+                select(PUBLIC_ID_SEQUENCE.next_value()).select_from(func.generate_series(1, count))
+            ))
+        else:
+            last = DatasetService._bump_counter(db, PUBLIC_ID_SEQUENCE.name, count)
+            numbers = range(last - count + 1, last + 1)
+        suffix = f"{date.today().timetuple().tm_yday:03d}"
+        return [f"HBM{number:03d}.AUTO.{suffix}" for number in numbers]
+    
+    @staticmethod
+    def _bump_counter(db: Session, name: str, count: int) -> int:
+        """Advance a named id_counters row by count and return its new value"""
+        bump = (
+            update(IdCounter)
+            .where(IdCounter.name == name)
+            .values(value=IdCounter.value + count)
+            .returning(IdCounter.value)
+        )
+        value = db.scalar(bump)
+        if value is None:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(IdCounter).values(name=name, value=count))
+                return count
+            except IntegrityError:
+                # Another writer created the counter first
+                value = db.scalar(bump)
+        return value
     
     @staticmethod
     def create_dataset(db: Session, dataset: DatasetCreate, uploader_id: int) -> Dataset:
         """Create new dataset"""
         # Generate unique public dataset ID if not provided
-        if not hasattr(dataset, 'public_dataset_id') or not dataset.public_dataset_id:
-            # Simple ID generation - in production, use more sophisticated method
-            count = db.query(Dataset).count()
-            public_id = f"HBM{count + 1:03d}.AUTO.{datetime.now().strftime('%m%d')}"
-        else:
-            public_id = dataset.public_dataset_id
+        public_id = dataset.public_dataset_id or DatasetService.allocate_public_dataset_ids(db)[0]
         
         db_dataset = Dataset(
             public_dataset_id=public_id,
@@ -175,6 +711,72 @@ class DatasetService:
         db.refresh(db_dataset)
         return db_dataset
     
+    @staticmethod
+    def upsert_datasets(db: Session, rows: List[dict], uploader_id: int) -> int:
+        """
+        Insert or update rows keyed by public_dataset_id in one batched statement.
+        
+        Rows must share the same keys and IDs must be unique within a call. Rows
+        without a public_dataset_id get one from a single allocate_public_dataset_ids
+        block per call, written back into the row dicts. Only the supplied columns are
+        overwritten on conflict; new rows without a status start as Draft. Dialects without ON CONFLICT (see UPSERT_INSERTS) look the IDs up
+        first and issue one executemany INSERT and one UPDATE; that is not atomic
+        against concurrent writers, so a racing insert surfaces as IntegrityError.
+        Does not commit.
+        
+        Returns:
+            Number of rows written
+        """
+        if not rows:
+            return 0
+        unnamed = [row for row in rows if not row.get("public_dataset_id")]
+        if unnamed:
+            for row, public_id in zip(unnamed, DatasetService.allocate_public_dataset_ids(db, len(unnamed))):
+                row["public_dataset_id"] = public_id
+        columns = set(rows[0])
+        values = [
+            {"status": "Draft", **row, "uploader_id": uploader_id} if "status" not in columns
+            else {**row, "uploader_id": uploader_id}
+            for row in rows
+        ]
+        update_columns = [column for column in columns if column != "public_dataset_id"]
+        
+        insert_factory = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+        if insert_factory is None:
+            DatasetService._upsert_without_on_conflict(db, values, update_columns)
+            return len(values)
+        
+        insert_stmt = insert_factory(Dataset)
+        updates = {column: insert_stmt.excluded[column] for column in update_columns}
+        updates["updated_at"] = func.now()
+        db.execute(
+            insert_stmt.on_conflict_do_update(index_elements=["public_dataset_id"], set_=updates),
+            values
+        )
+        return len(values)
+    
+    @staticmethod
+    def _upsert_without_on_conflict(db: Session, values: List[dict], update_columns: List[str]) -> None:
+        """Portable upsert: split values into existing and new IDs, then UPDATE and INSERT"""
+        existing = set(db.scalars(
+            select(Dataset.public_dataset_id)
+            .where(Dataset.public_dataset_id.in_([row["public_dataset_id"] for row in values]))
+        ))
+        new_rows = [row for row in values if row["public_dataset_id"] not in existing]
+        if new_rows:
+            db.execute(insert(Dataset), new_rows)
+        if existing:
+            # Core executemany (bind names must differ from the column names they set)
+            statement = (
+                update(Dataset.__table__)
+                .where(Dataset.__table__.c.public_dataset_id == bindparam("match_public_dataset_id"))
+                .values({**{column: bindparam(f"new_{column}") for column in update_columns}, "updated_at": func.now()})
+            )
+            db.connection().execute(statement, [
+                {"match_public_dataset_id": row["public_dataset_id"], **{f"new_{c}": row[c] for c in update_columns}}
+                for row in values if row["public_dataset_id"] in existing
+            ])
+    
     @staticmethod
     def delete_dataset(db: Session, public_dataset_id: str) -> bool:
         """Delete dataset by public ID"""
@@ -188,41 +790,61 @@ class DatasetService:
     
     @staticmethod
     def get_dataset_statistics(db: Session) -> dict:
-        """Get dataset statistics"""
-        total_datasets = db.query(Dataset).count()
-        
-        # Group by data type
-        data_types = db.query(Dataset.data_type).distinct().all()
-        data_type_counts = {}
-        for (data_type,) in data_types:
-            count = db.query(Dataset).filter(Dataset.data_type == data_type).count()
-            data_type_counts[data_type] = count
-        
-        # Group by organ
-        organs = db.query(Dataset.organ).distinct().all()
-        organ_counts = {}
-        for (organ,) in organs:
-            count = db.query(Dataset).filter(Dataset.organ == organ).count()
-            organ_counts[organ] = count
-        
-        # Group by status
-        statuses = db.query(Dataset.status).distinct().all()
-        status_counts = {}
-        for (status,) in statuses:
-            count = db.query(Dataset).filter(Dataset.status == status).count()
-            status_counts[status] = count
-        
-        # Group by research group
-        groups = db.query(Dataset.group_name).distinct().all()
-        group_counts = {}
-        for (group_name,) in groups:
-            count = db.query(Dataset).filter(Dataset.group_name == group_name).count()
-            group_counts[group_name] = count
-        
-        return {
-            "total_datasets": total_datasets,
-            "by_data_type": data_type_counts,
-            "by_organ": organ_counts,
-            "by_status": status_counts,
-            "by_research_group": group_counts
-        }
\ No newline at end of file
+        """Get dataset statistics (total plus per-dimension counts in one query)"""
+        total_datasets, counts = DatasetService.count_by_dimensions(db, list(STATISTICS_DIMENSIONS))
+        
+        result = {"total_datasets": total_datasets}
+        for dimension, key in STATISTICS_DIMENSIONS.items():
+            result[key] = counts[dimension]
+        return result
+    
+    @staticmethod
+    def count_by_dimensions(db: Session, dimensions: List[str]) -> Tuple[int, Dict[str, dict]]:
+        """
+        Count datasets per distinct value of each dimension in a single statement.
+        
+        Postgres aggregates every dimension in one scan with GROUP BY GROUPING SETS;
+        other databases get the equivalent UNION ALL of per-dimension GROUP BYs.
+        
+        Returns:
+            (total, {dimension: {value: count}})
+        """
+        columns = [getattr(Dataset, dimension) for dimension in dimensions]
+        counts = {dimension: {} for dimension in dimensions}
+        total = 0
+        
+        if db.get_bind().dialect.name == "postgresql":
+            rows = db.query(
+                *columns,
+                func.grouping(*columns).label("grouping_id"),
+                func.count().label("count")
+            ).group_by(
+                func.grouping_sets(*[tuple_(column) for column in columns], tuple_())
+            ).all()
+            
+            # GROUPING() sets bit (n-1-i) when dimension i is rolled up in that row
+            all_rolled_up = (1 << len(dimensions)) - 1
+            set_masks = {all_rolled_up & ~(1 << (len(dimensions) - 1 - i)): i for i in range(len(dimensions))}
+            for row in rows:
+                if row.grouping_id == all_rolled_up:
+                    total = row.count
+                else:
+                    i = set_masks[row.grouping_id]
+                    counts[dimensions[i]][row[i]] = row.count
+            return total, counts
+        
+        parts = [
+            select(literal(None).label("dimension"), literal(None).label("value"), func.count().label("count"))
+            .select_from(Dataset)
+        ]
+        for dimension, column in zip(dimensions, columns):
+            parts.append(
+                select(literal(dimension).label("dimension"), column.label("value"), func.count().label("count"))
+                .group_by(column)
+            )
+        for dimension, value, count in db.execute(union_all(*parts)):
+            if dimension is None:
+                total = count
+            else:
+                counts[dimension][value] = count
+        return total, counts
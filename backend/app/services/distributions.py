@@ -0,0 +1,146 @@
+"""
+Per-group distribution summaries for boxplots and violins
+
+All groups are summarized together from the values sorted by (group,
+value): quantiles are read off the sorted array by index
+arithmetic, Tukey fences and outlier counts come from a few segmented
+reductions, and KDE curves are a binned Gaussian KDE built from a single
+2-D histogram. The response then holds a fixed number of numbers per group
+rather than one value per cell.
+"""
+
+from typing import Any, Dict, List
+
+import numpy as np
+
+QUANTILES = (0.0, 0.25, 0.5, 0.75, 1.0)
+WHISKER_IQR = 1.5
+MAX_OUTLIERS = 50
+KDE_POINTS = 128
+
+
+def _segment_counts(mask: np.ndarray, starts: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    """Number of True values in each [start, start + size) segment"""
+    cumulative = np.concatenate(([0], np.cumsum(mask)))
+    return cumulative[starts + sizes] - cumulative[starts]
+
+
+def _binned_kde(
+    values: np.ndarray,
+    codes: np.ndarray,
+    sizes: np.ndarray,
+    stds: np.ndarray,
+    points: int
+) -> Dict[str, np.ndarray]:
+    """Gaussian KDE per group on a shared grid (Silverman bandwidth per group)"""
+    low, high = float(values.min()), float(values.max())
+    if high == low:
+        high = low + 1.0
+    step = (high - low) / (points - 1)
+    grid = low + step * np.arange(points)
+    bins = np.clip(np.rint((values - low) / step).astype(np.int64), 0, points - 1)
+    histogram = np.bincount(codes * points + bins, minlength=len(sizes) * points).reshape(len(sizes), points)
+
+    offsets = np.arange(-(points - 1), points) * step
+    densities = np.zeros((len(sizes), points))
+    for group, (size, std) in enumerate(zip(sizes, stds)):
+        if size == 0:
+            continue
+        bandwidth = max(1.06 * std * size ** -0.2, step)
+        kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+        densities[group] = np.convolve(histogram[group], kernel, mode="valid") / size
+    # float32 is plenty for a plotted curve and halves the encoded size
+    return {"x": grid.astype(np.float32), "density": densities.astype(np.float32)}
+
+
+def summarize_groups(
+    values: np.ndarray,
+    codes: np.ndarray,
+    groups: List[str],
+    max_outliers: int = MAX_OUTLIERS,
+    kde_points: int = 0
+) -> Dict[str, Any]:
+    """
+    Five-number summary, Tukey whiskers, outlier sample and optional KDE
+    for each group with at least one finite value.
+
+    codes maps each cell to a group (-1: none). Outliers are those beyond
+    1.5 IQR from the quartiles; up to max_outliers evenly spaced ones (so
+    the extremes are always included) are returned per group.
+    """
+    keep = (codes >= 0) & np.isfinite(values)
+    values = values[keep].astype(np.float64)
+    codes = codes[keep].astype(np.int64)
+    if not len(values):
+        return {"groups": []}
+    # Group cells with a stable (radix, for small integer codes) sort, then
+    # sort each group's values in place: several times faster than a lexsort
+    order = np.argsort(codes.astype(np.min_scalar_type(len(groups))), kind="stable")
+    values, codes = values[order], codes[order]
+
+    sizes = np.bincount(codes, minlength=len(groups))
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    for start, size in zip(starts, sizes):
+        values[start:start + size].sort()
+    present = np.flatnonzero(sizes > 0)
+    last = np.maximum(sizes - 1, 0)
+
+    # Linear-interpolated quantiles, as numpy's default method
+    quantiles = {}
+    for q in QUANTILES:
+        position = q * last
+        below = np.floor(position).astype(np.int64)
+        above = np.minimum(below + 1, last)
+        weight = position - below
+        # Empty groups read a clamped index here and are dropped below
+        lower_values = values[np.minimum(starts + below, len(values) - 1)]
+        upper_values = values[np.minimum(starts + above, len(values) - 1)]
+        quantiles[q] = lower_values + (upper_values - lower_values) * weight
+
+    iqr = quantiles[0.75] - quantiles[0.25]
+    low_fence = quantiles[0.25] - WHISKER_IQR * iqr
+    high_fence = quantiles[0.75] + WHISKER_IQR * iqr
+    is_low = values < low_fence[codes]
+    is_high = values > high_fence[codes]
+    n_low = _segment_counts(is_low, starts, sizes)
+    n_high = _segment_counts(is_high, starts, sizes)
+    whisker_low = values[np.minimum(starts + n_low, len(values) - 1)]
+    whisker_high = values[np.maximum(starts + sizes - 1 - n_high, 0)]
+
+    sums = np.bincount(codes, weights=values, minlength=len(groups))
+    squares = np.bincount(codes, weights=values * values, minlength=len(groups))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / sizes
+        stds = np.sqrt(np.maximum(squares / sizes - means * means, 0.0))
+
+    outlier_positions = np.flatnonzero(is_low | is_high)
+    outlier_bounds = np.searchsorted(outlier_positions, np.concatenate((starts, [len(values)])))
+    kde = _binned_kde(values, codes, sizes, stds, kde_points) if kde_points else None
+
+    summaries = []
+    for group in present:
+        group_outliers = outlier_positions[outlier_bounds[group]:outlier_bounds[group + 1]]
+        if len(group_outliers) > max_outliers:
+            group_outliers = group_outliers[np.linspace(0, len(group_outliers) - 1, max_outliers).astype(np.int64)]
+        summary = {
+            "name": groups[group],
+            "n": int(sizes[group]),
+            "min": float(quantiles[0.0][group]),
+            "q1": float(quantiles[0.25][group]),
+            "median": float(quantiles[0.5][group]),
+            "q3": float(quantiles[0.75][group]),
+            "max": float(quantiles[1.0][group]),
+            "mean": float(means[group]),
+            "whisker_low": float(whisker_low[group]),
+            "whisker_high": float(whisker_high[group]),
+            "n_outliers": int(n_low[group] + n_high[group]),
+            "outliers": values[group_outliers],
+        }
+        if kde is not None:
+            summary["kde"] = kde["density"][group]
+        summaries.append(summary)
+
+    result: Dict[str, Any] = {"groups": summaries}
+    if kde is not None:
+        result["kde_x"] = kde["x"]
+    return result
@@ -0,0 +1,241 @@
+"""
+Read-only, partial access to AnnData .h5ad files
+
+Visualizations only ever need a few arrays out of a multi-GB .h5ad: an
+embedding from obsm, one or two obs columns, a handful of genes. These
+helpers read exactly those HDF5 datasets with h5py and never touch the
+expression matrix unless a caller asks for specific genes, so memory stays
+proportional to what is returned rather than to the file.
+
+Both the current AnnData on-disk layout (encoding-type attributes,
+categorical groups) and the legacy one (obs as a compound table or with
+__categories) are understood.
+"""
+
+import os
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+import scipy.sparse
+
+from app.core.file_serving import safe_join
+
+try:
+    import h5py
+except ImportError:  # pragma: no cover - optional dependency
+    h5py = None
+
+H5AD_SUFFIX = ".h5ad"
+# Stored entries read per block when picking genes out of a CSR matrix
+SCAN_SIZE = 8 * 1024 * 1024
+
+
+class H5adUnavailableError(RuntimeError):
+    """h5py is not installed"""
+
+
+class H5adKeyError(LookupError):
+    """The requested embedding, column or gene is not in the file"""
+
+
+class ObsColumn(NamedTuple):
+    """
+    An obs column: integer codes plus category names for categorical and
+    string columns (code -1 is missing), raw values for numeric ones
+    """
+
+    values: np.ndarray
+    categories: Optional[List[str]]
+
+
+def find_h5ad(storage_dir: str, file_name: Optional[str] = None) -> str:
+    """The named .h5ad in a dataset directory, or its first one by name"""
+    if file_name is not None:
+        path = safe_join(storage_dir, file_name)
+        if path is None or not file_name.endswith(H5AD_SUFFIX):
+            raise ValueError("Invalid file name")
+        if not os.path.isfile(path):
+            raise FileNotFoundError(path)
+        return path
+    try:
+        names = sorted(name for name in os.listdir(storage_dir) if name.endswith(H5AD_SUFFIX))
+    except (FileNotFoundError, NotADirectoryError):
+        names = []
+    if not names:
+        raise FileNotFoundError(storage_dir)
+    return os.path.join(storage_dir, names[0])
+
+
+def open_h5ad(path: str):
+    """Open read-only; use as a context manager"""
+    if h5py is None:
+        raise H5adUnavailableError("Reading .h5ad files requires h5py")
+    return h5py.File(path, "r")
+
+
+def _decode(values) -> List[str]:
+    return [value.decode("utf-8") if isinstance(value, bytes) else str(value) for value in values]
+
+
+def _encoding_type(node) -> str:
+    value = node.attrs.get("encoding-type", "")
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+
+def read_embedding(file, key: str = "X_umap", dims: int = 2) -> np.ndarray:
+    """First `dims` columns of obsm[key] as an (n_obs, dims) array"""
+    obsm = file.get("obsm")
+    if obsm is None:
+        raise H5adKeyError(f"Embedding not found: {key}")
+    if isinstance(obsm, h5py.Dataset):
+        # Legacy layout: one compound dataset with a field per embedding
+        if obsm.dtype.names is None or key not in obsm.dtype.names:
+            raise H5adKeyError(f"Embedding not found: {key}")
+        return np.asarray(obsm.fields(key)[:])[:, :dims]
+    if key not in obsm:
+        raise H5adKeyError(f"Embedding not found: {key}")
+    node = obsm[key]
+    if not isinstance(node, h5py.Dataset) or node.ndim != 2 or node.shape[1] < dims:
+        raise H5adKeyError(f"Embedding {key} is not a dense array with {dims} dimensions")
+    return node[:, :dims]
+
+
+def obs_column_names(file) -> List[str]:
+    obs = file["obs"]
+    if isinstance(obs, h5py.Dataset):
+        return [name for name in obs.dtype.names if name not in ("index", "_index")]
+    order = obs.attrs.get("column-order")
+    if order is not None:
+        return _decode(np.atleast_1d(order))
+    return sorted(name for name in obs if not name.startswith("_"))
+
+
+def _categorical(codes: np.ndarray, categories) -> ObsColumn:
+    return ObsColumn(codes.astype(np.int32, copy=False), _decode(categories[:]))
+
+
+def _factorize(values: np.ndarray) -> ObsColumn:
+    categories, codes = np.unique(values, return_inverse=True)
+    return ObsColumn(codes.astype(np.int32), _decode(categories))
+
+
+def read_obs_column(file, column: str) -> ObsColumn:
+    obs = file.get("obs")
+    if obs is None:
+        raise H5adKeyError(f"obs column not found: {column}")
+
+    if isinstance(obs, h5py.Dataset):
+        if obs.dtype.names is None or column not in obs.dtype.names:
+            raise H5adKeyError(f"obs column not found: {column}")
+        values = obs.fields(column)[:]
+        legacy_categories = file.get(f"uns/{column}_categories")
+        if legacy_categories is not None:
+            return _categorical(values, legacy_categories)
+    else:
+        if column not in obs or column.startswith("_"):
+            raise H5adKeyError(f"obs column not found: {column}")
+        node = obs[column]
+        if isinstance(node, h5py.Group):
+            if _encoding_type(node) != "categorical":
+                raise H5adKeyError(f"obs column {column} has an unsupported encoding")
+            return _categorical(node["codes"][:], node["categories"])
+        values = node[:]
+        if "categories" in node.attrs:
+            # Legacy layout: codes here, categories referenced from obs/__categories
+            return _categorical(values, file[node.attrs["categories"]])
+
+    if values.dtype.kind in "SOU":
+        return _factorize(values)
+    return ObsColumn(values, None)
+
+
+def var_names(file) -> List[str]:
+    var = file["var"]
+    if isinstance(var, h5py.Dataset):
+        return _decode(var.fields("index")[:])
+    index_name = var.attrs.get("_index", "_index")
+    if isinstance(index_name, bytes):
+        index_name = index_name.decode("utf-8")
+    return _decode(var[index_name][:])
+
+
+def gene_columns(file, genes: List[str]) -> np.ndarray:
+    """Column indices of the given gene names in X, in the order given"""
+    positions = {name: i for i, name in enumerate(var_names(file))}
+    missing = [gene for gene in genes if gene not in positions]
+    if missing:
+        raise H5adKeyError(f"Gene not found: {', '.join(missing[:10])}")
+    return np.array([positions[gene] for gene in genes], dtype=np.int64)
+
+
+def _matrix_node(file, layer: Optional[str]):
+    if layer is None:
+        return file["X"]
+    layers = file.get("layers")
+    if layers is None or layer not in layers:
+        raise H5adKeyError(f"Layer not found: {layer}")
+    return layers[layer]
+
+
+def _sparse_format(node) -> str:
+    encoding = _encoding_type(node) or node.attrs.get("h5sparse_format", "")
+    if isinstance(encoding, bytes):
+        encoding = encoding.decode("utf-8")
+    return "csc" if encoding.startswith("csc") else "csr"
+
+
+def read_gene_columns(file, columns: np.ndarray, layer: Optional[str] = None, scan_size: int = SCAN_SIZE):
+    """
+    The given (non-empty) X columns as a (n_obs, len(columns)) CSC matrix.
+
+    CSC matrices are read column by column, touching only those genes.
+    CSR matrices store genes scattered across every row, so their indices
+    are scanned in blocks of scan_size entries and only matching entries
+    are kept; memory is bounded by the block size, not the matrix. Dense
+    X is read with a single column selection.
+    """
+    node = _matrix_node(file, layer)
+    if isinstance(node, h5py.Dataset):
+        order = np.argsort(columns)
+        # h5py needs increasing indices for a column selection
+        dense = node[:, columns[order]]
+        restored = np.empty_like(dense)
+        restored[:, order] = dense
+        return scipy.sparse.csc_matrix(restored)
+
+    n_obs, _ = (int(v) for v in node.attrs["shape"])
+    data, indices, indptr = node["data"], node["indices"], node["indptr"]
+
+    if _sparse_format(node) == "csc":
+        pieces_data, pieces_rows, counts = [], [], []
+        for column in columns:
+            start, stop = int(indptr[column]), int(indptr[column + 1])
+            pieces_data.append(data[start:stop])
+            pieces_rows.append(indices[start:stop])
+            counts.append(stop - start)
+        column_ptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return scipy.sparse.csc_matrix(
+            (np.concatenate(pieces_data), np.concatenate(pieces_rows), column_ptr),
+            shape=(n_obs, len(columns))
+        )
+
+    # CSR: map wanted gene -> output column, then keep matching entries block by block
+    lookup = np.full(int(node.attrs["shape"][1]), -1, dtype=np.int64)
+    lookup[columns] = np.arange(len(columns))
+    row_ptr = indptr[:]
+    kept_data, kept_rows, kept_cols = [], [], []
+    for start in range(0, int(row_ptr[-1]), scan_size):
+        stop = min(start + scan_size, int(row_ptr[-1]))
+        block_columns = lookup[indices[start:stop]]
+        hits = np.flatnonzero(block_columns >= 0)
+        if not len(hits):
+            continue
+        kept_data.append(data[start:stop][hits])
+        kept_rows.append(np.searchsorted(row_ptr, start + hits, side="right") - 1)
+        kept_cols.append(block_columns[hits])
+    if not kept_data:
+        return scipy.sparse.csc_matrix((n_obs, len(columns)), dtype=data.dtype)
+    return scipy.sparse.csc_matrix(
+        (np.concatenate(kept_data), (np.concatenate(kept_rows), np.concatenate(kept_cols))),
+        shape=(n_obs, len(columns))
+    )
@@ -0,0 +1,103 @@
+"""
+Gene x group aggregation for heatmaps and dot plots
+
+Per-group means and fractions of expressing cells are computed with two
+sparse matrix products against a (cells x groups) one-hot matrix, so
+there is no Python-level loop over cells or groups and only the stored
+non-zeros of the requested genes are touched.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import scipy.sparse
+from scipy.cluster.hierarchy import leaves_list, linkage
+
+
+def group_indicator(codes: np.ndarray, n_groups: int) -> scipy.sparse.csr_matrix:
+    """
+    (n_cells, n_groups) one-hot matrix; cells with a negative code belong to no group.
+
+    Each row holds at most one entry, so the CSR arrays are written directly
+    without the sort a COO construction would need.
+    """
+    valid = codes >= 0
+    indptr = np.concatenate(([0], np.cumsum(valid)))
+    return scipy.sparse.csr_matrix(
+        (np.ones(int(indptr[-1])), codes[valid].astype(np.int64), indptr),
+        shape=(len(codes), n_groups)
+    )
+
+
+def aggregate_groups(matrix, codes: np.ndarray, n_groups: int) -> Dict[str, np.ndarray]:
+    """
+    Mean and fraction of expressing cells for each (group, gene).
+
+    matrix is (n_cells, n_genes), sparse (CSR/CSC) or dense. Returns arrays
+    shaped (n_groups, n_genes) plus the group sizes; empty groups get NaN.
+    """
+    indicator = group_indicator(codes, n_groups)
+    sizes = np.bincount(codes[codes >= 0].astype(np.int64), minlength=n_groups)
+    if scipy.sparse.issparse(matrix):
+        # matrix.T of a CSC block is CSR for free, so this is a native CSR x CSR product
+        matrix = scipy.sparse.csc_matrix(matrix)
+        sums = (matrix.T @ indicator).toarray().T
+        expressing = matrix.copy()
+        expressing.data = (expressing.data != 0).astype(np.float64)
+        counts = (expressing.T @ indicator).toarray().T
+    else:
+        sums = indicator.T @ matrix
+        counts = indicator.T @ (matrix != 0).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = sums / sizes[:, None]
+        fraction = counts / sizes[:, None]
+    return {"mean": mean, "fraction": fraction, "sizes": sizes}
+
+
+def zscore_rows(values: np.ndarray) -> np.ndarray:
+    """Standardize each row; constant rows become 0"""
+    mean = np.nanmean(values, axis=1, keepdims=True)
+    std = np.nanstd(values, axis=1, keepdims=True)
+    return np.divide(values - mean, std, out=np.zeros_like(values, dtype=np.float64), where=std > 0)
+
+
+def cluster_order(values: np.ndarray) -> np.ndarray:
+    """Leaf order of average-linkage clustering of the rows"""
+    if len(values) < 3:
+        return np.arange(len(values))
+    return leaves_list(linkage(np.nan_to_num(values), method="average", metric="euclidean", optimal_ordering=True))
+
+
+def build_heatmap(
+    matrix,
+    genes: List[str],
+    codes: np.ndarray,
+    groups: List[str],
+    zscore: bool = False,
+    cluster_genes: bool = False,
+    cluster_groups: bool = False
+) -> Dict[str, object]:
+    """
+    Gene x group mean/fraction matrices, optionally z-scored per gene and
+    reordered by hierarchical clustering. Groups without cells are dropped.
+    """
+    aggregate = aggregate_groups(matrix, codes, len(groups))
+    present = np.flatnonzero(aggregate["sizes"] > 0)
+    # Rows are genes, columns are groups
+    mean = aggregate["mean"][present].T
+    fraction = aggregate["fraction"][present].T
+    values = zscore_rows(mean) if zscore else mean
+
+    gene_order = cluster_order(values) if cluster_genes else np.arange(len(genes))
+    group_order = cluster_order(values.T) if cluster_groups else np.arange(len(present))
+    grid = np.ix_(gene_order, group_order)
+    return {
+        "genes": [genes[i] for i in gene_order],
+        "groups": [groups[i] for i in present[group_order]],
+        "group_sizes": aggregate["sizes"][present][group_order],
+        "values": np.ascontiguousarray(values[grid]),
+        "mean": np.ascontiguousarray(mean[grid]),
+        "fraction": np.ascontiguousarray(fraction[grid]),
+        "zscore": zscore,
+    }
+
@@ -0,0 +1,203 @@
+"""
+Level-of-detail tile pyramid for large 2-D scatter plots
+
+The embedding is mapped onto a square world split, at zoom z, into
+2^z x 2^z tiles (tile y grows with data y). Every point gets a Morton
+(Z-order) key on a fine grid and points are sorted by it once; that
+ordering is a linear quadtree, so the points of any tile are one
+contiguous slice found with two binary searches.
+
+A tile holding at most TILE_POINT_BUDGET points is sent as raw points.
+Denser tiles are sent as a TILE_BINS x TILE_BINS density grid (count per
+non-empty bin, plus the dominant category or the mean value of the color
+column). Bin aggregates for each zoom are built once, on first use, by a
+vectorized pass over the sorted keys, and later tiles at that zoom are
+again a binary-searched slice. Either way a tile costs O(budget + log n)
+and is at most TILE_POINT_BUDGET entries, whatever the cell count.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.h5ad import open_h5ad, read_embedding, read_obs_column
+
+MAX_ZOOM = 16
+# Bins per tile side in density mode; TILE_BINS ** 2 == TILE_POINT_BUDGET
+BIN_BITS = 6
+TILE_BINS = 1 << BIN_BITS
+TILE_POINT_BUDGET = TILE_BINS * TILE_BINS
+# Resolution of the point keys: bins of the deepest zoom
+KEY_LEVEL = MAX_ZOOM + BIN_BITS
+
+
+def _spread_bits(values: np.ndarray) -> np.ndarray:
+    """Insert a zero bit between each of the low 32 bits"""
+    v = values.astype(np.uint64)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return v
+
+
+def _compact_bits(values: np.ndarray) -> np.ndarray:
+    """Inverse of _spread_bits: keep every other bit"""
+    v = values.astype(np.uint64) & np.uint64(0x5555555555555555)
+    v = (v | (v >> np.uint64(1))) & np.uint64(0x3333333333333333)
+    v = (v | (v >> np.uint64(2))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v >> np.uint64(4))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v >> np.uint64(8))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v >> np.uint64(16))) & np.uint64(0x00000000FFFFFFFF)
+    return v
+
+
+def morton_encode(gx: np.ndarray, gy: np.ndarray) -> np.ndarray:
+    return _spread_bits(gx) | (_spread_bits(gy) << np.uint64(1))
+
+
+def morton_decode(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    return _compact_bits(keys), _compact_bits(keys >> np.uint64(1))
+
+
+class TileIndex:
+    """Points of one embedding sorted along a Z-order curve, plus lazily built bin levels"""
+
+    def __init__(
+        self,
+        coordinates: np.ndarray,
+        labels: Optional[np.ndarray] = None,
+        categories: Optional[List[str]] = None
+    ):
+        x = coordinates[:, 0].astype(np.float64)
+        y = coordinates[:, 1].astype(np.float64)
+        finite = np.isfinite(x) & np.isfinite(y)
+        if not finite.all():
+            x, y = x[finite], y[finite]
+            labels = labels[finite] if labels is not None else None
+
+        self.n_points = len(x)
+        self.x0 = float(x.min()) if self.n_points else 0.0
+        self.y0 = float(y.min()) if self.n_points else 0.0
+        extent = max(float(x.max()) - self.x0, float(y.max()) - self.y0) if self.n_points else 0.0
+        # Square world, padded so the maximum falls inside the last grid cell
+        self.size = extent * (1 + 1e-9) or 1.0
+        self.categories = categories
+
+        cells = 1 << KEY_LEVEL
+        gx = np.clip(((x - self.x0) / self.size * cells).astype(np.int64), 0, cells - 1)
+        gy = np.clip(((y - self.y0) / self.size * cells).astype(np.int64), 0, cells - 1)
+        keys = morton_encode(gx, gy)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.x = x[order].astype(np.float32)
+        self.y = y[order].astype(np.float32)
+        self.labels = labels[order] if labels is not None else None
+
+        self._levels: Dict[int, Dict[str, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def bounds(self) -> List[float]:
+        return [self.x0, self.y0, self.x0 + self.size, self.y0 + self.size]
+
+    def tile_bounds(self, z: int, x: int, y: int) -> List[float]:
+        step = self.size / (1 << z)
+        return [self.x0 + x * step, self.y0 + y * step, self.x0 + (x + 1) * step, self.y0 + (y + 1) * step]
+
+    def _key_range(self, z: int, x: int, y: int, level: int) -> Tuple[np.uint64, np.uint64]:
+        """[lo, hi) of level-`level` Morton keys inside tile (z, x, y)"""
+        prefix = int(morton_encode(np.array([x]), np.array([y]))[0])
+        shift = 2 * (level - z)
+        return np.uint64(prefix << shift), np.uint64((prefix + 1) << shift)
+
+    def _level(self, level: int) -> Dict[str, np.ndarray]:
+        """Non-empty bins at grid level `level`: key, count and color aggregate"""
+        with self._lock:
+            cached = self._levels.get(level)
+            if cached is not None:
+                return cached
+
+            bin_keys = self.keys >> np.uint64(2 * (KEY_LEVEL - level))
+            # First index of each run of equal bin keys ([:n] keeps it empty when there are no points)
+            starts = np.flatnonzero(np.concatenate(([True], bin_keys[1:] != bin_keys[:-1])))[:self.n_points]
+            counts = np.diff(np.append(starts, self.n_points))
+            aggregate: Dict[str, np.ndarray] = {"keys": bin_keys[starts], "counts": counts}
+
+            if self.labels is not None and self.categories is not None and len(starts):
+                # Dominant category per bin: count (bin, code) pairs, keep each bin's largest
+                bin_ids = np.repeat(np.arange(len(starts)), counts)
+                pairs, pair_counts = np.unique(
+                    bin_ids.astype(np.int64) * (len(self.categories) + 1) + (self.labels.astype(np.int64) + 1),
+                    return_counts=True
+                )
+                pair_bins = pairs // (len(self.categories) + 1)
+                best = np.lexsort((pair_counts, pair_bins))
+                last_of_bin = np.flatnonzero(np.append(pair_bins[best][1:] != pair_bins[best][:-1], True))
+                aggregate["labels"] = (pairs[best][last_of_bin] % (len(self.categories) + 1) - 1).astype(np.int32)
+            elif self.labels is not None and len(starts):
+                valid = ~np.isnan(self.labels)
+                sums = np.add.reduceat(np.where(valid, self.labels, 0.0), starts)
+                valid_counts = np.add.reduceat(valid.astype(np.int64), starts)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    aggregate["values"] = (sums / valid_counts).astype(np.float32)
+
+            self._levels[level] = aggregate
+            return aggregate
+
+    def tile(self, z: int, x: int, y: int) -> Dict[str, Any]:
+        lo, hi = self._key_range(z, x, y, KEY_LEVEL)
+        start, stop = np.searchsorted(self.keys, [lo, hi])
+        count = int(stop - start)
+        tile: Dict[str, Any] = {"z": z, "x": x, "y": y, "bounds": self.tile_bounds(z, x, y), "count": count}
+
+        if count <= TILE_POINT_BUDGET:
+            tile["mode"] = "points"
+            tile["points"] = {"x": self.x[start:stop], "y": self.y[start:stop]}
+            if self.labels is not None:
+                tile["points"]["labels" if self.categories is not None else "values"] = self.labels[start:stop]
+            return tile
+
+        level = z + BIN_BITS
+        aggregate = self._level(level)
+        lo, hi = self._key_range(z, x, y, level)
+        first, last = np.searchsorted(aggregate["keys"], [lo, hi])
+        gx, gy = morton_decode(aggregate["keys"][first:last])
+        bin_size = self.size / (1 << level)
+        bins = {
+            "x": (self.x0 + (gx + 0.5) * bin_size).astype(np.float32),
+            "y": (self.y0 + (gy + 0.5) * bin_size).astype(np.float32),
+            "count": aggregate["counts"][first:last],
+        }
+        for name in ("labels", "values"):
+            if name in aggregate:
+                bins[name] = aggregate[name][first:last]
+        tile["mode"] = "density"
+        tile["bin_size"] = bin_size
+        tile["bins"] = bins
+        return tile
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "n_cells": self.n_points,
+            "bounds": self.bounds,
+            "max_zoom": MAX_ZOOM,
+            "tile_bins": TILE_BINS,
+            "tile_point_budget": TILE_POINT_BUDGET,
+            "categories": self.categories,
+        }
+
+
+def build_tile_index(path: str, embedding: str = "X_umap", color_by: Optional[str] = None) -> TileIndex:
+    """Read the embedding (and color column) from the .h5ad and index it; blocking"""
+    with open_h5ad(path) as file:
+        coordinates = read_embedding(file, embedding)
+        column = read_obs_column(file, color_by) if color_by else None
+    if column is None:
+        return TileIndex(coordinates)
+    if len(column.values) != len(coordinates):
+        raise ValueError(f"obs column {color_by} does not match the embedding length")
+    labels = column.values if column.categories is not None else column.values.astype(np.float64)
+    return TileIndex(coordinates, labels, column.categories)
@@ -0,0 +1,234 @@
+"""
+Chunked, resumable uploads of dataset files
+
+An upload session lives entirely on disk under
+{storage_dir}/.uploads/{upload_id}/, so any worker can serve any request:
+
+- session.json  immutable session parameters
+- data          the file, preallocated to its final size
+- chunks/{n}    marker holding chunk n's SHA-256, written only after the
+                chunk's bytes are on disk
+
+Chunks are streamed from the request body straight into their offset in
+the data file, so they can arrive in any order and in parallel without
+holding more than a small write buffer in memory. Finalizing checks that
+every chunk arrived, verifies the whole-file SHA-256 in a single sequential
+read, and renames the file into the dataset directory. The staging area is
+on the same filesystem, so the final move is an atomic rename.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import uuid
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+import anyio
+
+from app.core.config import settings
+from app.core.file_serving import safe_join
+
+UPLOADS_DIR_NAME = ".uploads"
+WRITE_BUFFER_SIZE = 1024 * 1024
+HASH_READ_SIZE = 4 * 1024 * 1024
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadNotFoundError(LookupError):
+    """No upload session with this ID exists for the dataset"""
+
+
+class UploadConflictError(ValueError):
+    """The request does not fit the session's current state"""
+
+
+class UploadRejectedError(ValueError):
+    """The uploaded bytes are invalid (wrong length or checksum)"""
+
+
+def storage_dir_for(public_dataset_id: str, file_storage_path: Optional[str]) -> str:
+    """Directory a dataset's files live in, defaulting to {DATASET_STORAGE_ROOT}/{public_dataset_id}"""
+    return file_storage_path or os.path.join(settings.DATASET_STORAGE_ROOT, public_dataset_id)
+
+
+def _session_dir(storage_dir: str, upload_id: str) -> str:
+    if not UPLOAD_ID_PATTERN.match(upload_id):
+        raise UploadNotFoundError(upload_id)
+    return os.path.join(storage_dir, UPLOADS_DIR_NAME, upload_id)
+
+
+def _read_session(storage_dir: str, upload_id: str) -> dict:
+    try:
+        with open(os.path.join(_session_dir(storage_dir, upload_id), "session.json"), encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        raise UploadNotFoundError(upload_id)
+
+
+def _chunk_length(session: dict, index: int) -> int:
+    return min(session["chunk_size"], session["size"] - index * session["chunk_size"])
+
+
+def _status(storage_dir: str, session: dict) -> dict:
+    chunks_dir = os.path.join(_session_dir(storage_dir, session["upload_id"]), "chunks")
+    received = {int(name) for name in os.listdir(chunks_dir) if name.isdigit()}
+    missing = [index for index in range(session["total_chunks"]) if index not in received]
+    contiguous = missing[0] if missing else session["total_chunks"]
+    return {
+        **{key: session[key] for key in (
+            "upload_id", "public_dataset_id", "file_name", "size", "chunk_size", "total_chunks", "created_at"
+        )},
+        "received_chunks": len(received),
+        "missing_chunks": missing,
+        "offset": min(contiguous * session["chunk_size"], session["size"]),
+    }
+
+
+def create_upload(
+    storage_dir: str,
+    public_dataset_id: str,
+    file_name: str,
+    size: int,
+    chunk_size: int,
+    sha256: Optional[str] = None
+) -> dict:
+    """Open a session and preallocate (sparsely) the target file"""
+    if safe_join(storage_dir, file_name) is None or file_name.startswith("."):
+        raise UploadRejectedError("Invalid file name")
+
+    upload_id = uuid.uuid4().hex
+    session_dir = _session_dir(storage_dir, upload_id)
+    os.makedirs(os.path.join(session_dir, "chunks"))
+    with open(os.path.join(session_dir, "data"), "wb") as file:
+        file.truncate(size)
+
+    session = {
+        "upload_id": upload_id,
+        "public_dataset_id": public_dataset_id,
+        "file_name": file_name,
+        "size": size,
+        "chunk_size": chunk_size,
+        "total_chunks": -(-size // chunk_size),
+        "sha256": sha256.lower() if sha256 else None,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(os.path.join(session_dir, "session.json"), "w", encoding="utf-8") as file:
+        json.dump(session, file)
+    return _status(storage_dir, session)
+
+
+def upload_status(storage_dir: str, upload_id: str) -> dict:
+    return _status(storage_dir, _read_session(storage_dir, upload_id))
+
+
+async def write_chunk(
+    storage_dir: str,
+    upload_id: str,
+    index: int,
+    body: AsyncIterator[bytes],
+    sha256: Optional[str] = None
+) -> dict:
+    """
+    Stream one chunk into its slot of the data file.
+
+    The chunk only counts as received once all of its bytes are written
+    (and match sha256 if given), so an interrupted PUT is simply retried.
+    Re-sending a received chunk overwrites it with the same bytes.
+    """
+    session = await anyio.to_thread.run_sync(_read_session, storage_dir, upload_id)
+    if not 0 <= index < session["total_chunks"]:
+        raise UploadConflictError(f"Chunk index must be between 0 and {session['total_chunks'] - 1}")
+    expected = _chunk_length(session, index)
+    session_dir = _session_dir(storage_dir, upload_id)
+    offset = index * session["chunk_size"]
+
+    try:
+        fd = await anyio.to_thread.run_sync(os.open, os.path.join(session_dir, "data"), os.O_WRONLY)
+    except FileNotFoundError:
+        raise UploadNotFoundError(upload_id)
+    hasher = hashlib.sha256()
+    received = 0
+    buffer = bytearray()
+    try:
+        async for piece in body:
+            received += len(piece)
+            if received > expected:
+                raise UploadRejectedError(f"Chunk {index} must be {expected} bytes")
+            hasher.update(piece)
+            buffer += piece
+            if len(buffer) >= WRITE_BUFFER_SIZE:
+                await anyio.to_thread.run_sync(os.pwrite, fd, bytes(buffer), offset)
+                offset += len(buffer)
+                buffer.clear()
+        if buffer:
+            await anyio.to_thread.run_sync(os.pwrite, fd, bytes(buffer), offset)
+    finally:
+        os.close(fd)
+
+    if received != expected:
+        raise UploadRejectedError(f"Chunk {index} must be {expected} bytes, got {received}")
+    digest = hasher.hexdigest()
+    if sha256 and digest != sha256.lower():
+        raise UploadRejectedError(f"Chunk {index} SHA-256 mismatch")
+
+    marker = os.path.join(session_dir, "chunks", str(index))
+
+    def mark_received() -> None:
+        with open(f"{marker}.tmp", "w") as file:
+            file.write(digest)
+        os.replace(f"{marker}.tmp", marker)
+
+    await anyio.to_thread.run_sync(mark_received)
+    return {"index": index, "size": received, "sha256": digest}
+
+
+def complete_upload(storage_dir: str, upload_id: str, sha256: Optional[str] = None) -> dict:
+    """
+    Verify and publish the uploaded file; blocking, run it off the event loop.
+
+    The session is kept on checksum mismatch so bad chunks can be re-sent.
+    """
+    session = _read_session(storage_dir, upload_id)
+    expected = session["sha256"]
+    if sha256 and expected and sha256.lower() != expected:
+        raise UploadConflictError("sha256 differs from the one given when the upload was created")
+    expected = expected or (sha256.lower() if sha256 else None)
+
+    status = _status(storage_dir, session)
+    if status["missing_chunks"]:
+        raise UploadConflictError(f"{len(status['missing_chunks'])} chunks are still missing")
+
+    session_dir = _session_dir(storage_dir, upload_id)
+    data_path = os.path.join(session_dir, "data")
+    hasher = hashlib.sha256()
+    with open(data_path, "rb") as file:
+        while block := file.read(HASH_READ_SIZE):
+            hasher.update(block)
+    digest = hasher.hexdigest()
+    if expected and digest != expected:
+        raise UploadRejectedError("File SHA-256 mismatch")
+
+    destination = safe_join(storage_dir, session["file_name"])
+    try:
+        os.replace(data_path, destination)
+    except FileNotFoundError:
+        # A concurrent finalize already published it
+        raise UploadNotFoundError(upload_id)
+    shutil.rmtree(session_dir, ignore_errors=True)
+    return {
+        "public_dataset_id": session["public_dataset_id"],
+        "file_name": session["file_name"],
+        "file_path": destination,
+        "size": session["size"],
+        "sha256": digest,
+    }
+
+
+def abort_upload(storage_dir: str, upload_id: str) -> None:
+    session_dir = _session_dir(storage_dir, upload_id)
+    if not os.path.isdir(session_dir):
+        raise UploadNotFoundError(upload_id)
+    shutil.rmtree(session_dir, ignore_errors=True)
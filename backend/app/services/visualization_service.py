@@ -0,0 +1,145 @@
+"""
+Chart data computed from a dataset's .h5ad file
+
+Functions here are blocking (HDF5 reads and NumPy work); routers run them
+off the event loop. Results hold NumPy arrays, which the JSON encoder in
+app.core.serialization writes out directly without building Python lists.
+"""
+
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.cache import tile_index_cache, visualization_cache
+from app.core.disk_cache import cache_key, visualization_disk_cache
+from app.services.distributions import KDE_POINTS, summarize_groups
+from app.services.h5ad import gene_columns, open_h5ad, read_embedding, read_gene_columns, read_obs_column
+from app.services.heatmap import build_heatmap
+from app.services.umap_tiles import TileIndex, build_tile_index
+
+
+def source_signature(path: str) -> Tuple[str, int, int]:
+    """(path, size, mtime_ns): changes whenever the file is replaced or rewritten"""
+    stat_result = os.stat(path)
+    return path, stat_result.st_size, stat_result.st_mtime_ns
+
+
+def cached_result(
+    chart_type: str,
+    public_dataset_id: str,
+    path: str,
+    compute: Callable[..., Dict[str, Any]],
+    **params: Any
+) -> Dict[str, Any]:
+    """
+    compute(path, **params), through the in-process and on-disk result caches.
+
+    Entries are keyed by chart type, dataset, file name, the file's size and
+    mtime and the parameters (key order does not matter), so rewriting the
+    file makes its old entries unreachable. The in-process cache is checked
+    first, so hot results skip reading and decompressing the disk entry.
+    """
+    _, size, mtime_ns = source_signature(path)
+    key = {
+        "dataset": public_dataset_id,
+        "file": os.path.basename(path),
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "params": params,
+    }
+    return visualization_cache.get_or_set(
+        chart_type,
+        cache_key(chart_type, key),
+        lambda: visualization_disk_cache.get_or_set(chart_type, key, lambda: compute(path, **params))
+    )
+
+
+def load_umap(path: str, embedding: str = "X_umap", color_by: Optional[str] = None) -> Dict[str, Any]:
+    """
+    2-D embedding coordinates, optionally with one obs column for coloring.
+
+    Only obsm[embedding] and the obs column are read, so memory is the size
+    of the returned arrays however large the expression matrix is.
+    Categorical labels come back as integer codes plus a category list.
+    """
+    with open_h5ad(path) as file:
+        coordinates = read_embedding(file, embedding)
+        column = read_obs_column(file, color_by) if color_by else None
+
+    data: Dict[str, Any] = {
+        "n_cells": len(coordinates),
+        "x": np.ascontiguousarray(coordinates[:, 0]),
+        "y": np.ascontiguousarray(coordinates[:, 1]),
+    }
+    if column is not None:
+        if len(column.values) != len(coordinates):
+            raise ValueError(f"obs column {color_by} does not match the embedding length")
+        data["color_by"] = color_by
+        data["labels"] = column.values
+        data["categories"] = column.categories
+    return data
+
+
+def get_tile_index(path: str, embedding: str = "X_umap", color_by: Optional[str] = None) -> Tuple[tuple, TileIndex]:
+    """
+    The tile index for an embedding, built on first use and then reused.
+
+    Returns (source key, index); the key includes the file's size and mtime,
+    so a rewritten file gets a fresh index and fresh tile ETags.
+    """
+    source = (*source_signature(path), embedding, color_by)
+    index = tile_index_cache.get_or_set(
+        "umap-tiles", source, lambda: build_tile_index(path, embedding=embedding, color_by=color_by)
+    )
+    return source, index
+
+
+def load_heatmap(
+    path: str,
+    genes: List[str],
+    groupby: str,
+    layer: Optional[str] = None,
+    zscore: bool = False,
+    cluster_genes: bool = False,
+    cluster_groups: bool = False
+) -> Dict[str, Any]:
+    """Gene x group mean / fraction-expressing matrices for the given genes"""
+    with open_h5ad(path) as file:
+        column = read_obs_column(file, groupby)
+        if column.categories is None:
+            raise ValueError(f"groupby column {groupby} must be categorical")
+        matrix = read_gene_columns(file, gene_columns(file, genes), layer=layer)
+    if matrix.shape[0] != len(column.values):
+        raise ValueError(f"obs column {groupby} does not match the matrix")
+    data = build_heatmap(
+        matrix, genes, column.values, column.categories,
+        zscore=zscore, cluster_genes=cluster_genes, cluster_groups=cluster_groups
+    )
+    data["groupby"] = groupby
+    return data
+
+
+def load_boxplot(
+    path: str,
+    gene: str,
+    groupby: str,
+    layer: Optional[str] = None,
+    kde: bool = False
+) -> Dict[str, Any]:
+    """
+    Per-group quartiles, whiskers, outlier sample and optional KDE of one gene.
+
+    Results are a few KB whatever the cell count; the router caches them
+    through cached_result.
+    """
+    with open_h5ad(path) as file:
+        column = read_obs_column(file, groupby)
+        if column.categories is None:
+            raise ValueError(f"groupby column {groupby} must be categorical")
+        values = read_gene_columns(file, gene_columns(file, [gene]), layer=layer).toarray().ravel()
+    if len(values) != len(column.values):
+        raise ValueError(f"obs column {groupby} does not match the matrix")
+    data = summarize_groups(values, column.values, column.categories, kde_points=KDE_POINTS if kde else 0)
+    data.update({"gene": gene, "groupby": groupby})
+    return data
@@ -0,0 +1,6 @@
+"""
+Performance benchmarks for the K-map backend
+
+Run from the backend directory against a disposable database, e.g.
+    python -m benchmarks.filter_match_modes --rows 200000
+"""
@@ -0,0 +1,119 @@
+"""
+Authenticated request throughput and login event-loop stalls
+
+Part 1 drives an endpoint guarded by the real `get_current_user` dependency
+with the token -> principal cache disabled and enabled.
+
+Part 2 runs concurrent bcrypt verifications inline on the event loop and on
+the password worker pool, while a ticker task measures how late the loop
+wakes up (the stall every other request would see).
+
+    python -m benchmarks.auth_throughput --requests 2000 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import Depends, FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.cache import principal_cache
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.dependencies import get_current_user
+from app.core.security import averify_password, create_access_token, get_password_hash, verify_password
+from app.models.user import User
+from benchmarks.common import BENCH_USERNAME, make_session
+from benchmarks.db_concurrency import drive, to_async_url
+
+
+def build_app(database_url: str, token: str) -> FastAPI:
+    async_factory = async_sessionmaker(
+        bind=create_async_engine(to_async_url(database_url)), autoflush=False, expire_on_commit=False
+    )
+
+    async def bench_db():
+        async with async_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.dependency_overrides[get_async_db] = bench_db
+
+    @app.get("/me")
+    async def me(user: User = Depends(get_current_user)):
+        return {"user_id": user.user_id}
+
+    # drive() issues plain GETs, so attach the bearer token as middleware
+    @app.middleware("http")
+    async def add_token(request, call_next):
+        request.scope["headers"].append((b"authorization", f"Bearer {token}".encode()))
+        return await call_next(request)
+
+    return app
+
+
+async def login_stalls(logins: int, offload: bool) -> dict:
+    hashed = get_password_hash("benchmark-password")
+    worst_lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal worst_lag
+        while not done.is_set():
+            expected = time.perf_counter() + 0.005
+            await asyncio.sleep(0.005)
+            worst_lag = max(worst_lag, time.perf_counter() - expected)
+
+    async def login():
+        if offload:
+            await averify_password("benchmark-password", hashed)
+        else:
+            verify_password("benchmark-password", hashed)
+            await asyncio.sleep(0)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick
+    return {"logins_per_s": logins / elapsed, "max_loop_stall_ms": worst_lag * 1000}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="authenticated requests per run")
+    parser.add_argument("--concurrency", type=int, default=100, help="requests in flight")
+    parser.add_argument("--logins", type=int, default=16, help="concurrent bcrypt verifications")
+    parser.add_argument("--database-url", default=None, help="defaults to the app DATABASE_URL")
+    args = parser.parse_args()
+
+    database_url = args.database_url or settings.DATABASE_URL
+    db = make_session(database_url)
+    if db.query(User).filter(User.username == BENCH_USERNAME).first() is None:
+        db.add(User(username=BENCH_USERNAME, hashed_password="!", role="viewer"))
+        db.commit()
+    db.close()
+
+    app = build_app(database_url, create_access_token({"sub": BENCH_USERNAME}))
+    cache_size = principal_cache.maxsize
+    print(f"{args.requests} authenticated requests, {args.concurrency} in flight")
+    print(f"{'principal cache':<16} {'req/s':>9} {'median ms':>10} {'p95 ms':>9}")
+    for label, maxsize in (("off", 0), ("on", cache_size or 1024)):
+        principal_cache.maxsize = maxsize
+        principal_cache.invalidate()
+        result = asyncio.run(drive(app, "/me", args.requests, args.concurrency))
+        print(f"{label:<16} {result['rps']:>9.1f} {result['median_ms']:>10.2f} {result['p95_ms']:>9.2f}")
+    principal_cache.maxsize = cache_size
+
+    print(f"\n{args.logins} concurrent logins, {settings.PASSWORD_HASH_WORKERS} password workers")
+    print(f"{'bcrypt':<16} {'logins/s':>9} {'max loop stall ms':>18}")
+    for label, offload in (("event loop", False), ("worker pool", True)):
+        result = asyncio.run(login_stalls(args.logins, offload))
+        print(f"{label:<16} {result['logins_per_s']:>9.1f} {result['max_loop_stall_ms']:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Boxplot/violin summaries versus shipping per-cell values
+
+Summarizes one synthetic gene over many cells and groups, and reports the
+encoded size and time next to the per-cell JSON payload the client would
+otherwise have to summarize itself, with a per-group np.percentile loop as
+the baseline.
+
+    python -m benchmarks.boxplot_summaries --cells 1000000 --groups 40
+"""
+
+import argparse
+
+import numpy as np
+
+from app.core.serialization import dumps
+from app.services.distributions import KDE_POINTS, summarize_groups
+from benchmarks.common import timed
+
+
+def loop_baseline(values: np.ndarray, codes: np.ndarray, n_groups: int):
+    return [np.percentile(values[codes == group], [0, 25, 50, 75, 100]) for group in range(n_groups)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cells", type=int, default=1000000, help="cells")
+    parser.add_argument("--groups", type=int, default=40, help="groups")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    codes = rng.integers(0, args.groups, args.cells)
+    # Mostly-zero expression with a lognormal tail, as for a typical gene
+    values = np.where(rng.random(args.cells) < 0.6, 0.0, rng.lognormal(1, 0.8, args.cells)).astype(np.float32)
+    groups = [f"cluster {i}" for i in range(args.groups)]
+
+    summary = summarize_groups(values, codes, groups)
+    violin = summarize_groups(values, codes, groups, kde_points=KDE_POINTS)
+    expected = loop_baseline(values.astype(np.float64), codes, args.groups)
+    for group, quantiles in zip(summary["groups"], expected):
+        np.testing.assert_allclose([group["min"], group["q1"], group["median"], group["q3"], group["max"]], quantiles)
+
+    cases = {
+        "summary": (lambda: summarize_groups(values, codes, groups), len(dumps(summary))),
+        "summary + kde": (lambda: summarize_groups(values, codes, groups, kde_points=KDE_POINTS), len(dumps(violin))),
+        "per-group percentile loop": (lambda: loop_baseline(values, codes, args.groups), None),
+        "per-cell JSON": (lambda: dumps({"values": values, "codes": codes}), len(dumps({"values": values, "codes": codes}))),
+    }
+    print(f"{args.cells} cells x {args.groups} groups")
+    print(f"{'case':<28} {'median ms':>10} {'p95 ms':>9} {'payload KB':>11}")
+    for label, (fn, size) in cases.items():
+        stats = timed(fn, repeat=args.repeat, warmup=1)
+        payload = f"{size / 1024:>11.1f}" if size is not None else f"{'-':>11}"
+        print(f"{label:<28} {stats['median_ms']:>10.1f} {stats['p95_ms']:>9.1f} {payload}")
+
+
+if __name__ == "__main__":
+    main()
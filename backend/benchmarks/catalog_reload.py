@@ -0,0 +1,72 @@
+"""
+Catalog CSV load throughput: cold load, unchanged reload and partial update
+
+Writes a synthetic catalog CSV, loads it with the incremental loader, then
+reloads it unchanged and again with a fraction of rows modified.
+
+    python -m benchmarks.catalog_reload --rows 1000000 --changed 0.01
+"""
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+
+from app.core.config import settings
+from app.models.user import User
+from app.services.catalog_loader import CATALOG_COLUMNS, LOAD_CHUNK_SIZE, load_catalog_csv
+from benchmarks.common import BENCH_ID_PREFIX, BENCH_USERNAME, DATA_TYPES, ORGANS, STATUSES, make_session
+
+
+def write_catalog(path: str, rows: int, changed: float = 0.0, seed: int = 42) -> None:
+    rng = random.Random(seed)
+    change_rng = random.Random(seed + 1)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(CATALOG_COLUMNS)
+        for i in range(rows):
+            organ = rng.choice(ORGANS)
+            data_type = rng.choice(DATA_TYPES)
+            status = rng.choice(STATUSES)
+            if changed and change_rng.random() < changed:
+                status = "Published" if status != "Published" else "QA"
+            group = f"Research Group {rng.randrange(300)} TMC"
+            writer.writerow([
+                f"{BENCH_ID_PREFIX}L{i:09d}", group, data_type, organ, status,
+                f"{2020 + i % 6}-0{1 + i % 9}-1{i % 10}", f"{data_type} data from {organ}.",
+                f"{group} ({2020 + i % 6})", f"/data/{BENCH_ID_PREFIX}L{i:09d}",
+            ])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="catalog rows in the CSV")
+    parser.add_argument("--changed", type=float, default=0.01, help="fraction of rows modified for the update run")
+    parser.add_argument("--chunk-size", type=int, default=LOAD_CHUNK_SIZE, help="rows per upsert batch")
+    parser.add_argument("--database-url", default=None, help="defaults to the app DATABASE_URL")
+    args = parser.parse_args()
+
+    db = make_session(args.database_url or settings.DATABASE_URL)
+    user = db.query(User).filter(User.username == BENCH_USERNAME).first()
+    if user is None:
+        user = User(username=BENCH_USERNAME, hashed_password="!", role="viewer")
+        db.add(user)
+        db.commit()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "catalog.csv")
+        print(f"{args.rows} rows, chunk size {args.chunk_size}")
+        print(f"{'run':<12} {'inserted':>9} {'updated':>9} {'unchanged':>10} {'seconds':>8} {'rows/s':>10}")
+        for label, changed in (("load", 0.0), ("reload", 0.0), ("update", args.changed)):
+            write_catalog(path, args.rows, changed)
+            stats = load_catalog_csv(db, path, uploader_id=user.user_id, chunk_size=args.chunk_size)
+            print(
+                f"{label:<12} {stats['inserted']:>9} {stats['updated']:>9} {stats['unchanged']:>10} "
+                f"{stats['elapsed_seconds']:>8.2f} {stats['rows_per_second']:>10.0f}"
+            )
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
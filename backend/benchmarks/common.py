@@ -0,0 +1,97 @@
+"""
+Shared helpers for benchmarks: DB sessions, a synthetic catalog and timing
+"""
+
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.core.database import Base
+from app.models.dataset import Dataset
+from app.models.user import User
+
+BENCH_ID_PREFIX = "BENCH"
+BENCH_USERNAME = "benchmark"
+
+ORGANS = [
+    "Heart", "Kidney", "Lung", "Liver", "Brain", "Spleen", "Pancreas", "Colon",
+    "Small Intestine", "Large Intestine", "Lymph Node", "Thymus", "Bone Marrow",
+    "Skin", "Eye", "Placenta", "Ovary", "Uterus", "Prostate", "Bladder",
+]
+DATA_TYPES = [
+    "scRNAseq", "snRNAseq", "sciATACseq", "snATACseq", "sciATACseq [SnapATAC]",
+    "CODEX", "MALDI-IMS", "Visium", "Slide-seq", "LC-MS", "WGS", "CITE-seq",
+]
+STATUSES = ["Published", "QA", "Draft"]
+
+
+def make_session(database_url: Optional[str] = None) -> Session:
+    """Open a session on the benchmark database (defaults to the app settings)"""
+    url = database_url or settings.DATABASE_URL
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def ensure_synthetic_catalog(db: Session, rows: int, groups: int = 300, chunk_size: int = 10000) -> int:
+    """
+    Top up the catalog with BENCH* datasets until it holds `rows` of them.
+    
+    Values are drawn from a fixed seed so repeated runs see the same data.
+    Returns the number of synthetic rows present.
+    """
+    user = db.query(User).filter(User.username == BENCH_USERNAME).first()
+    if user is None:
+        user = User(username=BENCH_USERNAME, hashed_password="!", role="viewer")
+        db.add(user)
+        db.commit()
+    
+    existing = db.query(Dataset).filter(Dataset.public_dataset_id.like(f"{BENCH_ID_PREFIX}%")).count()
+    rng = random.Random(42)
+    group_names = [f"Research Group {i} TMC" for i in range(groups)]
+    
+    for start in range(existing, rows, chunk_size):
+        batch = []
+        for i in range(start, min(start + chunk_size, rows)):
+            organ = rng.choice(ORGANS)
+            data_type = rng.choice(DATA_TYPES)
+            group = rng.choice(group_names)
+            batch.append({
+                "public_dataset_id": f"{BENCH_ID_PREFIX}{i:09d}.SYN.{i % 1000:03d}",
+                "uploader_id": user.user_id,
+                "group_name": group,
+                "data_type": data_type,
+                "organ": organ,
+                "status": rng.choice(STATUSES),
+                "publication_date": date(2020, 1, 1) + timedelta(days=rng.randrange(2000)),
+                "description": f"{data_type} data from {organ} generated by {group}. " * rng.randint(1, 8),
+                "citation": f"{group} ({2020 + i % 6})",
+                "file_storage_path": f"/data/{BENCH_ID_PREFIX}{i:09d}",
+            })
+        db.execute(insert(Dataset), batch)
+        db.commit()
+    
+    return max(existing, rows)
+
+
+def timed(fn: Callable[[], object], repeat: int = 20, warmup: int = 2) -> Dict[str, float]:
+    """Run fn repeatedly and return latency statistics in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "min_ms": samples[0],
+    }
@@ -0,0 +1,118 @@
+"""
+Request throughput of the sync (threadpool) vs async (AsyncSession) DB paths
+
+Mounts two equivalent list endpoints on a throwaway app - one the old way
+(`def` + sync Session, served from the anyio threadpool) and one the new
+way (`async def` + AsyncSession.run_sync) - and drives each with the same
+number of concurrent in-flight requests through httpx's ASGI transport.
+
+    python -m benchmarks.db_concurrency --rows 50000 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.services.dataset_service import DatasetService
+from benchmarks.common import ensure_synthetic_catalog, make_session
+
+
+def to_async_url(url: str) -> str:
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+def build_app(database_url: str) -> FastAPI:
+    sync_factory = sessionmaker(bind=create_engine(database_url), autoflush=False)
+    async_factory = async_sessionmaker(
+        bind=create_async_engine(to_async_url(database_url)), autoflush=False, expire_on_commit=False
+    )
+
+    def get_sync_db():
+        db = sync_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with async_factory() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/sync")
+    def list_sync(db: Session = Depends(get_sync_db)):
+        datasets, total = DatasetService.get_datasets_page(db, limit=50, organ="Heart", fields=["public_dataset_id"])
+        return {"n": len(datasets), "total": total}
+
+    @app.get("/async")
+    async def list_async(db: AsyncSession = Depends(get_async_db)):
+        datasets, total = await db.run_sync(
+            DatasetService.get_datasets_page, limit=50, organ="Heart", fields=["public_dataset_id"]
+        )
+        return {"n": len(datasets), "total": total}
+
+    return app
+
+
+async def drive(app: FastAPI, path: str, requests: int, concurrency: int) -> dict:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        await one()  # warm up connections
+        latencies.clear()
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "median_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000, help="synthetic catalog size")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=200, help="requests in flight")
+    parser.add_argument("--database-url", default=None, help="defaults to the app DATABASE_URL")
+    args = parser.parse_args()
+
+    database_url = args.database_url or settings.DATABASE_URL
+    db = make_session(database_url)
+    rows = ensure_synthetic_catalog(db, args.rows)
+    db.close()
+
+    app = build_app(database_url)
+    print(f"{args.requests} requests, {args.concurrency} in flight, {rows} synthetic rows")
+    print(f"{'path':<8} {'req/s':>9} {'median ms':>10} {'p95 ms':>9}")
+    for path in ("/sync", "/async"):
+        result = asyncio.run(drive(app, path, args.requests, args.concurrency))
+        print(f"{path:<8} {result['rps']:>9.1f} {result['median_ms']:>10.2f} {result['p95_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Throughput of concurrent large file downloads
+
+Serves a synthetic file from a throwaway app over real TCP (uvicorn in a
+background thread) and measures aggregate MB/s for:
+
+- N clients each downloading the whole file, via the range-aware
+  file_download_response and via Starlette's FileResponse (64 KiB chunks,
+  the previously commented-out implementation)
+- one client fetching the file as K parallel byte ranges
+
+    python -m benchmarks.download_throughput --size-mb 1024 --clients 8 --ranges 8
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse
+
+from app.core.file_serving import file_download_response
+
+
+def build_app(path: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ranged")
+    async def ranged(request: Request):
+        return await file_download_response(request, path, download_name="bench.bin")
+
+    @app.get("/fileresponse")
+    async def plain():
+        return FileResponse(path, filename="bench.bin", media_type="application/octet-stream")
+
+    return app
+
+
+def start_server(app: FastAPI) -> tuple:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+async def fetch(client: httpx.AsyncClient, url: str, headers: dict = None) -> int:
+    received = 0
+    async with client.stream("GET", url, headers=headers) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_raw():
+            received += len(chunk)
+    return received
+
+
+async def concurrent_full(base_url: str, path: str, clients: int) -> float:
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        started = time.perf_counter()
+        sizes = await asyncio.gather(*(fetch(client, path) for _ in range(clients)))
+        return sum(sizes) / (time.perf_counter() - started) / 1e6
+
+
+async def parallel_ranges(base_url: str, size: int, ranges: int) -> float:
+    step = -(-size // ranges)
+    spans = [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        started = time.perf_counter()
+        sizes = await asyncio.gather(*(
+            fetch(client, "/ranged", {"Range": f"bytes={start}-{end}"}) for start, end in spans
+        ))
+        assert sum(sizes) == size
+        return size / (time.perf_counter() - started) / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=1024, help="synthetic file size")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent full downloads")
+    parser.add_argument("--ranges", type=int, default=8, help="parallel ranges for the split download")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "bench.bin")
+        block = os.urandom(1024 * 1024)
+        with open(path, "wb") as file:
+            for _ in range(args.size_mb):
+                file.write(block)
+        size = os.path.getsize(path)
+
+        server, thread, base_url = start_server(build_app(path))
+        try:
+            print(f"{args.size_mb} MiB file")
+            print(f"{'mode':<36} {'MB/s':>9}")
+            for label, route in (("FileResponse", "/fileresponse"), ("ranged", "/ranged")):
+                rate = asyncio.run(concurrent_full(base_url, route, args.clients))
+                print(f"{f'{label} x{args.clients}':<36} {rate:>9.1f}")
+            rate = asyncio.run(parallel_ranges(base_url, size, args.ranges))
+            print(f"{f'one file in {args.ranges} parallel ranges':<36} {rate:>9.1f}")
+        finally:
+            server.should_exit = True
+            thread.join()
+
+
+if __name__ == "__main__":
+    main()
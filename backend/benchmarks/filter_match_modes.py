@@ -0,0 +1,81 @@
+"""
+Filtered list latency with and without the pg_trgm / btree filter indexes
+
+Builds a synthetic catalog, then times DatasetService.get_datasets_page for
+exact, prefix, fuzzy and similar filters twice: once inside a transaction that drops
+the filter indexes ("before", rolled back afterwards) and once with them.
+Run it against a disposable Postgres database - DROP INDEX locks the table.
+
+    python -m benchmarks.filter_match_modes --rows 200000
+"""
+
+import argparse
+
+from sqlalchemy import text
+
+from app.models.dataset import TRIGRAM_INDEXED_COLUMNS
+from app.services.dataset_service import DatasetService
+from benchmarks.common import ensure_synthetic_catalog, make_session, timed
+
+CASES = [
+    ("organ exact", {"organ": "Kidney"}, {"organ": "exact"}),
+    ("organ prefix", {"organ": "Kid"}, {"organ": "prefix"}),
+    ("organ fuzzy", {"organ": "idne"}, {"organ": "fuzzy"}),
+    ("organ similar", {"organ": "Kidny"}, {"organ": "similar"}),
+    ("data_type prefix", {"data_type": "sn"}, {"data_type": "prefix"}),
+    ("group_name exact", {"group_name": "Research Group 7 TMC"}, {"group_name": "exact"}),
+    ("group_name fuzzy", {"group_name": "Group 17 "}, {"group_name": "fuzzy"}),
+]
+
+FILTER_INDEXES = [
+    *(f"ix_datasets_{column}_trgm" for column in TRIGRAM_INDEXED_COLUMNS),
+    *(f"ix_datasets_{column}_dataset_id" for column in TRIGRAM_INDEXED_COLUMNS),
+]
+
+
+def run_cases(db, repeat: int) -> dict:
+    results = {}
+    for label, filters, match_modes in CASES:
+        results[label] = timed(
+            lambda: DatasetService.get_datasets_page(
+                db, limit=100, count="exact", match_modes=match_modes, **filters
+            ),
+            repeat=repeat,
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000, help="synthetic catalog size")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per case")
+    parser.add_argument("--database-url", default=None, help="defaults to the app DATABASE_URL")
+    args = parser.parse_args()
+
+    db = make_session(args.database_url)
+    rows = ensure_synthetic_catalog(db, args.rows)
+    is_postgres = db.get_bind().dialect.name == "postgresql"
+    if is_postgres:
+        db.execute(text("ANALYZE datasets"))
+        db.commit()
+
+    before = None
+    if is_postgres:
+        for index in FILTER_INDEXES:
+            db.execute(text(f"DROP INDEX IF EXISTS {index}"))
+        before = run_cases(db, args.repeat)
+        db.rollback()
+    after = run_cases(db, args.repeat)
+
+    print(f"Filtered list latency, limit=100, count=exact, {rows} synthetic rows")
+    print(f"{'case':<20} {'before med':>11} {'after med':>10} {'after p95':>10}")
+    for label, _, _ in CASES:
+        before_ms = f"{before[label]['median_ms']:.2f}" if before else "n/a"
+        print(f"{label:<20} {before_ms:>11} {after[label]['median_ms']:>10.2f} {after[label]['p95_ms']:>10.2f}")
+    if not is_postgres:
+        print("(index comparison needs Postgres; only the current path was timed)")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
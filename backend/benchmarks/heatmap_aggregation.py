@@ -0,0 +1,113 @@
+"""
+Heatmap aggregation: 50 genes x 40 clusters x 1M cells
+
+Writes a synthetic .h5ad (sparse X in CSR and in CSC layout), then times
+reading the requested gene columns and the sparse group aggregation
+separately, against a per-cluster NumPy loop over the dense gene block as
+the baseline.
+
+    python -m benchmarks.heatmap_aggregation --cells 1000000 --genes 2000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import h5py
+import numpy as np
+import scipy.sparse
+
+from app.services.h5ad import gene_columns, open_h5ad, read_gene_columns
+from app.services.heatmap import build_heatmap
+from benchmarks.common import timed
+
+
+def write_matrix(path: str, matrix, x_format: str, clusters: np.ndarray, n_clusters: int) -> None:
+    with h5py.File(path, "w") as file:
+        x = file.create_group("X")
+        x.attrs["encoding-type"] = f"{x_format}_matrix"
+        x.attrs["shape"] = matrix.shape
+        x.create_dataset("data", data=matrix.data)
+        x.create_dataset("indices", data=matrix.indices)
+        x.create_dataset("indptr", data=matrix.indptr.astype(np.int64))
+        var = file.create_group("var")
+        var.attrs["_index"] = "_index"
+        var.create_dataset("_index", data=np.array([f"GENE{j}" for j in range(matrix.shape[1])], dtype=h5py.string_dtype()))
+        obs = file.create_group("obs")
+        leiden = obs.create_group("leiden")
+        leiden.attrs["encoding-type"] = "categorical"
+        leiden.create_dataset("codes", data=clusters.astype(np.int8))
+        leiden.create_dataset("categories", data=np.array([str(i) for i in range(n_clusters)], dtype=h5py.string_dtype()))
+
+
+def loop_baseline(dense: np.ndarray, clusters: np.ndarray, n_clusters: int):
+    means = np.empty((n_clusters, dense.shape[1]))
+    fractions = np.empty((n_clusters, dense.shape[1]))
+    for cluster in range(n_clusters):
+        cells = dense[clusters == cluster]
+        means[cluster] = cells.mean(axis=0)
+        fractions[cluster] = (cells > 0).mean(axis=0)
+    return means, fractions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cells", type=int, default=1000000, help="cells (rows of X)")
+    parser.add_argument("--genes", type=int, default=2000, help="genes in X")
+    parser.add_argument("--density", type=float, default=0.05, help="fraction of non-zero entries")
+    parser.add_argument("--query-genes", type=int, default=50, help="genes per heatmap")
+    parser.add_argument("--clusters", type=int, default=40, help="groups")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    clusters = rng.integers(0, args.clusters, args.cells)
+    started = time.perf_counter()
+    row_nnz = rng.binomial(args.genes, args.density, args.cells)
+    indptr = np.concatenate(([0], np.cumsum(row_nnz)))
+    csr = scipy.sparse.csr_matrix(
+        (rng.integers(1, 10, indptr[-1]).astype(np.float32), rng.integers(0, args.genes, indptr[-1]), indptr),
+        shape=(args.cells, args.genes)
+    )
+    csr.sum_duplicates()
+    print(f"X: {args.cells} x {args.genes}, {csr.nnz} non-zeros (generated in {time.perf_counter() - started:.1f}s)")
+    genes = [f"GENE{j}" for j in sorted(rng.choice(args.genes, args.query_genes, replace=False))]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = {}
+        for x_format in ("csr", "csc"):
+            path = os.path.join(workdir, f"{x_format}.h5ad")
+            write_matrix(path, csr if x_format == "csr" else csr.tocsc(), x_format, clusters, args.clusters)
+
+            def read():
+                with open_h5ad(path) as file:
+                    return read_gene_columns(file, gene_columns(file, genes))
+
+            results[f"read genes ({x_format} X)"] = timed(read, repeat=args.repeat, warmup=1)
+        block = read()
+
+        categories = [str(i) for i in range(args.clusters)]
+        results["aggregate (sparse)"] = timed(
+            lambda: build_heatmap(block, genes, clusters, categories), repeat=args.repeat, warmup=1
+        )
+        results["aggregate + zscore + cluster"] = timed(
+            lambda: build_heatmap(block, genes, clusters, categories, zscore=True, cluster_genes=True, cluster_groups=True),
+            repeat=args.repeat, warmup=1
+        )
+        dense = block.toarray()
+        results["per-cluster loop (dense)"] = timed(
+            lambda: loop_baseline(dense, clusters, args.clusters), repeat=args.repeat, warmup=1
+        )
+
+        expected, _ = loop_baseline(dense, clusters, args.clusters)
+        np.testing.assert_allclose(build_heatmap(block, genes, clusters, categories)["mean"], expected.T, rtol=1e-5)
+
+    print(f"{args.query_genes} genes x {args.clusters} clusters x {args.cells} cells")
+    print(f"{'case':<30} {'median ms':>10} {'p95 ms':>9}")
+    for label, stats in results.items():
+        print(f"{label:<30} {stats['median_ms']:>10.1f} {stats['p95_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Dataset list serialization: ORM + pydantic + json vs row tuples + orjson
+
+Times building the response body of one list page both ways, with the query
+included ("query+render") and with pre-fetched rows ("render only"), for
+the default field set and for all fields including description.
+
+    python -m benchmarks.list_serialization --limit 1000
+"""
+
+import argparse
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.serialization import render_dataset_list
+from app.schemas.dataset import DATASET_FIELDS, LIST_DEFAULT_FIELDS, dataset_list_schema
+from app.services.dataset_service import DatasetService
+from benchmarks.common import ensure_synthetic_catalog, make_session, timed
+
+
+def pydantic_body(db, fields, limit, datasets=None) -> bytes:
+    total_count = None
+    if datasets is None:
+        datasets, total_count = DatasetService.get_datasets_page(db, limit=limit, fields=list(fields))
+    page = dataset_list_schema(fields)(datasets=datasets, total_count=total_count, count_mode="exact", skip=0, limit=limit)
+    return JSONResponse(jsonable_encoder(page)).body
+
+
+def rows_body(db, fields, limit, rows=None) -> bytes:
+    total_count = None
+    if rows is None:
+        rows, total_count = DatasetService.get_datasets_page(db, limit=limit, fields=list(fields), as_rows=True)
+    return render_dataset_list(rows, fields, total_count=total_count, count_mode="exact", skip=0, limit=limit)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="synthetic catalog size")
+    parser.add_argument("--limit", type=int, default=1000, help="page size")
+    parser.add_argument("--repeat", type=int, default=30, help="timed runs per case")
+    parser.add_argument("--database-url", default=None, help="defaults to the app DATABASE_URL")
+    args = parser.parse_args()
+
+    db = make_session(args.database_url)
+    rows = ensure_synthetic_catalog(db, args.rows)
+
+    print(f"List page serialization, limit={args.limit}, {rows} synthetic rows")
+    print(f"{'case':<30} {'pydantic med':>13} {'orjson med':>11} {'speedup':>8}")
+    for label, fields in (("default fields", LIST_DEFAULT_FIELDS), ("all fields", DATASET_FIELDS)):
+        if pydantic_body(db, fields, args.limit) != rows_body(db, fields, args.limit):
+            raise SystemExit(f"{label}: bodies differ")
+
+        datasets, _ = DatasetService.get_datasets_page(db, limit=args.limit, fields=list(fields))
+        tuples, _ = DatasetService.get_datasets_page(db, limit=args.limit, fields=list(fields), as_rows=True)
+        cases = (
+            ("query+render", lambda: pydantic_body(db, fields, args.limit), lambda: rows_body(db, fields, args.limit)),
+            ("render only", lambda: pydantic_body(db, fields, args.limit, datasets),
+             lambda: rows_body(db, fields, args.limit, tuples)),
+        )
+        for case, slow, fast in cases:
+            before = timed(slow, repeat=args.repeat)
+            after = timed(fast, repeat=args.repeat)
+            print(
+                f"{label + ', ' + case:<30} {before['median_ms']:>13.2f} {after['median_ms']:>11.2f} "
+                f"{before['median_ms'] / after['median_ms']:>7.1f}x"
+            )
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
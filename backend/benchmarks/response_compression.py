@@ -0,0 +1,90 @@
+"""
+Bytes on the wire and CPU cost per response encoding
+
+Serializes two representative payloads - a limit=1000 catalog list page
+and a 50k-point UMAP scatter - and feeds them through the same encoders the
+compression middleware uses, in 64 KiB pieces as a streamed body would
+arrive. Reports compressed size, ratio and CPU milliseconds per encoding.
+
+    python -m benchmarks.response_compression --rows 1000 --points 50000
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from app.core.compression import ENCODERS
+from benchmarks.common import DATA_TYPES, ORGANS, STATUSES
+
+PIECE_SIZE = 64 * 1024
+
+
+def list_page(rows: int) -> bytes:
+    rng = random.Random(42)
+    datasets = []
+    for i in range(rows):
+        organ, data_type = rng.choice(ORGANS), rng.choice(DATA_TYPES)
+        group = f"Research Group {rng.randrange(300)} TMC"
+        datasets.append({
+            "dataset_id": i + 1,
+            "public_dataset_id": f"HBM{rng.randrange(1000):03d}.{''.join(rng.choices('ABCDEFGHJKLMNPQRSTUVWXYZ', k=4))}.{rng.randrange(1000):03d}",
+            "uploader_id": 1,
+            "group_name": group,
+            "data_type": data_type,
+            "organ": organ,
+            "status": rng.choice(STATUSES),
+            "publication_date": (date(2020, 1, 1) + timedelta(days=rng.randrange(2000))).isoformat(),
+            "citation": f"{group} ({2020 + i % 6})",
+            "file_storage_path": f"/data/HBM{i:06d}",
+            "created_at": "2025-08-27T10:00:00",
+            "updated_at": "2025-08-27T10:00:00",
+        })
+    return json.dumps({"datasets": datasets, "total_count": rows, "skip": 0, "limit": rows}).encode()
+
+
+def umap_payload(points: int) -> bytes:
+    rng = random.Random(7)
+    cell_types = [f"Cell type {i}" for i in range(25)]
+    return json.dumps({
+        "chart_type": "umap",
+        "data": {
+            "x": [round(rng.gauss(0, 5), 4) for _ in range(points)],
+            "y": [round(rng.gauss(0, 5), 4) for _ in range(points)],
+            "labels": [rng.choice(cell_types) for _ in range(points)],
+        },
+    }).encode()
+
+
+def encode(name: str, payload: bytes) -> tuple:
+    started = time.process_time()
+    encoder = ENCODERS[name]()
+    size = 0
+    for offset in range(0, len(payload), PIECE_SIZE):
+        size += len(encoder.compress(payload[offset:offset + PIECE_SIZE]))
+    size += len(encoder.finish())
+    return size, (time.process_time() - started) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="datasets in the list page")
+    parser.add_argument("--points", type=int, default=50000, help="points in the UMAP payload")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per encoding (best CPU time is reported)")
+    args = parser.parse_args()
+
+    payloads = {f"list page ({args.rows} rows)": list_page(args.rows), f"umap ({args.points} points)": umap_payload(args.points)}
+    for label, payload in payloads.items():
+        print(f"\n{label}: {len(payload):,} bytes identity")
+        print(f"{'encoding':<10} {'bytes':>12} {'ratio':>7} {'cpu ms':>8} {'MB/s':>8}")
+        for name in ENCODERS:
+            runs = [encode(name, payload) for _ in range(args.repeat)]
+            size = runs[0][0]
+            cpu_ms = min(cpu for _, cpu in runs)
+            rate = len(payload) / 1e6 / (cpu_ms / 1000) if cpu_ms else float("inf")
+            print(f"{name:<10} {size:>12,} {len(payload) / size:>7.1f} {cpu_ms:>8.2f} {rate:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
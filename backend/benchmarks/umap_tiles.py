@@ -0,0 +1,63 @@
+"""
+UMAP tile latency and payload versus cell count
+
+Indexes synthetic clustered embeddings of increasing size, then times tiles
+at several zoom levels (after the first request per zoom, which builds that
+zoom's bins) and reports their encoded size next to the full-JSON payload.
+
+    python -m benchmarks.umap_tiles --cells 100000 1000000 2000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.core.serialization import dumps
+from app.services.umap_tiles import TileIndex
+from benchmarks.common import timed
+
+
+def synthetic_embedding(cells: int, clusters: int = 40, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(-15, 15, (clusters, 2))
+    labels = rng.integers(0, clusters, cells).astype(np.int32)
+    coordinates = (centers[labels] + rng.normal(0, 1, (cells, 2))).astype(np.float32)
+    return coordinates, labels, [f"cluster {i}" for i in range(clusters)]
+
+
+def central_tile(index: TileIndex, z: int):
+    """Tile containing the densest point, so every zoom is measured on real data"""
+    step = index.size / (1 << z)
+    return (
+        min(int((float(np.median(index.x)) - index.x0) / step), (1 << z) - 1),
+        min(int((float(np.median(index.y)) - index.y0) / step), (1 << z) - 1),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cells", type=int, nargs="+", default=[100000, 1000000, 2000000], help="embedding sizes")
+    parser.add_argument("--zooms", type=int, nargs="+", default=[0, 3, 6, 9], help="zoom levels to time")
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per tile")
+    args = parser.parse_args()
+
+    print(f"{'cells':>9} {'full JSON MB':>13} {'index s':>8} {'zoom':>5} {'mode':>8} {'tile KB':>8} {'med ms':>7} {'p95 ms':>7}")
+    for cells in args.cells:
+        coordinates, labels, categories = synthetic_embedding(cells)
+        full_mb = len(dumps({"x": coordinates[:, 0].copy(), "y": coordinates[:, 1].copy(), "labels": labels})) / 1e6
+        started = time.perf_counter()
+        index = TileIndex(coordinates, labels, categories)
+        build_seconds = time.perf_counter() - started
+        for z in args.zooms:
+            x, y = central_tile(index, z)
+            tile = index.tile(z, x, y)
+            stats = timed(lambda: dumps(index.tile(z, x, y)), repeat=args.repeat)
+            print(
+                f"{cells:>9} {full_mb:>13.1f} {build_seconds:>8.2f} {z:>5} {tile['mode']:>8} "
+                f"{len(dumps(tile)) / 1024:>8.1f} {stats['median_ms']:>7.2f} {stats['p95_ms']:>7.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+On-disk visualization result cache: computing versus reading back
+
+Writes a synthetic .h5ad (CSR X, categorical obs), then times heatmap and
+boxplot results computed from the file against the same results read from
+the disk cache, and compares the entry size with the JSON encoding of the
+result.
+
+    python -m benchmarks.visualization_disk_cache --cells 1000000 --genes 2000
+"""
+
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import scipy.sparse
+
+from app.core.cache import TTLCache
+from app.core.disk_cache import DiskCache
+from app.core.serialization import dumps
+from app.services import visualization_service
+from benchmarks.common import timed
+from benchmarks.heatmap_aggregation import write_matrix
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cells", type=int, default=1000000, help="cells (rows of X)")
+    parser.add_argument("--genes", type=int, default=2000, help="genes in X")
+    parser.add_argument("--density", type=float, default=0.05, help="fraction of non-zero entries")
+    parser.add_argument("--query-genes", type=int, default=50, help="genes per heatmap")
+    parser.add_argument("--clusters", type=int, default=40, help="groups")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    clusters = rng.integers(0, args.clusters, args.cells)
+    row_nnz = rng.binomial(args.genes, args.density, args.cells)
+    indptr = np.concatenate(([0], np.cumsum(row_nnz)))
+    csr = scipy.sparse.csr_matrix(
+        (rng.integers(1, 10, indptr[-1]).astype(np.float32), rng.integers(0, args.genes, indptr[-1]), indptr),
+        shape=(args.cells, args.genes)
+    )
+    genes = [f"GENE{j}" for j in sorted(rng.choice(args.genes, args.query_genes, replace=False))]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "atlas.h5ad")
+        write_matrix(path, csr, "csr", clusters, args.clusters)
+
+        cache = DiskCache(os.path.join(workdir, "cache"), max_bytes=1 << 30)
+        visualization_service.visualization_disk_cache = cache
+        # Time the disk entries themselves, not the in-process cache in front of them
+        visualization_service.visualization_cache = TTLCache(maxsize=0, ttl=0)
+        cases = {
+            "heatmap": (visualization_service.load_heatmap, {"genes": genes, "groupby": "leiden", "zscore": True}),
+            "boxplot": (visualization_service.load_boxplot, {"gene": genes[0], "groupby": "leiden", "layer": None, "kde": True}),
+        }
+        print(f"{args.cells} cells, {args.query_genes} genes x {args.clusters} clusters")
+        print(f"{'chart':<9} {'compute ms':>11} {'cached ms':>10} {'entry KB':>9} {'JSON KB':>9}")
+        for chart, (compute, params) in cases.items():
+            computed = timed(lambda: compute(path, **params), repeat=args.repeat, warmup=1)
+            result = visualization_service.cached_result(chart, "BENCH", path, compute, **params)
+            cached = timed(
+                lambda: visualization_service.cached_result(chart, "BENCH", path, compute, **params),
+                repeat=args.repeat, warmup=1
+            )
+            assert dumps(visualization_service.cached_result(chart, "BENCH", path, compute, **params)) == dumps(result)
+            entry_kb = os.path.getsize(cache._path(next(reversed(cache._index)))) / 1024
+            print(
+                f"{chart:<9} {computed['median_ms']:>11.1f} {cached['median_ms']:>10.1f} "
+                f"{entry_kb:>9.1f} {len(dumps(result)) / 1024:>9.1f}"
+            )
+        stats = cache.stats()
+        print(f"hit rate {stats['hit_rate']:.2f}, {stats['bytes_saved'] / 1e6:.1f} MB and "
+              f"{stats['compute_seconds_saved']:.2f} s of computation saved")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,117 +1,68 @@
 #!/usr/bin/env python3
 """
 Database seeding script for K-map project
-Seeds the database with initial admin user and datasets from CSV file
+Seeds the database with the admin user and loads new or changed datasets from a CSV file
+
+    python scripts/seed_db.py [--csv /app/datasets.csv] [--chunk-size 5000]
 """
 
-import csv
+import argparse
 import sys
 import os
-from datetime import datetime, date
-from pathlib import Path
 
 # Add the app directory to Python path
 sys.path.append('/app')
 
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
-from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.database import Base
 from app.models.user import User
 from app.models.dataset import Dataset
+from app.services.catalog_loader import LOAD_CHUNK_SIZE, admin_password_configured, ensure_admin_user, load_catalog_csv
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
-def seed_database():
+def seed_database(csv_file_path: str = "/app/datasets.csv", chunk_size: int = LOAD_CHUNK_SIZE):
     """Seed database with initial data"""
-    
+
     # Create database connection
     engine = create_engine(settings.DATABASE_URL)
+    Base.metadata.create_all(bind=engine)
     SessionLocal = sessionmaker(bind=engine)
     db = SessionLocal()
-    
+
     try:
         print("🌱 Starting database seeding...")
-        
-        # Check if admin user already exists
-        admin_user = db.query(User).filter(User.username == "admin").first()
-        if not admin_user:
-            print("👤 Creating admin user...")
-            admin_user = User(
-                username="admin",
-                hashed_password=get_password_hash("admin_password"),
-                role="admin"
-            )
-            db.add(admin_user)
-            db.commit()
-            db.refresh(admin_user)
-            print(f"✅ Admin user created with ID: {admin_user.user_id}")
-        else:
-            print(f"👤 Admin user already exists with ID: {admin_user.user_id}")
-        
-        # Check if datasets already exist
-        existing_count = db.query(Dataset).count()
-        if existing_count > 0:
-            print(f"📊 {existing_count} datasets already exist in database")
-            return
-        
-        # Read CSV file and seed datasets
-        csv_file_path = "/app/datasets.csv"
+
+        admin_user = ensure_admin_user(db)
+        print(f"👤 Admin user: {admin_user.username} (ID: {admin_user.user_id})")
+        if not admin_password_configured():
+            print("⚠️  ADMIN_PASSWORD is the default; set it before exposing this deployment")
+
         if not os.path.exists(csv_file_path):
             print(f"❌ CSV file not found: {csv_file_path}")
             return
-        
-        print(f"📁 Reading datasets from: {csv_file_path}")
-        
-        datasets_created = 0
-        with open(csv_file_path, 'r', encoding='utf-8') as file:
-            csv_reader = csv.DictReader(file)
-            
-            for row in csv_reader:
-                # Skip empty rows
-                if not row.get('public_dataset_id'):
-                    continue
-                
-                # Parse publication date
-                try:
-                    pub_date = datetime.strptime(row['publication_date'], '%Y-%m-%d').date()
-                except ValueError:
-                    pub_date = date.today()
-                
-                # Create dataset
-                dataset = Dataset(
-                    public_dataset_id=row['public_dataset_id'],
-                    uploader_id=admin_user.user_id,
-                    group_name=row['group_name'],
-                    data_type=row['data_type'],
-                    organ=row['organ'],
-                    status=row['status'],
-                    publication_date=pub_date,
-                    description=row['description'],
-                    citation=row['citation'],
-                    file_storage_path=row['file_storage_path']
-                )
-                
-                db.add(dataset)
-                datasets_created += 1
-        
-        # Commit all datasets
-        db.commit()
-        print(f"✅ Successfully created {datasets_created} datasets")
-        
+
+        print(f"📁 Loading datasets from: {csv_file_path}")
+        stats = load_catalog_csv(db, csv_file_path, uploader_id=admin_user.user_id, chunk_size=chunk_size)
+        print(
+            f"✅ {stats['processed']} rows processed: {stats['inserted']} inserted, "
+            f"{stats['updated']} updated, {stats['unchanged']} unchanged, {stats['failed']} rejected"
+        )
+        for error in stats["errors"]:
+            print(f"⚠️  Line {error['line']} ({error['public_dataset_id']}): {error['error']}")
+        if stats["errors_truncated"]:
+            print("⚠️  More rows were rejected than listed above")
+        print(f"⏱️  {stats['elapsed_seconds']:.2f}s ({stats['rows_per_second']:.0f} rows/s)")
+
         # Verify data
         total_datasets = db.query(Dataset).count()
         total_users = db.query(User).count()
-        
+
         print("🎯 Database seeding completed!")
         print(f"📊 Total datasets in database: {total_datasets}")
         print(f"👥 Total users in database: {total_users}")
-        
+
     except Exception as e:
         print(f"❌ Error during seeding: {str(e)}")
         db.rollback()
@@ -120,4 +71,8 @@ def seed_database():
         db.close()
 
 if __name__ == "__main__":
-    seed_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Seed the K-map database from a datasets CSV")
+    parser.add_argument("--csv", default="/app/datasets.csv", help="path to the datasets CSV")
+    parser.add_argument("--chunk-size", type=int, default=LOAD_CHUNK_SIZE, help="rows per upsert batch")
+    args = parser.parse_args()
+    seed_database(args.csv, args.chunk_size)
@@ -0,0 +1,23 @@
+"""
+Fixtures shared by the API test modules
+"""
+
+import pytest
+
+from app.core.security import create_access_token
+from app.models.dataset import Dataset
+from app.models.user import User
+from tests.test_datasets_api import TestingSessionLocal
+
+
+@pytest.fixture(scope="class")
+def admin_headers():
+    db = TestingSessionLocal()
+    user = User(username="bulk_tester", hashed_password="x", role="admin")
+    db.add(user)
+    db.commit()
+    yield {"Authorization": f"Bearer {create_access_token({'sub': 'bulk_tester'})}"}
+    db.query(Dataset).filter(Dataset.public_dataset_id.like("BULK%")).delete(synchronize_session=False)
+    db.delete(user)
+    db.commit()
+    db.close()
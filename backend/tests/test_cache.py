@@ -0,0 +1,50 @@
+"""
+Tests for the in-process catalog response cache
+"""
+
+import time
+
+from app.core.cache import TTLCache
+
+
+class TestTTLCache:
+    """LRU eviction, TTL expiry and version invalidation"""
+    
+    def test_hit_and_miss(self):
+        cache = TTLCache(maxsize=4, ttl=60)
+        calls = []
+        for _ in range(3):
+            cache.get_or_set("list", ("a", 1), lambda: calls.append(1) or "value")
+        assert len(calls) == 1
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"]) == (2, 1)
+    
+    def test_lru_eviction(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.get_or_set("list", 1, lambda: "one")
+        cache.get_or_set("list", 2, lambda: "two")
+        cache.get_or_set("list", 1, lambda: "one")  # 1 becomes most recently used
+        cache.get_or_set("list", 3, lambda: "three")  # evicts 2
+        assert cache.stats()["evictions"] == 1
+        assert cache.get_or_set("list", 1, lambda: "recomputed") == "one"
+        assert cache.get_or_set("list", 2, lambda: "recomputed") == "recomputed"
+    
+    def test_ttl_expiry(self):
+        cache = TTLCache(maxsize=2, ttl=0.01)
+        cache.get_or_set("detail", "HBM1", lambda: "old")
+        time.sleep(0.02)
+        assert cache.get_or_set("detail", "HBM1", lambda: "new") == "new"
+        assert cache.stats()["expirations"] == 1
+    
+    def test_invalidate_bumps_version(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.get_or_set("statistics", None, lambda: {"total": 1})
+        cache.invalidate()
+        assert cache.get_or_set("statistics", None, lambda: {"total": 2}) == {"total": 2}
+        assert cache.stats()["version"] == 1
+    
+    def test_disabled_cache_always_computes(self):
+        cache = TTLCache(maxsize=0, ttl=60)
+        assert cache.get_or_set("list", 1, lambda: "a") == "a"
+        assert cache.get_or_set("list", 1, lambda: "b") == "b"
+        assert cache.stats()["size"] == 0
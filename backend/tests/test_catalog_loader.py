@@ -0,0 +1,131 @@
+"""
+Tests for the incremental catalog loader
+"""
+
+import csv
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.dataset import Dataset
+from app.models.user import User
+from app.core.config import settings
+from app.core.security import UNUSABLE_PASSWORD, verify_password
+from app.services import dataset_service
+from app.services.catalog_loader import CATALOG_COLUMNS, admin_password_configured, ensure_admin_user, load_catalog_csv
+
+
+def write_catalog(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=CATALOG_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def catalog_row(i, organ="Heart"):
+    return {
+        "public_dataset_id": f"LOAD{i:03d}",
+        "group_name": "Loader TMC",
+        "data_type": "scRNAseq",
+        "organ": organ,
+        "status": "Published",
+        "publication_date": "2024-01-15" if i % 2 else "",
+        "description": f"Dataset {i}, with a comma",
+        "citation": "Loader TMC (2024)",
+        "file_storage_path": f"/data/LOAD{i:03d}",
+    }
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'loader.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(username="loader", hashed_password="x", role="admin"))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_reload_only_writes_changed_rows(db, tmp_path):
+    path = tmp_path / "datasets.csv"
+    rows = [catalog_row(i) for i in range(12)]
+    write_catalog(path, rows)
+
+    stats = load_catalog_csv(db, str(path), uploader_id=1, chunk_size=5)
+    assert (stats["processed"], stats["inserted"], stats["updated"], stats["unchanged"]) == (12, 12, 0, 0)
+    assert stats["rows_per_second"] > 0
+
+    stats = load_catalog_csv(db, str(path), uploader_id=1, chunk_size=5)
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (0, 0, 12)
+
+    rows[3] = catalog_row(3, organ="Lung")
+    rows.append(catalog_row(12))
+    write_catalog(path, rows)
+    stats = load_catalog_csv(db, str(path), uploader_id=1, chunk_size=5)
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (1, 1, 11)
+
+    db.expire_all()
+    assert db.query(Dataset).count() == 13
+    changed = db.query(Dataset).filter(Dataset.public_dataset_id == "LOAD003").one()
+    assert changed.organ == "Lung"
+    assert changed.publication_date.isoformat() == "2024-01-15"
+    assert db.query(Dataset).filter(Dataset.public_dataset_id == "LOAD000").one().publication_date is None
+
+
+def test_reload_without_native_upsert(db, tmp_path, monkeypatch):
+    # Dialects without ON CONFLICT take the select-then-write path
+    monkeypatch.setattr(dataset_service, "UPSERT_INSERTS", {})
+    path = tmp_path / "datasets.csv"
+    rows = [catalog_row(i) for i in range(7)]
+    write_catalog(path, rows)
+    stats = load_catalog_csv(db, str(path), uploader_id=1, chunk_size=3)
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (7, 0, 0)
+
+    rows[2] = catalog_row(2, organ="Lung")
+    rows.append(catalog_row(7))
+    write_catalog(path, rows)
+    stats = load_catalog_csv(db, str(path), uploader_id=1, chunk_size=3)
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (1, 1, 6)
+
+    db.expire_all()
+    assert db.query(Dataset).count() == 8
+    changed = db.query(Dataset).filter(Dataset.public_dataset_id == "LOAD002").one()
+    assert (changed.organ, changed.status, changed.uploader_id) == ("Lung", "Published", 1)
+
+
+def test_invalid_dates_are_rejected_and_reported(db, tmp_path):
+    path = tmp_path / "datasets.csv"
+    rows = [catalog_row(i) for i in range(4)]
+    write_catalog(path, rows)
+    load_catalog_csv(db, str(path), uploader_id=1)
+
+    rows[1]["publication_date"] = "2024-13-01"
+    rows[2]["description"] = "spans\ntwo lines"
+    rows[3]["publication_date"] = "15/01/2024"
+    write_catalog(path, rows)
+    stats = load_catalog_csv(db, str(path), uploader_id=1)
+    assert (stats["processed"], stats["updated"], stats["unchanged"], stats["failed"]) == (4, 1, 1, 2)
+    assert [(error["line"], error["public_dataset_id"]) for error in stats["errors"]] == [(3, "LOAD001"), (6, "LOAD003")]
+    assert "2024-13-01" in stats["errors"][0]["error"]
+
+    # Rejected rows keep their stored values instead of losing the date
+    db.expire_all()
+    assert db.query(Dataset).filter(Dataset.public_dataset_id == "LOAD001").one().publication_date.isoformat() == "2024-01-15"
+
+
+def test_startup_admin_has_no_usable_default_password(db, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_USERNAME", "startup_admin")
+    assert not admin_password_configured()
+    admin = ensure_admin_user(db, usable_password=admin_password_configured())
+    assert admin.hashed_password == UNUSABLE_PASSWORD
+    assert not verify_password(settings.ADMIN_PASSWORD, admin.hashed_password)
+
+    # Configuring a password later makes the existing account usable
+    monkeypatch.setattr(settings, "ADMIN_PASSWORD", "a-real-secret")
+    assert admin_password_configured()
+    admin = ensure_admin_user(db, usable_password=admin_password_configured())
+    assert verify_password("a-real-secret", admin.hashed_password)
@@ -0,0 +1,106 @@
+"""
+Tests for the response compression middleware
+"""
+
+import gzip
+import json
+
+import brotli
+import pytest
+import zstandard
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware, negotiate_encoding
+from app.core.http_cache import is_not_modified, make_etag, not_modified_response
+
+PAYLOAD = {"datasets": [{"public_dataset_id": f"HBM{i:03d}.TEST.001", "organ": "Heart"} for i in range(200)]}
+ETAG = make_etag("payload")
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+
+@app.get("/json")
+def large_json(request: Request):
+    if is_not_modified(request, ETAG):
+        return not_modified_response(ETAG)
+    return JSONResponse(PAYLOAD, headers={"ETag": ETAG})
+
+
+@app.get("/small")
+def small_json():
+    return {"ok": True}
+
+
+@app.get("/stream")
+def stream_ndjson():
+    rows = (json.dumps(row).encode() + b"\n" for row in PAYLOAD["datasets"])
+    return StreamingResponse(rows, media_type="application/x-ndjson")
+
+
+@app.get("/download")
+def download():
+    return Response(b"\x1f\x8b" + b"\0" * 4096, media_type="application/octet-stream")
+
+
+client = TestClient(app)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br, zstd", "zstd"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br, gzip", "br"),
+    ("*;q=0.5, zstd;q=0", "br"),
+    ("identity", None),
+    ("", None),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header, ["zstd", "br", "gzip"]) == expected
+
+
+@pytest.mark.parametrize("encoding, decode", [
+    ("gzip", gzip.decompress),
+    ("br", brotli.decompress),
+    ("zstd", lambda body: zstandard.ZstdDecompressor().decompressobj().decompress(body)),
+])
+def test_large_json_is_compressed(encoding, decode):
+    with client.stream("GET", "/json", headers={"Accept-Encoding": encoding}) as response:
+        body = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == encoding
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert "content-length" not in response.headers or int(response.headers["content-length"]) == len(body)
+    assert response.headers["etag"] == f"W/{ETAG}"
+    assert json.loads(decode(body)) == PAYLOAD
+
+
+def test_weak_etag_still_revalidates():
+    response = client.get("/json", headers={"Accept-Encoding": "gzip", "If-None-Match": f"W/{ETAG}"})
+    assert response.status_code == 304
+    assert response.headers["etag"] == f"W/{ETAG}"
+
+    response = client.get("/json", headers={"Accept-Encoding": "gzip", "If-None-Match": ETAG})
+    assert response.status_code == 304
+    assert response.headers["etag"] == ETAG
+
+
+def test_streaming_response_is_compressed():
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        body = b"".join(response.iter_raw())
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body).count(b"\n") == len(PAYLOAD["datasets"])
+
+
+def test_small_and_binary_responses_pass_through():
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"ok": True}
+
+    response = client.get("/download", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.content.startswith(b"\x1f\x8b")
+
+    response = client.get("/json", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == ETAG
@@ -2,14 +2,33 @@
 Basic tests for Datasets CRUD API
 """
 
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import os
 import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from datetime import date, datetime, timedelta
 
 from app.main import app
-from app.core.database import Base, get_db
+from app.core.database import Base, get_db, get_async_db
 from app.core.config import settings
+from app.core.cache import catalog_cache, principal_cache
+from app.core.security import create_access_token, get_password_hash
+from app.core.serialization import render_dataset_list
+from app.models.dataset import Dataset
+from app.models.user import User
+from app.schemas.dataset import DATASET_FIELDS, LIST_DEFAULT_FIELDS, dataset_list_schema
+from app.services import bulk_import, upload_service
+from app.services.dataset_service import DatasetService, SORTABLE_FIELDS
 
 # Test database URL
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -26,7 +45,17 @@ def override_get_db():
     finally:
         db.close()
 
+# API endpoints use the async session; point them at the same SQLite file.
+# NullPool because TestClient may run each request on a fresh event loop.
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
 
 client = TestClient(app)
 
@@ -75,6 +104,393 @@ class TestDatasetsAPI:
         response = client.get("/api/v1/datasets/NONEXISTENT.ID.123")
         assert response.status_code == 404
 
+@pytest.fixture(scope="class")
+def seeded_datasets():
+    """Insert a small catalog (with NULL and duplicate sort values) for pagination tests"""
+    db = TestingSessionLocal()
+    user = User(username="pagination_tester", hashed_password="x", role="admin")
+    db.add(user)
+    db.commit()
+    organs = ["Heart", "Kidney", None, "Lung"]
+    for i in range(23):
+        db.add(Dataset(
+            public_dataset_id=f"TEST{i:03d}.PAGE.001",
+            uploader_id=user.user_id,
+            group_name=f"Group {i % 3}",
+            data_type="scRNAseq" if i % 2 else "snATACseq",
+            organ=organs[i % 4],
+            status="Published",
+            publication_date=None if i % 5 == 0 else date(2025, 1 + i % 4, 1),
+            description=f"Pagination dataset {i}",
+            created_at=datetime(2025, 6, 1, i % 7),
+            updated_at=datetime(2025, 6, 2, i % 4),
+        ))
+    db.commit()
+    # Rows were written behind the API's back, so drop any cached catalog reads
+    catalog_cache.invalidate()
+    yield
+    db.query(Dataset).filter(Dataset.public_dataset_id.like("TEST%.PAGE.001")).delete(synchronize_session=False)
+    db.query(User).filter(User.username == "pagination_tester").delete()
+    db.commit()
+    db.close()
+    catalog_cache.invalidate()
+
+@pytest.mark.usefixtures("seeded_datasets")
+class TestCatalogQueries:
+    """List, pagination and aggregate behaviour over a seeded catalog"""
+    
+    @pytest.mark.parametrize("sort_by", SORTABLE_FIELDS)
+    @pytest.mark.parametrize("sort_order", ["asc", "desc"])
+    def test_cursor_walk_matches_offset(self, sort_by, sort_order):
+        params = {"search": "Pagination dataset", "sort_by": sort_by, "sort_order": sort_order}
+        full = client.get("/api/v1/datasets", params={**params, "limit": 1000}).json()
+        expected = [d["public_dataset_id"] for d in full["datasets"]]
+        assert len(expected) == 23
+        
+        seen = []
+        cursor = None
+        for _ in range(10):
+            page_params = {**params, "limit": 5}
+            if cursor:
+                page_params["cursor"] = cursor
+            data = client.get("/api/v1/datasets", params=page_params).json()
+            seen.extend(d["public_dataset_id"] for d in data["datasets"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        assert cursor is None
+        assert seen == expected
+    
+    def test_cursor_sort_mismatch_rejected(self):
+        first = client.get("/api/v1/datasets?search=Pagination dataset&limit=5").json()
+        response = client.get(
+            "/api/v1/datasets",
+            params={"cursor": first["next_cursor"], "sort_by": "organ", "limit": 5}
+        )
+        assert response.status_code == 400
+    
+    def test_window_total_matches_count_query(self):
+        data = client.get("/api/v1/datasets?search=Pagination dataset&organ=Heart&limit=2").json()
+        assert len(data["datasets"]) == 2
+        assert data["total_count"] == 6
+        
+        past_end = client.get("/api/v1/datasets?search=Pagination dataset&skip=100").json()
+        assert past_end["datasets"] == []
+        assert past_end["total_count"] == 23
+    
+    def test_count_modes(self):
+        none = client.get("/api/v1/datasets?search=Pagination dataset&count=none").json()
+        assert none["total_count"] is None
+        assert none["count_mode"] == "none"
+        
+        # SQLite has no planner estimate, so 'estimated' falls back to an exact count
+        estimated = client.get("/api/v1/datasets?search=Pagination dataset&count=estimated").json()
+        assert estimated["total_count"] == 23
+        
+        response = client.get("/api/v1/datasets?count=sometimes")
+        assert response.status_code == 422
+    
+    def test_estimated_count_binds_filters_positionally(self, monkeypatch):
+        """The EXPLAIN is compiled by the dialect, so asyncpg gets $n placeholders and ordered values"""
+        from types import SimpleNamespace
+        from sqlalchemy.dialects.postgresql import asyncpg
+        dialect = asyncpg.dialect()
+        executed = {}
+        
+        def execute(statement):
+            compiled = statement.compile(dialect=dialect)
+            executed["sql"] = str(compiled)
+            executed["params"] = [compiled.params[name] for name in compiled.positiontup]
+            return SimpleNamespace(scalar=lambda: [{"Plan": {"Plan Rows": 42}}])
+        
+        db = TestingSessionLocal()
+        try:
+            monkeypatch.setattr(db, "get_bind", lambda *args, **kwargs: SimpleNamespace(dialect=dialect))
+            monkeypatch.setattr(db, "execute", execute)
+            count = DatasetService.estimate_datasets_count(
+                db, organ="Heart", status="Published", match_modes={"organ": "exact"}
+            )
+        finally:
+            db.close()
+        assert count == 42
+        assert executed["sql"].startswith("EXPLAIN (FORMAT JSON) SELECT")
+        assert "$1" in executed["sql"] and "%(" not in executed["sql"]
+        assert executed["params"] == ["Heart", "Published"]
+    
+    def test_relevance_sort_falls_back_without_fulltext(self):
+        # SQLite has no search_vector: relevance sort uses the default ordering and ilike search
+        relevance = client.get("/api/v1/datasets?search=Pagination dataset&sort_by=relevance&limit=1000").json()
+        default = client.get("/api/v1/datasets?search=Pagination dataset&limit=1000").json()
+        assert relevance["total_count"] == 23
+        assert relevance["datasets"] == default["datasets"]
+    
+    def test_filter_match_modes(self):
+        base = "/api/v1/datasets?search=Pagination dataset&limit=1000"
+        exact = client.get(f"{base}&data_type=scRNAseq&data_type_match=exact").json()
+        assert exact["total_count"] == 11
+        assert all(d["data_type"] == "scRNAseq" for d in exact["datasets"])
+        
+        assert client.get(f"{base}&data_type=scRNA&data_type_match=exact").json()["total_count"] == 0
+        assert client.get(f"{base}&data_type=scRNA&data_type_match=prefix").json()["total_count"] == 11
+        assert client.get(f"{base}&data_type=RNA&data_type_match=prefix").json()["total_count"] == 0
+        assert client.get(f"{base}&data_type=RNA").json()["total_count"] == 11
+        
+        # Without pg_trgm, 'similar' is a substring match like 'fuzzy'
+        assert client.get(f"{base}&data_type=RNA&data_type_match=similar").json()["total_count"] == 11
+        
+        response = client.get(f"{base}&organ=Heart&organ_match=regex")
+        assert response.status_code == 422
+    
+    def test_trigram_similarity_only_in_similar_mode(self):
+        """On Postgres the default 'fuzzy' filter stays a plain substring match"""
+        from sqlalchemy.dialects import postgresql
+        
+        def render(mode):
+            (clause,) = DatasetService.build_filters(organ="Heart", match_modes={"organ": mode}, fulltext=True)
+            return str(clause.compile(dialect=postgresql.dialect()))
+        
+        assert render("fuzzy") == "datasets.organ ILIKE %(organ_1)s"
+        assert "datasets.organ %% %(organ_2)s" in render("similar")
+    
+    def test_fulltext_search_uses_both_configs_and_id_prefix(self):
+        from sqlalchemy.dialects import postgresql
+        
+        (clause,) = DatasetService.build_filters(search="HBM12", fulltext=True)
+        sql = str(clause.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        assert (
+            "datasets.search_vector @@ (websearch_to_tsquery('simple'::regconfig, 'HBM12') || "
+            "websearch_to_tsquery('english'::regconfig, 'HBM12'))"
+        ) in sql
+        assert "datasets.public_dataset_id ILIKE 'HBM12%%'" in sql
+    
+    def test_malformed_cursor_rejected(self):
+        response = client.get("/api/v1/datasets?cursor=not-a-cursor")
+        assert response.status_code == 400
+    
+    def test_list_responses_are_cached(self):
+        before = catalog_cache.stats()
+        first = client.get("/api/v1/datasets?search=Pagination dataset&limit=3&sort_by=publication_date")
+        # Unknown sort fields fall back to publication_date, so this normalizes to the same key
+        second = client.get("/api/v1/datasets?search=Pagination dataset&limit=3&sort_by=no_such_field")
+        after = catalog_cache.stats()
+        assert first.json() == second.json()
+        assert after["misses"] == before["misses"] + 1
+        assert after["hits"] == before["hits"] + 1
+    
+    def test_conditional_get_list(self):
+        url = "/api/v1/datasets?search=Pagination dataset&limit=5"
+        first = client.get(url)
+        etag = first.headers["etag"]
+        assert first.headers["last-modified"].endswith("GMT")
+        
+        cached = client.get(url, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers["etag"] == etag
+        
+        by_date = client.get(url, headers={"If-Modified-Since": first.headers["last-modified"]})
+        assert by_date.status_code == 304
+        
+        # A different page is a different representation
+        other_page = client.get(f"{url}&skip=5", headers={"If-None-Match": etag})
+        assert other_page.status_code == 200
+    
+    def test_validators_are_cached_with_the_page(self, monkeypatch):
+        """Unconditional cache hits run no freshness query; conditional requests do"""
+        calls = []
+        freshness = DatasetService.get_datasets_freshness
+        monkeypatch.setattr(
+            DatasetService, "get_datasets_freshness",
+            staticmethod(lambda *args, **kwargs: calls.append(1) or freshness(*args, **kwargs))
+        )
+        url = "/api/v1/datasets?search=Pagination dataset&limit=4&count=none"
+        first = client.get(url)
+        assert len(calls) == 1
+        second = client.get(url)
+        assert len(calls) == 1
+        assert second.headers["etag"] == first.headers["etag"]
+        
+        assert client.get(url, headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+        assert len(calls) == 2
+        
+        statistics = client.get("/api/v1/datasets/statistics/summary")
+        client.get("/api/v1/datasets/statistics/summary")
+        assert len(calls) <= 3
+        assert client.get(
+            "/api/v1/datasets/statistics/summary", headers={"If-None-Match": statistics.headers["etag"]}
+        ).status_code == 304
+    
+    def test_conditional_get_detail(self):
+        url = "/api/v1/datasets/TEST003.PAGE.001"
+        first = client.get(url)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+        assert client.get(url, headers={"If-None-Match": '"stale"'}).status_code == 200
+        
+        db = TestingSessionLocal()
+        dataset = db.query(Dataset).filter(Dataset.public_dataset_id == "TEST003.PAGE.001").one()
+        dataset.updated_at = datetime(2025, 7, 1)
+        db.commit()
+        db.close()
+        catalog_cache.invalidate()
+        
+        changed = client.get(url, headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+    
+    def test_detail_etag_matches_cached_body(self):
+        url = "/api/v1/datasets/TEST005.PAGE.001"
+        catalog_cache.invalidate()
+        first = client.get(url)
+        
+        # Written behind the API's back: the cached body is served with the validators it was read with
+        db = TestingSessionLocal()
+        dataset = db.query(Dataset).filter(Dataset.public_dataset_id == "TEST005.PAGE.001").one()
+        original = (dataset.description, dataset.updated_at)
+        dataset.description = "Edited description"
+        dataset.updated_at = datetime(2025, 6, 3)
+        db.commit()
+        cached = client.get(url)
+        assert cached.json()["description"] == first.json()["description"]
+        assert cached.headers["etag"] == first.headers["etag"]
+        
+        catalog_cache.invalidate()
+        fresh = client.get(url)
+        assert fresh.json()["description"] == "Edited description"
+        assert fresh.headers["etag"] != first.headers["etag"]
+        assert fresh.headers["last-modified"] != first.headers["last-modified"]
+        
+        dataset.description, dataset.updated_at = original
+        db.commit()
+        db.close()
+        catalog_cache.invalidate()
+    
+    def test_facet_counts_exclude_own_filter(self):
+        data = client.get(
+            "/api/v1/datasets?search=Pagination dataset&organ=Heart&organ_match=exact"
+            "&data_type=scRNAseq&data_type_match=exact&facets=organ,data_type"
+        ).json()
+        organ_counts = {f["value"]: f["count"] for f in data["facets"]["organ"]}
+        data_type_counts = {f["value"]: f["count"] for f in data["facets"]["data_type"]}
+        # organ facet ignores organ=Heart but keeps data_type=scRNAseq (odd indices)
+        assert organ_counts == {"Kidney": 6, "Lung": 5}
+        # data_type facet ignores data_type but keeps organ=Heart (i % 4 == 0)
+        assert data_type_counts == {"snATACseq": 6}
+        assert data["total_count"] == 0
+        
+        assert client.get("/api/v1/datasets?facets=organ,color").status_code == 400
+    
+    def test_conditional_get_faceted_list_tracks_facet_scope(self):
+        url = "/api/v1/datasets?search=Pagination dataset&organ=Heart&organ_match=exact&facets=organ"
+        first = client.get(url)
+        etag = first.headers["etag"]
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+        
+        # A Kidney row is outside the filtered page but still counted by the organ facet
+        db = TestingSessionLocal()
+        dataset = db.query(Dataset).filter(Dataset.public_dataset_id == "TEST001.PAGE.001").one()
+        assert dataset.organ == "Kidney"
+        dataset.updated_at = db.query(func.max(Dataset.updated_at)).scalar() + timedelta(days=1)
+        db.commit()
+        db.close()
+        catalog_cache.invalidate()
+        
+        changed = client.get(url, headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+        
+    def test_sparse_fieldsets(self):
+        default = client.get("/api/v1/datasets?search=Pagination dataset&limit=2").json()
+        assert "description" not in default["datasets"][0]
+        assert "organ" in default["datasets"][0]
+        
+        slim = client.get(
+            "/api/v1/datasets?search=Pagination dataset&limit=2&sort_by=organ"
+            "&fields=public_dataset_id,status,description"
+        ).json()
+        assert set(slim["datasets"][0]) == {"public_dataset_id", "status", "description"}
+        assert slim["datasets"][0]["description"].startswith("Pagination dataset")
+        assert slim["next_cursor"] is not None
+        
+        response = client.get("/api/v1/datasets?fields=public_dataset_id,password")
+        assert response.status_code == 400
+    
+    @pytest.mark.parametrize("fields", [LIST_DEFAULT_FIELDS, DATASET_FIELDS, ("public_dataset_id", "publication_date")])
+    def test_fast_list_path_matches_schema_rendering(self, fields):
+        query = f"/api/v1/datasets?search=Pagination dataset&limit=7&sort_by=organ&facets=organ,status&fields={','.join(fields)}"
+        body = client.get(query).content
+        
+        # Reference: ORM instances through the pydantic schema, as FastAPI renders it
+        db = TestingSessionLocal()
+        datasets, total_count = DatasetService.get_datasets_page(
+            db, limit=7, search="Pagination dataset", sort_by="organ", fields=list(fields)
+        )
+        facets = {
+            facet: [{"value": value, "count": value_count} for value, value_count in values]
+            for facet, values in DatasetService.get_facet_counts(db, ["organ", "status"], search="Pagination dataset").items()
+        }
+        expected = dataset_list_schema(fields)(
+            datasets=datasets, total_count=total_count, count_mode="exact", skip=0, limit=7,
+            next_cursor=DatasetService.encode_cursor(datasets[-1], "organ", "desc"), facets=facets
+        )
+        db.close()
+        assert body == JSONResponse(jsonable_encoder(expected)).body
+    
+    def test_fast_list_rendering_edge_values(self):
+        fields = ("public_dataset_id", "description", "publication_date", "created_at")
+        rows = [
+            ("HBM001", "심장 \"quoted\" \\ / \n\t\x01 \u2028 😀", date(2024, 2, 29), datetime(2024, 1, 2, 3, 4, 5, 678)),
+            ("HBM002", None, None, datetime(2024, 1, 2)),
+        ]
+        expected = dataset_list_schema(fields)(
+            datasets=[dict(zip(fields, row)) for row in rows], total_count=2, facets={"organ": [{"value": None, "count": 2}]}
+        )
+        body = render_dataset_list(rows, fields, total_count=2, facets={"organ": [{"value": None, "count": 2}]})
+        assert body == JSONResponse(jsonable_encoder(expected)).body
+    
+    def test_export_formats_match(self, monkeypatch):
+        import pyarrow.parquet
+        from app.services import catalog_export
+        
+        # Tiny row groups so the Parquet file is written in several pieces
+        monkeypatch.setattr(catalog_export, "PARQUET_ROW_GROUP_SIZE", 4)
+        query = "/api/v1/datasets/export?search=Pagination dataset&organ=Heart&organ_match=exact"
+        
+        response = client.get(query)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert len(records) == 6
+        assert list(records[0]) == list(DATASET_FIELDS)
+        assert [r["dataset_id"] for r in records] == sorted(r["dataset_id"] for r in records)
+        assert {r["organ"] for r in records} == {"Heart"}
+        
+        response = client.get(f"{query}&format=csv&fields=public_dataset_id,publication_date,created_at")
+        assert response.headers["content-disposition"] == 'attachment; filename="datasets.csv"'
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert [r["public_dataset_id"] for r in rows] == [r["public_dataset_id"] for r in records]
+        assert [r["publication_date"] or None for r in rows] == [r["publication_date"] for r in records]
+        assert [r["created_at"] for r in rows] == [r["created_at"] for r in records]
+        
+        response = client.get(f"{query}&format=parquet")
+        parquet = pyarrow.parquet.ParquetFile(io.BytesIO(response.content))
+        assert parquet.metadata.num_rows == 6
+        assert parquet.metadata.num_row_groups == 2
+        table = parquet.read().to_pylist()
+        assert [r["public_dataset_id"] for r in table] == [r["public_dataset_id"] for r in records]
+        assert [r["created_at"].isoformat() for r in table] == [r["created_at"] for r in records]
+        
+        assert client.get(f"{query}&format=xlsx").status_code == 422
+        assert client.get(f"{query}&fields=password").status_code == 400
+    
+    def test_statistics_counts(self):
+        data = client.get("/api/v1/datasets/statistics/summary").json()
+        assert data["total_datasets"] == 23
+        assert data["by_organ"] == {"Heart": 6, "Kidney": 6, "null": 6, "Lung": 5}
+        assert data["by_data_type"] == {"scRNAseq": 11, "snATACseq": 12}
+        assert data["by_status"] == {"Published": 23}
+
 class TestAdminAPI:
     """Test admin API endpoints"""
     
@@ -111,6 +527,302 @@ class TestAdminAPI:
         """Test admin statistics without authentication"""
         response = client.get("/api/v1/admin/datasets/statistics")
         assert response.status_code == 403  # Forbidden without token
+    
+    def test_login_and_cached_principal_follow_role_changes(self):
+        """Token lookups are cached until the user's role changes"""
+        db = TestingSessionLocal()
+        user = User(username="auth_tester", hashed_password=get_password_hash("auth_password"), role="admin")
+        db.add(user)
+        db.commit()
+        try:
+            response = client.post(
+                "/api/v1/admin/login",
+                json={"username": "auth_tester", "password": "auth_password"}
+            )
+            assert response.status_code == 200
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            
+            assert client.get("/api/v1/admin/cache/stats", headers=headers).status_code == 200
+            hits = principal_cache.hits
+            assert client.get("/api/v1/admin/cache/stats", headers=headers).status_code == 200
+            assert principal_cache.hits == hits + 1
+            
+            user.role = "viewer"
+            db.commit()
+            assert client.get("/api/v1/admin/cache/stats", headers=headers).status_code == 403
+        finally:
+            db.delete(user)
+            db.commit()
+            db.close()
+    
+    def test_expired_token_rejected(self):
+        """Expiry is enforced even for cached tokens"""
+        from datetime import timedelta
+        token = create_access_token({"sub": "admin"}, expires_delta=timedelta(seconds=-1))
+        response = client.get("/api/v1/admin/cache/stats", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 401
+
+class TestBulkImport:
+    """Test the streaming bulk upsert endpoint"""
+    
+    def test_ndjson_upsert_reports_row_errors(self, admin_headers):
+        body = "\n".join([
+            json.dumps({"public_dataset_id": "BULK001", "organ": "Heart", "data_type": "scRNAseq"}),
+            "{not json",
+            json.dumps({"public_dataset_id": "BULK002", "organ": "x" * 101}),
+            "",
+            json.dumps({"public_dataset_id": "BULK002", "organ": "Lung", "publication_date": "2024-02-01"}),
+            json.dumps({"public_dataset_id": "BULK001", "status": "Published"}),
+        ])
+        response = client.post(
+            "/api/v1/admin/datasets/bulk",
+            content=body,
+            headers={**admin_headers, "Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 200
+        result = response.json()
+        assert (result["received"], result["upserted"], result["failed"]) == (5, 3, 2)
+        assert [error["line"] for error in result["errors"]] == [2, 3]
+        assert result["errors"][1]["public_dataset_id"] == "BULK002"
+        
+        # 나중 행이 전달한 컬럼만 덮어씀
+        first = client.get("/api/v1/datasets/BULK001").json()
+        assert (first["organ"], first["data_type"], first["status"]) == ("Heart", "scRNAseq", "Published")
+        second = client.get("/api/v1/datasets/BULK002").json()
+        assert (second["organ"], second["status"], second["publication_date"]) == ("Lung", "Draft", "2024-02-01")
+    
+    def test_csv_upsert_with_multiline_fields(self, admin_headers):
+        body = (
+            "public_dataset_id,organ,description\r\n"
+            'BULK101,Kidney,"first line\nsecond, line"\r\n'
+            "BULK102,,plain\r\n"
+            "BULK103,Kidney\r\n"
+        )
+        response = client.post(
+            "/api/v1/admin/datasets/bulk",
+            content=body.encode(),
+            headers={**admin_headers, "Content-Type": "text/csv"}
+        )
+        assert response.status_code == 200
+        result = response.json()
+        assert (result["received"], result["upserted"], result["failed"]) == (3, 2, 1)
+        assert result["errors"][0]["line"] == 5
+        
+        dataset = client.get("/api/v1/datasets/BULK101").json()
+        assert dataset["description"] == "first line\nsecond, line"
+        assert client.get("/api/v1/datasets/BULK102").json()["organ"] is None
+    
+    def test_csv_unknown_column_rejected(self, admin_headers):
+        response = client.post(
+            "/api/v1/admin/datasets/bulk?format=csv",
+            content=b"public_dataset_id,colour\nBULK201,red\n",
+            headers=admin_headers
+        )
+        assert response.status_code == 400
+    
+    def test_csv_stray_quote_rejected_without_buffering_the_upload(self, admin_headers, monkeypatch):
+        monkeypatch.setattr(bulk_import, "MAX_CSV_RECORD_CHARS", 200)
+        body = 'public_dataset_id,description\nBULK301,"stray quote\n' + "BULK302,fine\n" * 50
+        response = client.post(
+            "/api/v1/admin/datasets/bulk?format=csv",
+            content=body.encode(),
+            headers=admin_headers
+        )
+        assert response.status_code == 400
+        assert "line 2" in response.json()["detail"]
+    
+    def test_overlong_line_rejected_without_buffering_the_upload(self, admin_headers, monkeypatch):
+        monkeypatch.setattr(bulk_import, "MAX_LINE_CHARS", 200)
+        line = json.dumps({"public_dataset_id": "BULK401", "description": "x" * 1000})
+        response = client.post(
+            "/api/v1/admin/datasets/bulk",
+            content=(json.dumps({"public_dataset_id": "BULK400"}) + "\n" + line).encode(),
+            headers={**admin_headers, "Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 400
+        assert "Line 2" in response.json()["detail"]
+    
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 4096])
+    def test_iter_lines_independent_of_chunking(self, chunk_size):
+        body = "\ufeffa,b\r\n한국어 줄\n\n끝".encode()
+        
+        async def collect():
+            async def chunks():
+                for start in range(0, len(body), chunk_size):
+                    yield body[start:start + chunk_size]
+            return [item async for item in bulk_import.iter_lines(chunks())]
+        
+        assert asyncio.run(collect()) == [(1, "a,b"), (2, "한국어 줄"), (3, ""), (4, "끝")]
+    
+    def test_bulk_requires_admin(self):
+        response = client.post("/api/v1/admin/datasets/bulk", content=b"{}")
+        assert response.status_code == 403
+
+@pytest.fixture(scope="class")
+def download_dataset(tmp_path_factory):
+    storage = tmp_path_factory.mktemp("storage")
+    (storage / "matrix.h5ad").write_bytes(bytes(range(256)) * 40)
+    outside = tmp_path_factory.mktemp("outside") / "secret.txt"
+    outside.write_text("secret")
+    (storage / "escape.txt").symlink_to(outside)
+    
+    db = TestingSessionLocal()
+    db.add(Dataset(public_dataset_id="DL001.FILE.001", uploader_id=1, status="Published", file_storage_path=str(storage)))
+    db.commit()
+    yield "/api/v1/datasets/DL001.FILE.001/download"
+    db.query(Dataset).filter(Dataset.public_dataset_id == "DL001.FILE.001").delete()
+    db.commit()
+    db.close()
+
+class TestDownloads:
+    """Test dataset file downloads"""
+    
+    content = bytes(range(256)) * 40
+    
+    def test_full_download(self, download_dataset):
+        response = client.get(f"{download_dataset}/matrix.h5ad")
+        assert response.status_code == 200
+        assert response.content == self.content
+        assert response.headers["content-length"] == str(len(self.content))
+        assert response.headers["accept-ranges"] == "bytes"
+        assert "etag" in response.headers
+    
+    def test_range_requests(self, download_dataset):
+        response = client.get(f"{download_dataset}/matrix.h5ad", headers={"Range": "bytes=100-299"})
+        assert response.status_code == 206
+        assert response.content == self.content[100:300]
+        assert response.headers["content-range"] == f"bytes 100-299/{len(self.content)}"
+        
+        response = client.get(f"{download_dataset}/matrix.h5ad", headers={"Range": "bytes=-16"})
+        assert response.status_code == 206
+        assert response.content == self.content[-16:]
+        
+        response = client.get(f"{download_dataset}/matrix.h5ad", headers={"Range": "bytes=99999-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(self.content)}"
+    
+    def test_if_range_and_conditional_get(self, download_dataset):
+        etag = client.head(f"{download_dataset}/matrix.h5ad").headers["etag"]
+        
+        response = client.get(f"{download_dataset}/matrix.h5ad", headers={"Range": "bytes=0-9", "If-Range": etag})
+        assert response.status_code == 206
+        response = client.get(f"{download_dataset}/matrix.h5ad", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        assert response.status_code == 200
+        assert response.content == self.content
+        
+        response = client.get(f"{download_dataset}/matrix.h5ad", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+    
+    def test_head_has_no_body(self, download_dataset):
+        response = client.head(f"{download_dataset}/matrix.h5ad")
+        assert response.status_code == 200
+        assert response.content == b""
+        assert response.headers["content-length"] == str(len(self.content))
+    
+    def test_path_traversal_and_missing_files(self, download_dataset):
+        assert client.get(f"{download_dataset}/escape.txt").status_code == 400
+        assert client.get(f"{download_dataset}/..%5Csecret.txt").status_code == 400
+        assert client.get(f"{download_dataset}/missing.bam").status_code == 404
+        assert client.get("/api/v1/datasets/NOPE/download/matrix.h5ad").status_code == 404
+
+@pytest.fixture(scope="class")
+def upload_dataset(tmp_path_factory):
+    storage = tmp_path_factory.mktemp("uploads")
+    db = TestingSessionLocal()
+    db.add(Dataset(public_dataset_id="UP001.FILE.001", uploader_id=1, status="Draft", file_storage_path=str(storage)))
+    db.commit()
+    yield "/api/v1/admin/datasets/UP001.FILE.001/uploads", storage
+    db.query(Dataset).filter(Dataset.public_dataset_id == "UP001.FILE.001").delete()
+    db.commit()
+    db.close()
+
+class TestChunkedUploads:
+    """Test resumable chunked uploads"""
+    
+    chunk_size = 256 * 1024
+    content = os.urandom(256 * 1024 * 2 + 1000)
+    
+    def chunks(self):
+        return [self.content[i:i + self.chunk_size] for i in range(0, len(self.content), self.chunk_size)]
+    
+    def create(self, uploads_url, headers, **overrides):
+        body = {
+            "file_name": "matrix.h5ad",
+            "size": len(self.content),
+            "chunk_size": self.chunk_size,
+            "sha256": hashlib.sha256(self.content).hexdigest(),
+            **overrides
+        }
+        return client.post(uploads_url, json=body, headers=headers)
+    
+    def test_out_of_order_upload_resume_and_complete(self, admin_headers, upload_dataset, monkeypatch):
+        uploads_url, storage = upload_dataset
+        response = self.create(uploads_url, admin_headers)
+        assert response.status_code == 201
+        status = response.json()
+        assert (status["total_chunks"], status["offset"]) == (3, 0)
+        session_url = f"{uploads_url}/{status['upload_id']}"
+        chunks = self.chunks()
+        
+        assert client.put(f"{session_url}/chunks/2", content=chunks[2], headers=admin_headers).status_code == 200
+        assert client.put(f"{session_url}/chunks/0", content=chunks[0], headers=admin_headers).status_code == 200
+        status = client.get(session_url, headers=admin_headers).json()
+        assert status["missing_chunks"] == [1]
+        assert status["offset"] == self.chunk_size
+        
+        # 아직 누락된 청크가 있으면 완료 불가
+        assert client.post(f"{session_url}/complete", headers=admin_headers).status_code == 409
+        
+        response = client.put(
+            f"{session_url}/chunks/1", content=chunks[1],
+            headers={**admin_headers, "X-Chunk-SHA256": hashlib.sha256(chunks[1]).hexdigest()}
+        )
+        assert response.status_code == 200
+        
+        # The request's DB session must not hold a connection while the file is hashed
+        sessions, held = [], []
+        
+        async def tracking_get_async_db():
+            async for db in override_get_async_db():
+                sessions.append(db)
+                yield db
+        
+        complete = upload_service.complete_upload
+        
+        def tracking_complete(*args):
+            held.append(any(db.in_transaction() for db in sessions))
+            return complete(*args)
+        
+        monkeypatch.setitem(app.dependency_overrides, get_async_db, tracking_get_async_db)
+        monkeypatch.setattr(upload_service, "complete_upload", tracking_complete)
+        response = client.post(f"{session_url}/complete", headers=admin_headers)
+        assert response.status_code == 200
+        assert held == [False]
+        assert response.json()["sha256"] == hashlib.sha256(self.content).hexdigest()
+        assert (storage / "matrix.h5ad").read_bytes() == self.content
+        assert not any((storage / ".uploads").iterdir())
+    
+    def test_bad_chunks_and_checksums_rejected(self, admin_headers, upload_dataset):
+        uploads_url, _ = upload_dataset
+        session_url = f"{uploads_url}/{self.create(uploads_url, admin_headers, sha256='0' * 64).json()['upload_id']}"
+        chunks = self.chunks()
+        
+        assert client.put(f"{session_url}/chunks/0", content=chunks[0] + b"x", headers=admin_headers).status_code == 422
+        assert client.put(f"{session_url}/chunks/3", content=b"x", headers=admin_headers).status_code == 409
+        response = client.put(f"{session_url}/chunks/0", content=chunks[0], headers={**admin_headers, "X-Chunk-SHA256": "0" * 64})
+        assert response.status_code == 422
+        assert client.get(session_url, headers=admin_headers).json()["received_chunks"] == 0
+        
+        for index, chunk in enumerate(chunks):
+            client.put(f"{session_url}/chunks/{index}", content=chunk, headers=admin_headers)
+        assert client.post(f"{session_url}/complete", headers=admin_headers).status_code == 422
+        assert client.delete(session_url, headers=admin_headers).status_code == 204
+        assert client.get(session_url, headers=admin_headers).status_code == 404
+    
+    def test_invalid_file_name_rejected(self, admin_headers, upload_dataset):
+        uploads_url, _ = upload_dataset
+        assert self.create(uploads_url, admin_headers, file_name="../escape").status_code == 422
+        assert client.get(f"{uploads_url}/..%2F..", headers=admin_headers).status_code == 404
 
 class TestAPIHealth:
     """Test basic API health"""
@@ -0,0 +1,44 @@
+"""
+Tests for the instrumented connection pool
+"""
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.core.pool import InstrumentedQueuePool, pool_status
+
+
+@pytest.fixture
+def pooled_engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_pool_status_reports_occupancy_and_checkouts(pooled_engine):
+    with pooled_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        status = pool_status(pooled_engine)
+        assert status["pool_class"] == "InstrumentedQueuePool"
+        assert status["checked_out"] == 1
+
+    status = pool_status(pooled_engine)
+    assert status["checked_out"] == 0
+    assert status["checkouts"] == 1
+    assert status["checkout_timeouts"] == 0
+
+
+def test_pool_status_counts_checkout_timeouts(pooled_engine):
+    with pooled_engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            pooled_engine.connect()
+
+    status = pool_status(pooled_engine)
+    assert status["checkout_timeouts"] == 1
+    assert status["max_wait_ms"] >= 40
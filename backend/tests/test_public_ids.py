@@ -0,0 +1,80 @@
+"""
+Tests for auto-generated public dataset IDs
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.dataset import Dataset
+from app.models.user import User
+from app.schemas.dataset import DatasetCreate
+from app.services.dataset_service import DatasetService
+
+AUTO_ID = re.compile(r"^HBM\d{3,}\.AUTO\.\d{3}$")
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'ids.db'}", connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add(User(username="id_tester", hashed_password="x", role="admin"))
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+def test_concurrent_creates_get_unique_ids(session_factory):
+    def create(i):
+        with session_factory() as db:
+            dataset = DatasetService.create_dataset(db, DatasetCreate(organ="Heart", citation=str(i)), uploader_id=1)
+            return dataset.public_dataset_id
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        ids = list(pool.map(create, range(40)))
+
+    assert len(set(ids)) == 40
+    assert all(AUTO_ID.match(public_id) for public_id in ids)
+    with session_factory() as db:
+        assert db.query(Dataset).count() == 40
+        assert db.query(Dataset).filter(Dataset.status == "Draft").count() == 40
+
+
+def test_block_allocation_is_contiguous_and_disjoint(session_factory):
+    with session_factory() as db:
+        first = DatasetService.allocate_public_dataset_ids(db, 5)
+        second = DatasetService.allocate_public_dataset_ids(db, 3)
+        db.commit()
+
+    numbers = [int(public_id[3:public_id.index(".")]) for public_id in first + second]
+    assert numbers == list(range(1, 9))
+
+
+def test_upsert_allocates_one_block_for_rows_without_ids(session_factory, monkeypatch):
+    allocations = []
+    allocate = DatasetService.allocate_public_dataset_ids
+
+    def spy(db, count=1):
+        allocations.append(count)
+        return allocate(db, count)
+
+    monkeypatch.setattr(DatasetService, "allocate_public_dataset_ids", staticmethod(spy))
+    rows = [{"public_dataset_id": None, "organ": "Heart"} for _ in range(4)]
+    rows.insert(2, {"public_dataset_id": "NAMED001", "organ": "Lung"})
+    with session_factory() as db:
+        assert DatasetService.upsert_datasets(db, rows, uploader_id=1) == 5
+        db.commit()
+        stored = {dataset.public_dataset_id: dataset.organ for dataset in db.query(Dataset)}
+
+    assert allocations == [4]
+    assigned = [row["public_dataset_id"] for row in rows if row["organ"] == "Heart"]
+    assert all(AUTO_ID.match(public_id) for public_id in assigned)
+    assert stored == {**{public_id: "Heart" for public_id in assigned}, "NAMED001": "Lung"}
@@ -0,0 +1,403 @@
+"""
+Tests for dataset-backed visualization endpoints
+"""
+
+import os
+
+import h5py
+import numpy as np
+import pytest
+import scipy.sparse
+
+from app.api import visualizations
+from app.core import disk_cache
+from app.core.cache import TTLCache, tile_index_cache, visualization_cache
+from app.core.serialization import dumps
+from app.models.dataset import Dataset
+from app.services import umap_tiles, visualization_service
+from app.services.h5ad import gene_columns, open_h5ad, read_gene_columns
+from app.services.distributions import summarize_groups
+from app.services.heatmap import aggregate_groups, build_heatmap
+from app.services.umap_tiles import TileIndex, morton_decode, morton_encode
+from tests.test_datasets_api import TestingSessionLocal, client
+
+N_CELLS = 600
+CELL_TYPES = ["B cell", "T cell", "Fibroblast"]
+
+
+def write_h5ad(path, n_cells=N_CELLS, n_genes=30, seed=0, x_format="csr"):
+    """Minimal AnnData (0.8+ layout) file: X (csr, csc or dense), categorical + numeric obs, X_umap"""
+    rng = np.random.default_rng(seed)
+    codes = rng.integers(0, len(CELL_TYPES), n_cells).astype(np.int8)
+    codes[0] = -1
+    dense = rng.poisson(0.3, (n_cells, n_genes)).astype(np.float32)
+    umap = rng.normal(size=(n_cells, 2)).astype(np.float32) + codes[:, None] * 4
+
+    with h5py.File(path, "w") as file:
+        file.attrs["encoding-type"] = "anndata"
+        if x_format == "dense":
+            file.create_dataset("X", data=dense)
+        else:
+            matrix = scipy.sparse.csr_matrix(dense) if x_format == "csr" else scipy.sparse.csc_matrix(dense)
+            x = file.create_group("X")
+            x.attrs["encoding-type"] = f"{x_format}_matrix"
+            x.attrs["shape"] = (n_cells, n_genes)
+            x.create_dataset("data", data=matrix.data)
+            x.create_dataset("indices", data=matrix.indices)
+            x.create_dataset("indptr", data=matrix.indptr.astype(np.int64))
+
+        obs = file.create_group("obs")
+        obs.attrs["_index"] = "_index"
+        obs.attrs["column-order"] = np.array(["cell_type", "n_counts", "batch"], dtype=h5py.string_dtype())
+        obs.create_dataset("_index", data=np.array([f"cell{i}" for i in range(n_cells)], dtype=h5py.string_dtype()))
+        cell_type = obs.create_group("cell_type")
+        cell_type.attrs["encoding-type"] = "categorical"
+        cell_type.create_dataset("codes", data=codes)
+        cell_type.create_dataset("categories", data=np.array(CELL_TYPES, dtype=h5py.string_dtype()))
+        obs.create_dataset("n_counts", data=dense.sum(axis=1))
+        obs.create_dataset("batch", data=np.array([f"b{i % 2}" for i in range(n_cells)], dtype=h5py.string_dtype()))
+
+        var = file.create_group("var")
+        var.attrs["_index"] = "_index"
+        var.create_dataset("_index", data=np.array([f"GENE{j}" for j in range(n_genes)], dtype=h5py.string_dtype()))
+
+        file.create_group("obsm").create_dataset("X_umap", data=umap)
+    return {"codes": codes, "umap": umap, "dense": dense}
+
+
+@pytest.fixture(scope="module")
+def h5ad_dataset(tmp_path_factory):
+    storage = tmp_path_factory.mktemp("viz")
+    contents = write_h5ad(storage / "atlas.h5ad")
+    contents["path"] = storage / "atlas.h5ad"
+    db = TestingSessionLocal()
+    db.add(Dataset(public_dataset_id="VIZ001.H5AD.001", uploader_id=1, status="Published", file_storage_path=str(storage)))
+    db.add(Dataset(public_dataset_id="VIZ002.NOFILE.001", uploader_id=1, status="Published", file_storage_path=str(storage / "missing")))
+    db.commit()
+    yield contents
+    db.query(Dataset).filter(Dataset.public_dataset_id.like("VIZ%")).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+
+class TestUmap:
+    """UMAP coordinates read straight from the .h5ad"""
+
+    def test_coordinates_and_categorical_labels(self, h5ad_dataset):
+        response = client.get("/api/v1/visualizations/VIZ001.H5AD.001/umap?color_by=cell_type")
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["n_cells"] == N_CELLS
+        np.testing.assert_allclose(data["x"], h5ad_dataset["umap"][:, 0], rtol=1e-6)
+        np.testing.assert_allclose(data["y"], h5ad_dataset["umap"][:, 1], rtol=1e-6)
+        assert data["categories"] == CELL_TYPES
+        assert data["labels"] == h5ad_dataset["codes"].tolist()
+
+    def test_string_and_numeric_columns(self, h5ad_dataset):
+        data = client.get("/api/v1/visualizations/VIZ001.H5AD.001/umap?color_by=batch").json()["data"]
+        assert data["categories"] == ["b0", "b1"]
+        assert data["labels"][:4] == [0, 1, 0, 1]
+
+        data = client.get("/api/v1/visualizations/VIZ001.H5AD.001/umap?color_by=n_counts").json()["data"]
+        assert data["categories"] is None
+        assert data["labels"] == h5ad_dataset["dense"].sum(axis=1).tolist()
+
+        assert "labels" not in client.get("/api/v1/visualizations/VIZ001.H5AD.001/umap").json()["data"]
+
+    def test_missing_keys_and_files(self, h5ad_dataset):
+        base = "/api/v1/visualizations"
+        assert client.get(f"{base}/VIZ001.H5AD.001/umap?color_by=leiden").status_code == 404
+        assert client.get(f"{base}/VIZ001.H5AD.001/umap?embedding=X_tsne").status_code == 404
+        assert client.get(f"{base}/VIZ001.H5AD.001/umap?file=../atlas.h5ad").status_code == 400
+        assert client.get(f"{base}/VIZ002.NOFILE.001/umap").status_code == 404
+        assert client.get(f"{base}/NOPE/umap").status_code == 404
+        # The mock chart endpoint is unchanged
+        assert client.get(f"{base}/umap").json()["data"]["x"] == [1, 2, 3]
+
+
+class TestUmapTiles:
+    """Level-of-detail tile pyramid over the embedding"""
+
+    def test_morton_round_trip(self):
+        gx = np.array([0, 1, 5, (1 << 22) - 1])
+        gy = np.array([0, 3, 2, 12345])
+        keys = morton_encode(gx, gy)
+        assert keys.tolist()[:3] == [0, 0b1011, 0b011001]
+        assert [v.tolist() for v in morton_decode(keys)] == [gx.tolist(), gy.tolist()]
+
+    def test_tiles_partition_points_and_respect_budget(self, monkeypatch):
+        monkeypatch.setattr(umap_tiles, "TILE_POINT_BUDGET", 500)
+        rng = np.random.default_rng(1)
+        coordinates = np.concatenate([rng.normal(0, 1, (15000, 2)), rng.uniform(-8, 8, (5000, 2))])
+        labels = (coordinates[:, 0] > 0).astype(np.int32)
+        index = TileIndex(coordinates, labels, ["left", "right"])
+
+        tiles = [index.tile(2, x, y) for x in range(4) for y in range(4)]
+        assert sum(tile["count"] for tile in tiles) == 20000
+        dense = [tile for tile in tiles if tile["mode"] == "density"]
+        sparse = [tile for tile in tiles if tile["mode"] == "points"]
+        assert dense and sparse
+        for tile in sparse:
+            x0, y0, x1, y1 = tile["bounds"]
+            assert ((tile["points"]["x"] >= x0 - 1e-4) & (tile["points"]["x"] <= x1 + 1e-4)).all()
+            assert len(tile["points"]["x"]) == tile["count"] <= 500
+        for tile in dense:
+            bins = tile["bins"]
+            assert bins["count"].sum() == tile["count"]
+            assert len(bins["count"]) <= umap_tiles.TILE_BINS ** 2
+            # Bins left of x=0 are dominated by "left" and vice versa (allow the bin straddling 0)
+            far = np.abs(bins["x"]) > tile["bin_size"]
+            assert (bins["labels"][far] == (bins["x"][far] > 0)).all()
+
+        top = index.tile(0, 0, 0)
+        assert top["mode"] == "density" and top["count"] == 20000
+        # Bin levels are built once and reused
+        assert set(index._levels) == {umap_tiles.BIN_BITS, 2 + umap_tiles.BIN_BITS}
+
+    def test_numeric_color_column_is_averaged(self, monkeypatch):
+        monkeypatch.setattr(umap_tiles, "TILE_POINT_BUDGET", 10)
+        coordinates = np.array([[0.0, 0.0]] * 30 + [[1.0, 1.0]] * 30)
+        values = np.array([1.0] * 29 + [np.nan] + [3.0] * 30)
+        bins = TileIndex(coordinates, values).tile(0, 0, 0)["bins"]
+        assert bins["count"].tolist() == [30, 30]
+        assert bins["values"].tolist() == [1.0, 3.0]
+
+    def test_tile_endpoints(self, h5ad_dataset):
+        base = "/api/v1/visualizations/VIZ001.H5AD.001/umap/tiles"
+        meta = client.get(f"{base}?color_by=cell_type").json()
+        assert meta["n_cells"] == N_CELLS
+        assert meta["categories"] == CELL_TYPES
+        assert meta["max_zoom"] == umap_tiles.MAX_ZOOM
+
+        hits = tile_index_cache.hits
+        response = client.get(f"{base}/0/0/0?color_by=cell_type")
+        assert response.status_code == 200
+        tile = response.json()
+        assert tile["mode"] == "points" and tile["count"] == N_CELLS
+        assert sorted(tile["points"]["labels"]) == sorted(h5ad_dataset["codes"].tolist())
+        assert tile_index_cache.hits == hits + 1
+
+        assert sum(client.get(f"{base}/1/{x}/{y}").json()["count"] for x in range(2) for y in range(2)) == N_CELLS
+        etag = response.headers["etag"]
+        assert client.get(f"{base}/0/0/0?color_by=cell_type", headers={"If-None-Match": etag}).status_code == 304
+        assert client.get(f"{base}/1/2/0").status_code == 404
+        assert client.get(f"{base}/{umap_tiles.MAX_ZOOM + 1}/0/0").status_code == 422
+
+
+class TestHeatmap:
+    """Sparse gene x group aggregation"""
+
+    @pytest.mark.parametrize("x_format", ["csr", "csc", "dense"])
+    def test_gene_columns_read_from_every_layout(self, tmp_path, x_format):
+        contents = write_h5ad(tmp_path / "x.h5ad", x_format=x_format)
+        with open_h5ad(str(tmp_path / "x.h5ad")) as file:
+            columns = gene_columns(file, ["GENE7", "GENE2", "GENE29"])
+            # A tiny scan block exercises the block boundaries of the CSR path
+            matrix = read_gene_columns(file, columns, scan_size=97)
+        assert columns.tolist() == [7, 2, 29]
+        np.testing.assert_array_equal(matrix.toarray(), contents["dense"][:, [7, 2, 29]])
+
+    def test_aggregates_match_brute_force(self):
+        rng = np.random.default_rng(3)
+        dense = rng.poisson(0.5, (2000, 12)).astype(np.float64)
+        codes = rng.integers(-1, 5, 2000)
+        result = aggregate_groups(scipy.sparse.csr_matrix(dense), codes, 6)
+        for group in range(5):
+            cells = dense[codes == group]
+            np.testing.assert_allclose(result["mean"][group], cells.mean(axis=0))
+            np.testing.assert_allclose(result["fraction"][group], (cells > 0).mean(axis=0))
+            assert result["sizes"][group] == len(cells)
+        assert result["sizes"][5] == 0
+        np.testing.assert_allclose(aggregate_groups(dense, codes, 6)["mean"][:5], result["mean"][:5])
+
+    def test_zscore_and_clustering_order(self):
+        # Two gene modules: genes 0/2 high in groups a/c, genes 1/3 high in groups b/d
+        dense = np.zeros((8, 4))
+        codes = np.repeat(np.arange(4), 2)
+        dense[np.ix_(np.flatnonzero(np.isin(codes, [0, 2])), [0, 2])] = 5
+        dense[np.ix_(np.flatnonzero(np.isin(codes, [1, 3])), [1, 3])] = 3
+        genes, groups = ["g0", "g1", "g2", "g3"], ["a", "b", "c", "d", "empty"]
+        result = build_heatmap(
+            scipy.sparse.csc_matrix(dense), genes, codes, groups, zscore=True, cluster_genes=True, cluster_groups=True
+        )
+        assert result["groups"] != groups and "empty" not in result["groups"]
+        # Clustered modules end up adjacent
+        assert {frozenset(result["genes"][:2]), frozenset(result["genes"][2:])} == {frozenset({"g0", "g2"}), frozenset({"g1", "g3"})}
+        assert {frozenset(result["groups"][:2]), frozenset(result["groups"][2:])} == {frozenset("ac"), frozenset("bd")}
+        np.testing.assert_allclose(result["values"].mean(axis=1), 0, atol=1e-12)
+        assert result["mean"].max() == 5
+
+    def test_heatmap_endpoint(self, h5ad_dataset):
+        base = "/api/v1/visualizations/VIZ001.H5AD.001/heatmap"
+        response = client.get(f"{base}?genes=GENE3,GENE0&groupby=cell_type")
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["genes"] == ["GENE3", "GENE0"]
+        assert data["groups"] == CELL_TYPES
+        codes, dense = h5ad_dataset["codes"], h5ad_dataset["dense"]
+        expected = [[dense[codes == g, gene].mean() for g in range(3)] for gene in (3, 0)]
+        np.testing.assert_allclose(data["mean"], expected, rtol=1e-6)
+        assert data["group_sizes"] == [int((codes == g).sum()) for g in range(3)]
+
+        assert client.get(f"{base}?genes=NOPE&groupby=cell_type").status_code == 404
+        assert client.get(f"{base}?genes=GENE1&groupby=n_counts").status_code == 422
+        assert client.get(f"{base}?genes=,&groupby=cell_type").status_code == 400
+
+
+class TestBoxplot:
+    """Server-side distribution summaries"""
+
+    def test_summaries_match_numpy(self):
+        rng = np.random.default_rng(5)
+        values = np.concatenate([rng.lognormal(0, 1, 5000), [np.nan, np.inf]])
+        codes = np.concatenate([rng.integers(-1, 4, 5000), [0, 1]])
+        result = summarize_groups(values, codes, ["a", "b", "c", "d", "empty"], max_outliers=10, kde_points=64)
+        assert [g["name"] for g in result["groups"]] == ["a", "b", "c", "d"]
+        for code, summary in enumerate(result["groups"]):
+            group = values[:5000][codes[:5000] == code]
+            q1, median, q3 = np.percentile(group, [25, 50, 75])
+            assert summary["n"] == len(group)
+            np.testing.assert_allclose(
+                [summary["min"], summary["q1"], summary["median"], summary["q3"], summary["max"], summary["mean"]],
+                [group.min(), q1, median, q3, group.max(), group.mean()]
+            )
+            inside = group[(group >= q1 - 1.5 * (q3 - q1)) & (group <= q3 + 1.5 * (q3 - q1))]
+            assert (summary["whisker_low"], summary["whisker_high"]) == (inside.min(), inside.max())
+            assert summary["n_outliers"] == len(group) - len(inside) > 10
+            assert len(summary["outliers"]) == 10
+            assert summary["outliers"][-1] == group.max()
+            # Density integrates to ~1 over the shared grid (minus what spills past its edges)
+            step = result["kde_x"][1] - result["kde_x"][0]
+            assert abs(summary["kde"].sum() * step - 1) < 0.1
+
+    def test_boxplot_endpoint_is_cached(self, h5ad_dataset):
+        base = "/api/v1/visualizations/VIZ001.H5AD.001/boxplot"
+        hits = visualization_cache.hits
+        response = client.get(f"{base}?gene=GENE4&groupby=cell_type&kde=true")
+        assert response.status_code == 200
+        data = response.json()["data"]
+        codes, dense = h5ad_dataset["codes"], h5ad_dataset["dense"]
+        assert [g["name"] for g in data["groups"]] == CELL_TYPES
+        assert [g["n"] for g in data["groups"]] == [int((codes == g).sum()) for g in range(3)]
+        assert data["groups"][1]["mean"] == pytest.approx(dense[codes == 1, 4].mean())
+        assert len(data["kde_x"]) == len(data["groups"][0]["kde"])
+        assert len(response.content) < 10000
+
+        assert client.get(f"{base}?gene=GENE4&groupby=cell_type&kde=true").content == response.content
+        assert visualization_cache.hits == hits + 1
+        assert "kde_x" not in client.get(f"{base}?gene=GENE4&groupby=cell_type").json()["data"]
+        assert client.get(f"{base}?gene=NOPE&groupby=cell_type").status_code == 404
+
+
+class TestDiskCache:
+    """Content-addressed on-disk result cache"""
+
+    def test_entries_round_trip(self):
+        value = {
+            "x": np.linspace(0, 1, 7, dtype=np.float32),
+            "grid": np.arange(12, dtype=np.int8).reshape(3, 4),
+            "empty": np.zeros(0),
+            "flags": np.array([True, False]),
+            "groups": [{"name": "a", "n": np.int64(3), "mean": np.float64(0.5), "outliers": np.array([np.nan, 2.0])}],
+            "pair": (1, None),
+        }
+        decoded, raw_size, compute_seconds = disk_cache.decode(disk_cache.encode(value, 0.25))
+        assert dumps(decoded) == dumps(value)
+        assert decoded["grid"].shape == (3, 4) and decoded["grid"].dtype == np.int8
+        assert compute_seconds == 0.25 and raw_size > 0
+        with pytest.raises(ValueError):
+            disk_cache.decode(b"not an entry")
+
+    def test_lru_eviction_by_total_size(self, tmp_path):
+        def payload(i):
+            return {"values": np.random.default_rng(i).random(1000)}
+
+        entry_size = len(disk_cache.encode(payload(0)))
+        cache = disk_cache.DiskCache(str(tmp_path), max_bytes=int(entry_size * 3.5))
+        for i in range(3):
+            cache.get_or_set("test", {"i": i}, lambda: payload(i))
+        # Touch entry 0 so entry 1 is the least recently used
+        assert cache.get_or_set("test", {"i": 0}, lambda: pytest.fail("should be cached"))["values"][0] == payload(0)["values"][0]
+        cache.get_or_set("test", {"i": 3}, lambda: payload(3))
+        stats = cache.stats()
+        assert (stats["entries"], stats["evictions"], stats["hits"], stats["misses"]) == (3, 1, 1, 4)
+        assert stats["bytes"] <= stats["max_bytes"]
+        assert not os.path.exists(cache._path(disk_cache.cache_key("test", {"i": 1})))
+
+        # A new process picks up the same entries from disk
+        reopened = disk_cache.DiskCache(str(tmp_path), max_bytes=cache.max_bytes)
+        assert reopened.stats()["bytes"] == stats["bytes"]
+        assert set(reopened._index) == set(cache._index)
+
+    def test_index_scan_only_removes_stale_temp_files(self, tmp_path):
+        cache = disk_cache.DiskCache(str(tmp_path), max_bytes=1 << 20)
+        cache.get_or_set("test", {"i": 0}, lambda: {"values": np.arange(10)})
+        shard = os.path.dirname(cache._path(disk_cache.cache_key("test", {"i": 0})))
+        foreign = [tmp_path / "sub" / "important.h5ad", tmp_path / "notes.tmp", tmp_path / "zz" / "old.tmp"]
+        for path in foreign:
+            path.parent.mkdir(exist_ok=True)
+            path.write_bytes(b"keep")
+        fresh_temp, stale_temp = os.path.join(shard, "fresh.tmp"), os.path.join(shard, "stale.tmp")
+        for path in (fresh_temp, stale_temp):
+            with open(path, "wb") as file:
+                file.write(b"partial")
+        old = os.stat(stale_temp).st_mtime - disk_cache.TEMP_GRACE_SECONDS - 60
+        os.utime(stale_temp, (old, old))
+        for path in foreign[1:]:
+            os.utime(path, (old, old))
+
+        reopened = disk_cache.DiskCache(str(tmp_path), max_bytes=1 << 20)
+        assert reopened.stats()["entries"] == 1
+        assert all(path.exists() for path in foreign)
+        assert os.path.exists(fresh_temp) and not os.path.exists(stale_temp)
+
+    def test_endpoints_use_disk_cache(self, h5ad_dataset, tmp_path, monkeypatch, admin_headers):
+        cache = disk_cache.DiskCache(str(tmp_path), max_bytes=1 << 20)
+        monkeypatch.setattr(visualization_service, "visualization_disk_cache", cache)
+        monkeypatch.setattr(visualizations, "visualization_disk_cache", cache)
+        # Exercise the disk layer on its own; the in-process cache normally answers first
+        monkeypatch.setattr(visualization_service, "visualization_cache", TTLCache(maxsize=0, ttl=0))
+        url = "/api/v1/visualizations/VIZ001.H5AD.001/heatmap?genes=GENE1,GENE2&groupby=cell_type"
+
+        first = client.get(url)
+        assert first.status_code == 200
+        assert client.get(url).content == first.content
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert client.get(url.replace("GENE1,GENE2", "GENE2,GENE1")).status_code == 200
+        assert cache.misses == 2
+
+        # Rewriting the file changes its mtime, so old entries are not reused
+        path = str(h5ad_dataset["path"])
+        stat_result = os.stat(path)
+        os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 10 ** 9))
+        assert client.get(url).content == first.content
+        assert cache.misses == 3
+
+        stats = client.get("/api/v1/visualizations/cache/stats", headers=admin_headers).json()
+        assert stats["hits"] == 1 and stats["hit_rate"] == pytest.approx(0.25)
+        assert stats["bytes_saved"] > 0 and stats["entries"] == 3
+        assert client.get("/api/v1/visualizations/cache/stats").status_code in (401, 403)
+
+    def test_memory_cache_is_checked_before_disk(self, h5ad_dataset, tmp_path, monkeypatch):
+        cache = disk_cache.DiskCache(str(tmp_path), max_bytes=1 << 20)
+        monkeypatch.setattr(visualization_service, "visualization_disk_cache", cache)
+        memory = TTLCache(maxsize=16, ttl=60)
+        monkeypatch.setattr(visualization_service, "visualization_cache", memory)
+        url = "/api/v1/visualizations/VIZ001.H5AD.001/boxplot?gene=GENE3&groupby=cell_type"
+
+        first = client.get(url)
+        assert client.get(url).content == first.content
+        assert (memory.hits, cache.hits, cache.misses) == (1, 0, 1)
+
+    def test_umap_results_are_cached(self, h5ad_dataset, tmp_path, monkeypatch):
+        cache = disk_cache.DiskCache(str(tmp_path), max_bytes=1 << 20)
+        monkeypatch.setattr(visualization_service, "visualization_disk_cache", cache)
+        monkeypatch.setattr(visualization_service, "visualization_cache", TTLCache(maxsize=0, ttl=0))
+        url = "/api/v1/visualizations/VIZ001.H5AD.001/umap?color_by=cell_type"
+
+        first = client.get(url)
+        assert first.status_code == 200
+        assert client.get(url).content == first.content
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert client.get(url.replace("cell_type", "batch")).status_code == 200
+        assert cache.misses == 2